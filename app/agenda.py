@@ -0,0 +1,199 @@
+import os
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from fastapi import HTTPException
+from .bulk import chunks
+
+# Duración de cada cita y horario de atención. Las horas se interpretan en UTC,
+# igual que las fechas de las citas guardadas.
+CITA_DURACION_MINUTOS = int(os.getenv("CITA_DURACION_MINUTOS", "30"))
+AGENDA_HORA_INICIO = time.fromisoformat(os.getenv("AGENDA_HORA_INICIO", "08:00"))
+AGENDA_HORA_FIN = time.fromisoformat(os.getenv("AGENDA_HORA_FIN", "18:00"))
+# Ventana máxima de una consulta de disponibilidad
+DISPONIBILIDAD_MAX_DIAS = int(os.getenv("DISPONIBILIDAD_MAX_DIAS", "31"))
+# Citas en estos estados no ocupan su horario
+ESTADOS_LIBRES = ("cancelada",)
+# Rangos de fecha por consulta al buscar conflictos
+CONFLICT_CHUNK_SIZE = 200
+
+DURACION = timedelta(minutes=CITA_DURACION_MINUTOS)
+
+
+def to_utc_naive(value):
+    """
+    Fecha y hora como se guardan y se comparan en la base: UTC sin zona.
+    Las que llegan sin zona ya se interpretan en UTC.
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def occupies_slot(estado):
+    return estado not in ESTADOS_LIBRES
+
+
+def first_overlap(busy, start):
+    """
+    Con `busy` ordenado, devuelve la posición de la primera cita que se cruza
+    con la que empieza en `start`, o None. Ambas duran DURACION, así que chocan
+    si sus inicios están a menos de DURACION. Costo O(log n).
+    """
+    idx = bisect_right(busy, start - DURACION)
+    return idx if idx < len(busy) and busy[idx] < start + DURACION else None
+
+
+def _estado_filter(alias):
+    placeholders = ", ".join(["%s"] * len(ESTADOS_LIBRES))
+    return f"{alias}.estado NOT IN ({placeholders})"
+
+
+def find_conflicts(cursor, id_especialista, starts):
+    """
+    Devuelve {inicio pedido: id_cita existente} para los inicios en `starts`
+    que se cruzan con una cita vigente del especialista.
+
+    Cada inicio se traduce en un rango abierto (inicio - DURACION, inicio + DURACION)
+    sobre el índice (id_especialista, fecha_hora), así que el costo depende
+    del número de citas pedidas y no del total de la tabla.
+
+    Es una lectura con bloqueo (FOR UPDATE): lee la última versión confirmada
+    de las citas y no la instantánea de la transacción, así ve las que otra
+    reserva confirmó mientras esta esperaba el bloqueo del especialista.
+    """
+    conflicts = {}
+    for chunk in chunks(sorted(set(starts)), CONFLICT_CHUNK_SIZE):
+        ranges = " OR ".join(["(c.fecha_hora > %s AND c.fecha_hora < %s)"] * len(chunk))
+        params = [id_especialista, *ESTADOS_LIBRES]
+        for start in chunk:
+            params.extend((start - DURACION, start + DURACION))
+        cursor.execute(
+            f"""
+            SELECT c.id_cita, c.fecha_hora
+            FROM citas c
+            WHERE c.id_especialista = %s AND {_estado_filter("c")} AND ({ranges})
+            ORDER BY c.fecha_hora
+            FOR UPDATE
+            """,
+            tuple(params)
+        )
+        rows = cursor.fetchall()
+        busy = [row[1] for row in rows]
+        for start in chunk:
+            idx = first_overlap(busy, start)
+            if idx is not None:
+                conflicts[start] = rows[idx][0]
+    return conflicts
+
+
+def raise_conflicts(starts, conflicts):
+    """
+    Rechaza con 409 la petición si algún horario pedido ya está ocupado,
+    por otra cita de la base de datos o por otra fila de la misma petición.
+    `starts` es una lista de (fila, inicio) de las citas que ocupan horario.
+    """
+    detalle = [
+        {"fila": fila, "fecha_hora": start.isoformat(), "id_cita": conflicts[start]}
+        for fila, start in starts if start in conflicts
+    ]
+    ordered = sorted(starts, key=lambda item: item[1])
+    for (_, previous), (fila, start) in zip(ordered, ordered[1:]):
+        if start - previous < DURACION:
+            detalle.append({"fila": fila, "fecha_hora": start.isoformat(), "id_cita": None})
+    if detalle:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "mensaje": "Horarios ya ocupados para el especialista",
+                "conflictos": sorted(detalle, key=lambda item: item["fila"])
+            }
+        )
+
+
+def validate_window(desde: date, hasta: date):
+    if hasta < desde:
+        raise HTTPException(status_code=400, detail="hasta debe ser igual o posterior a desde")
+    if (hasta - desde).days >= DISPONIBILIDAD_MAX_DIAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"La ventana de disponibilidad no puede superar {DISPONIBILIDAD_MAX_DIAS} días"
+        )
+
+
+def window_bounds(desde: date, hasta: date):
+    """
+    Rango de fecha_hora a consultar: las citas que empiezan hasta DURACION
+    antes del primer horario pueden ocuparlo
+    """
+    return (
+        datetime.combine(desde, AGENDA_HORA_INICIO) - DURACION,
+        datetime.combine(hasta, AGENDA_HORA_FIN)
+    )
+
+
+def slots(desde: date, hasta: date):
+    """
+    Horarios de atención de la ventana, desde ahora en adelante
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    day = desde
+    while day <= hasta:
+        start = datetime.combine(day, AGENDA_HORA_INICIO)
+        end = datetime.combine(day, AGENDA_HORA_FIN)
+        while start + DURACION <= end:
+            if start >= now:
+                yield start
+            start += DURACION
+        day += timedelta(days=1)
+
+
+def free_slots(busy_by_especialista, especialistas, desde: date, hasta: date):
+    """
+    Horarios libres por especialista. `busy_by_especialista` tiene, por ID, los
+    inicios ordenados de sus citas vigentes dentro de la ventana.
+    """
+    window = list(slots(desde, hasta))
+    free = []
+    for id_especialista, nombre in especialistas:
+        busy = busy_by_especialista.get(id_especialista, [])
+        free.extend(
+            {"id_especialista": id_especialista, "nombre_especialista": nombre, "fecha_hora": start}
+            for start in window
+            if first_overlap(busy, start) is None
+        )
+    free.sort(key=lambda item: (item["fecha_hora"], item["id_especialista"]))
+    return free
+
+
+def availability(cursor, especialista_filter, params, desde: date, hasta: date):
+    """
+    Horarios libres de los especialistas que cumplen `especialista_filter`
+    (condición sobre el alias `e`), o None si ninguno la cumple.
+
+    Solo lee las citas de la ventana, por el índice (id_especialista, fecha_hora).
+    """
+    cursor.execute(
+        f"SELECT e.id_especialista, e.nombre FROM especialistas e WHERE {especialista_filter}",
+        tuple(params)
+    )
+    especialistas = cursor.fetchall()
+
+    low, high = window_bounds(desde, hasta)
+    cursor.execute(
+        f"""
+        SELECT c.id_especialista, c.fecha_hora
+        FROM especialistas e
+        JOIN citas c ON c.id_especialista = e.id_especialista
+        WHERE {especialista_filter}
+          AND c.fecha_hora > %s AND c.fecha_hora < %s
+          AND {_estado_filter("c")}
+        ORDER BY c.id_especialista, c.fecha_hora
+        """,
+        (*params, low, high, *ESTADOS_LIBRES)
+    )
+    busy = {}
+    for id_especialista, fecha_hora in cursor.fetchall():
+        busy.setdefault(id_especialista, []).append(fecha_hora)
+    if not especialistas:
+        return None
+    return free_slots(busy, especialistas, desde, hasta)
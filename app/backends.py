@@ -0,0 +1,222 @@
+import os
+from collections import OrderedDict
+import mysql.connector
+from dotenv import load_dotenv
+from .bulk import check_auto_increment
+from .embedded import SQLiteConnection, create_schema
+
+load_dotenv()
+
+# Motor de almacenamiento: "mysql" (servidor) o "sqlite" (embebido, en DB_SQLITE_PATH;
+# ":memory:" para una base efímera en el proceso)
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")
+DB_SQLITE_PATH = os.getenv("DB_SQLITE_PATH", "hospital.db")
+# Sentencias preparadas que se conservan por conexión (0 las desactiva en MySQL)
+DB_PREPARED_CACHE_SIZE = int(os.getenv("DB_PREPARED_CACHE_SIZE", "100"))
+
+
+class PreparedCursor:
+    """
+    Cursor que ejecuta cada consulta con parámetros como sentencia preparada,
+    reutilizando la que la conexión ya tenga para el mismo texto SQL.
+
+    Los cursores preparados de mysql.connector no tienen buffer, así que el
+    resultado se lee completo al ejecutar; igual que un cursor con buffer,
+    la conexión queda libre para la siguiente consulta.
+    """
+
+    def __init__(self, connection, dictionary):
+        self._connection = connection
+        self._dictionary = dictionary
+        self._plain = None
+        self._rows = []
+        self._position = 0
+        self.description = None
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def _plain_cursor(self):
+        if self._plain is None:
+            self._plain = self._connection.raw.cursor(dictionary=self._dictionary, buffered=True)
+        return self._plain
+
+    def execute(self, query, params=None):
+        if params:
+            cursor = self._connection.prepared(query, self._dictionary)
+            cursor.execute(query, tuple(params))
+        else:
+            cursor = self._plain_cursor()
+            cursor.execute(query)
+        self.description = cursor.description
+        self._rows = cursor.fetchall() if cursor.description else []
+        self._position = 0
+        self.lastrowid = cursor.lastrowid
+        self.rowcount = len(self._rows) if cursor.description else cursor.rowcount
+
+    def executemany(self, query, seq_params):
+        cursor = self._plain_cursor()
+        cursor.executemany(query, seq_params)
+        self.description = None
+        self._rows = []
+        self.lastrowid = cursor.lastrowid
+        self.rowcount = cursor.rowcount
+
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        self._position += 1
+        return self._rows[self._position - 1]
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def close(self):
+        if self._plain is not None:
+            self._plain.close()
+        self._rows = []
+
+
+class PreparedConnection:
+    """
+    Conexión MySQL con un caché LRU de sentencias preparadas, una por texto
+    SQL; al salir del caché la sentencia se libera en el servidor.
+
+    Los cursores sin buffer (las exportaciones por streaming) usan el
+    protocolo de texto para no leer el resultado completo en memoria.
+    """
+
+    def __init__(self, connection, cache_size=DB_PREPARED_CACHE_SIZE):
+        self.raw = connection
+        self.cache_size = cache_size
+        self._statements = OrderedDict()  # (consulta, dictionary) -> cursor preparado
+        self.prepares = 0
+        self.reuses = 0
+
+    def prepared(self, query, dictionary):
+        key = (query, dictionary)
+        cursor = self._statements.get(key)
+        if cursor is not None:
+            self._statements.move_to_end(key)
+            self.reuses += 1
+            return cursor
+        cursor = self.raw.cursor(prepared=True, dictionary=dictionary)
+        self._statements[key] = cursor
+        self.prepares += 1
+        while len(self._statements) > self.cache_size:
+            _, evicted = self._statements.popitem(last=False)
+            evicted.close()
+        return cursor
+
+    def cursor(self, dictionary=False, buffered=None):
+        if buffered is False or not self.cache_size:
+            return self.raw.cursor(dictionary=dictionary, buffered=buffered)
+        return PreparedCursor(self, dictionary)
+
+    @property
+    def in_transaction(self):
+        return self.raw.in_transaction
+
+    def discard_results(self):
+        """
+        Descarta el resultado pendiente de un cursor sin buffer que no se leyó completo
+        """
+        self.raw.consume_results()
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def ping(self, reconnect=False):
+        self.raw.ping(reconnect=reconnect)
+
+    def close(self):
+        self._statements.clear()
+        self.raw.close()
+
+
+class MySQLBackend:
+    name = "mysql"
+    single_connection = False
+
+    def setup(self):
+        # El esquema de MySQL lo administran las migraciones (python -m app.migrate);
+        # aquí solo se verifica que insert_many pueda calcular los IDs generados
+        connection = self.connect()
+        cursor = connection.cursor()
+        try:
+            check_auto_increment(cursor)
+        finally:
+            cursor.close()
+            connection.close()
+
+    def connect(self, host=None):
+        """
+        Conexión al primario (DB_HOST) o, si se indica, al servidor `host[:puerto]`
+        """
+        host, _, port = (host or os.getenv("DB_HOST", "")).partition(":")
+        return PreparedConnection(mysql.connector.connect(
+            host=host,
+            port=int(port) if port else 3306,
+            user=os.getenv("DB_USER"),
+            password=os.getenv("DB_PASSWORD"),
+            database=os.getenv("DB_NAME")
+        ))
+
+
+class SQLiteBackend:
+    """
+    Base SQLite embebida. Las réplicas (DB_REPLICA_HOSTS) son rutas de otros
+    archivos; en memoria la aplicación usa una sola conexión, porque SQLite
+    no espera a los bloqueos de una base en memoria compartida.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=DB_SQLITE_PATH):
+        self.path = path
+        self.single_connection = path == ":memory:"
+        self._anchor = None
+
+    def setup(self):
+        """
+        Crea las tablas que falten; en memoria deja una conexión abierta para
+        que la base no desaparezca cuando el pool recicla las suyas
+        """
+        if self.single_connection and self._anchor is None:
+            self._anchor = SQLiteConnection(self.path)
+        create_schema(self.path)
+
+    def connect(self, path=None):
+        return SQLiteConnection(path or self.path)
+
+
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend}
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if DB_BACKEND not in BACKENDS:
+            raise ValueError(f"DB_BACKEND desconocido: {DB_BACKEND} (opciones: {', '.join(BACKENDS)})")
+        _backend = BACKENDS[DB_BACKEND]()
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Reemplaza el motor en uso (pruebas y benchmarks); llamar antes de init_pool
+    """
+    global _backend
+    _backend = backend
+    return backend
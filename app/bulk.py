@@ -0,0 +1,165 @@
+import os
+from fastapi import HTTPException
+from .models import ResultadoBulk
+
+# Filas por sentencia INSERT multi-fila
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "500"))
+# IDs por consulta IN (...) al validar llaves foráneas
+FK_CHECK_CHUNK_SIZE = int(os.getenv("FK_CHECK_CHUNK_SIZE", "1000"))
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def insert_many(cursor, table, columns, rows, chunk_size=None):
+    """
+    Inserta `rows` con sentencias INSERT ... VALUES (...),(...) de a
+    `chunk_size` filas y devuelve los IDs generados en el mismo orden.
+
+    Un INSERT multi-fila con VALUES es un "simple insert" para InnoDB: reserva
+    de una vez todos sus valores AUTO_INCREMENT (en cualquier
+    innodb_autoinc_lock_mode), así que los IDs de cada lote son consecutivos
+    a partir de LAST_INSERT_ID() (el de la primera fila), siempre que
+    auto_increment_increment sea 1; check_auto_increment lo verifica al
+    iniciar. Las tablas con llave natural (pacientes, especialistas)
+    recuperan sus IDs con ids_by_key.
+    """
+    chunk_size = chunk_size or BULK_INSERT_CHUNK_SIZE
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    ids = []
+    for chunk in chunks(rows, chunk_size):
+        query = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+            + ", ".join([placeholders] * len(chunk))
+        )
+        cursor.execute(query, tuple(value for row in chunk for value in row))
+        if cursor.rowcount != len(chunk):
+            raise RuntimeError(
+                f"Se insertaron {cursor.rowcount} filas en {table}, se esperaban {len(chunk)}"
+            )
+        first_id = cursor.lastrowid
+        ids.extend(range(first_id, first_id + len(chunk)))
+    return ids
+
+
+def check_auto_increment(cursor):
+    """
+    Falla si el servidor no asigna los AUTO_INCREMENT de a 1 (por ejemplo en
+    Galera o con varios primarios): insert_many devolvería IDs equivocados
+    """
+    cursor.execute("SELECT @@auto_increment_increment")
+    increment = int(cursor.fetchone()[0])
+    if increment != 1:
+        raise RuntimeError(
+            f"auto_increment_increment = {increment}: los IDs de los INSERT "
+            "multi-fila no son consecutivos y insert_many no puede calcularlos"
+        )
+
+
+def find_missing_ids(cursor, table, id_column, ids, chunk_size=None):
+    """
+    Devuelve, ordenados, los IDs de `ids` que no existen en `table`.
+    Consulta los IDs distintos con una sentencia IN (...) por lote.
+    """
+    wanted = sorted(set(ids))
+    found = set()
+    for chunk in chunks(wanted, chunk_size or FK_CHECK_CHUNK_SIZE):
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(
+            f"SELECT {id_column} FROM {table} WHERE {id_column} IN ({placeholders})",
+            tuple(chunk)
+        )
+        for row in cursor.fetchall():
+            found.add(row[id_column] if isinstance(row, dict) else row[0])
+    return [value for value in wanted if value not in found]
+
+
+def ids_by_key(cursor, table, key_column, id_column, keys, chunk_size=None):
+    """
+    Recupera los IDs generados releyendo por la llave natural `key_column`,
+    con una consulta IN (...) por lote. Devuelve los IDs en el orden de `keys`.
+
+    No depende de que los AUTO_INCREMENT sean consecutivos, por lo que es
+    correcto con escritores concurrentes y cualquier innodb_autoinc_lock_mode.
+    La llave debe ser única (ver migrations/0002_indices.sql): si aparece en
+    más de una fila no se puede saber cuál se insertó y se lanza un error.
+    """
+    found = {}
+    for chunk in chunks(sorted(set(keys)), chunk_size or FK_CHECK_CHUNK_SIZE):
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(
+            f"SELECT {key_column}, {id_column} FROM {table} WHERE {key_column} IN ({placeholders})",
+            tuple(chunk)
+        )
+        for row in cursor.fetchall():
+            key, id_ = (row[key_column], row[id_column]) if isinstance(row, dict) else row
+            if key in found:
+                raise RuntimeError(f"{key_column} {key} aparece en más de una fila de {table}")
+            found[key] = id_
+    missing = [key for key in keys if key not in found]
+    if missing:
+        raise RuntimeError(f"No se encontraron en {table} las filas con {key_column} {missing}")
+    return [found[key] for key in keys]
+
+
+def raise_duplicated_keys(field, keys):
+    """
+    Rechaza con 422 una petición que repite la llave natural `field`
+    """
+    seen, duplicated = set(), set()
+    for key in keys:
+        if key in seen:
+            duplicated.add(key)
+        seen.add(key)
+    if duplicated:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "mensaje": f"Valores repetidos de {field} en la petición",
+                "duplicados": sorted(duplicated)
+            }
+        )
+
+
+def raise_existing_keys(cursor, table, field, keys):
+    """
+    Rechaza con 409 una petición cuyos valores de la llave natural `field`
+    ya existen en `table`, listándolos
+    """
+    missing = set(find_missing_ids(cursor, table, field, keys))
+    existing = sorted(set(keys) - missing)
+    if existing:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "mensaje": f"Ya existen registros con esos valores de {field}",
+                "existentes": existing
+            }
+        )
+
+
+def raise_missing_references(missing):
+    """
+    Lanza un único 404 con todas las referencias inexistentes, por campo
+    """
+    missing = {field: ids for field, ids in missing.items() if ids}
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "mensaje": "Referencias no encontradas",
+                "faltantes": missing
+            }
+        )
+
+
+def compact_result(created, id_field):
+    """
+    Resultado compacto por fila: posición en la petición e ID generado
+    """
+    return [
+        ResultadoBulk(fila=idx, id=getattr(item, id_field))
+        for idx, item in enumerate(created)
+    ]
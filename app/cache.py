@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from fastapi import Request, Response
+from .singleflight import read_flight
+
+# Configuración de la caché de datos de referencia
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+
+@dataclass
+class CachedBody:
+    body: bytes
+    etag: str
+    headers: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_body(cls, body, headers=None):
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        return cls(body=body, etag=etag, headers=headers or {})
+
+    def to_response(self, request: Request):
+        """
+        Respuesta JSON con ETag; 304 si el cliente ya tiene esta versión
+        """
+        headers = {**self.headers, "ETag": self.etag}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+    def dumps(self):
+        return json.dumps({
+            "body": self.body.decode(),
+            "etag": self.etag,
+            "headers": self.headers
+        })
+
+    @classmethod
+    def loads(cls, raw):
+        data = json.loads(raw)
+        return cls(body=data["body"].encode(), etag=data["etag"], headers=data["headers"])
+
+
+class LRUCache:
+    """
+    Caché en proceso con expiración por TTL y desalojo LRU
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # llave -> (valor, expira)
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (ttl or self.ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MemorySharedBackend:
+    """
+    Sustituto local del backend compartido, con la misma interfaz que RedisBackend
+    """
+
+    def __init__(self):
+        self._values = {}
+
+    async def get(self, key):
+        value, expires = self._values.get(key, (None, None))
+        if expires is not None and expires < time.monotonic():
+            self._values.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key, value, ttl):
+        self._values[key] = (value, time.monotonic() + ttl)
+
+    async def incr(self, key):
+        value = int((await self.get(key)) or 0) + 1
+        self._values[key] = (str(value), None)
+        return value
+
+    async def add(self, key, value, ttl):
+        if await self.get(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key):
+        self._values.pop(key, None)
+
+
+class RedisBackend:
+    """
+    Backend compartido entre workers; requiere el paquete opcional `redis`
+    """
+
+    def __init__(self, url):
+        import redis.asyncio as redis
+        self._client = redis.from_url(url)
+
+    async def get(self, key):
+        value = await self._client.get(key)
+        return value.decode() if value is not None else None
+
+    async def set(self, key, value, ttl):
+        await self._client.set(key, value, ex=max(1, int(ttl)))
+
+    async def incr(self, key):
+        return await self._client.incr(key)
+
+    async def add(self, key, value, ttl):
+        """
+        Guarda solo si la llave no existe (SET NX); indica si la guardó
+        """
+        return bool(await self._client.set(key, value, ex=max(1, int(ttl)), nx=True))
+
+    async def delete(self, key):
+        await self._client.delete(key)
+
+
+class ReadThroughCache:
+    """
+    Caché de lectura en dos niveles: LRU en proceso y, opcionalmente, un
+    backend compartido. Invalidar un espacio de nombres incrementa su versión,
+    que forma parte de cada llave, así que no hace falta recorrer entradas.
+    Con `flight`, los fallos simultáneos de una misma llave ejecutan una sola carga.
+    """
+
+    def __init__(self, local=None, shared=None, ttl=CACHE_TTL, flight=None):
+        self.local = local or LRUCache(ttl=ttl)
+        self.shared = shared
+        self.flight = flight
+        self.ttl = ttl
+        self._versions = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def _version(self, namespace):
+        if self.shared is not None:
+            return int(await self.shared.get(f"version:{namespace}") or 0)
+        return self._versions.get(namespace, 0)
+
+    async def get_or_load(self, namespace, params, loader):
+        version = await self._version(namespace)
+        key = f"{namespace}:{version}:{json.dumps(params, default=str)}"
+
+        entry = self.local.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        if self.shared is not None:
+            raw = await self.shared.get(key)
+            if raw is not None:
+                entry = CachedBody.loads(raw)
+                self.local.set(key, entry)
+                self.hits += 1
+                self.shared_hits += 1
+                return entry
+
+        self.misses += 1
+        if self.flight is None:
+            return await self._load(key, loader)
+        return await self.flight.do(("cache", key), lambda: self._load(key, loader))
+
+    async def _load(self, key, loader):
+        entry = await loader()
+        self.local.set(key, entry)
+        if self.shared is not None:
+            await self.shared.set(key, entry.dumps(), self.ttl)
+        return entry
+
+    async def invalidate(self, namespace):
+        self.invalidations += 1
+        self._versions[namespace] = self._versions.get(namespace, 0) + 1
+        if self.shared is not None:
+            await self.shared.incr(f"version:{namespace}")
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+            "invalidations": self.invalidations,
+            "entries": len(self.local)
+        }
+
+
+def shared_backend():
+    if CACHE_REDIS_URL == "memory":
+        return MemorySharedBackend()
+    if CACHE_REDIS_URL:
+        return RedisBackend(CACHE_REDIS_URL)
+    return None
+
+
+# Caché de datos de referencia (especialistas, medicamentos)
+reference_cache = ReadThroughCache(shared=shared_backend(), flight=read_flight)
@@ -0,0 +1,148 @@
+import asyncio
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Respuestas más pequeñas que esto (bytes) se envían sin comprimir
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# Cuerpos desde este tamaño se comprimen fuera del event loop
+OFFLOAD_BYTES = 64 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def _gzip(body):
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _brotli(body):
+    return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+
+
+def available_encodings():
+    encodings = {"gzip": _gzip}
+    if brotli is not None:
+        encodings["br"] = _brotli
+    return encodings
+
+
+def negotiate(accept_encoding, encodings):
+    """
+    Codificación a usar según Accept-Encoding: la de mayor q entre las
+    disponibles, prefiriendo brotli en empate; None si ninguna es aceptable
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name] = q
+    best, best_q = None, 0.0
+    for name in ("br", "gzip"):
+        if name not in encodings:
+            continue
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class Compressor:
+    """
+    Codificaciones disponibles y contadores de bytes antes y después de comprimir
+    """
+
+    def __init__(self, min_bytes=COMPRESSION_MIN_BYTES):
+        self.min_bytes = min_bytes
+        self.encodings = available_encodings()
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    async def compress(self, encoding, body):
+        compress = self.encodings[encoding]
+        if len(body) >= OFFLOAD_BYTES:
+            compressed = await asyncio.to_thread(compress, body)
+        else:
+            compressed = compress(body)
+        self.responses += 1
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+        return compressed
+
+    def stats(self):
+        return {"responses": self.responses, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+
+compressor = Compressor()
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime con gzip o brotli (si el paquete está
+    instalado) las respuestas JSON y de texto de un solo cuerpo que superan
+    COMPRESSION_MIN_BYTES. Las respuestas por streaming (exportaciones,
+    /cambios en SSE) pasan sin tocar para no retener sus fragmentos.
+    """
+
+    def __init__(self, app, compressor=compressor):
+        self.app = app
+        self.compressor = compressor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+        encoding = negotiate(accept, self.compressor.encodings) if accept else None
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough or message["type"] not in ("http.response.start", "http.response.body"):
+                return await send(message)
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            passthrough = True
+            body = message.get("body", b"")
+            headers = {name.lower(): value for name, value in start["headers"]}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            if (
+                message.get("more_body", False)
+                or b"content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(start)
+                return await send(message)
+            # El cuerpo depende de Accept-Encoding aunque esta vez no se comprima
+            start["headers"] = list(start["headers"]) + [(b"vary", b"Accept-Encoding")]
+            if encoding is not None and len(body) >= self.compressor.min_bytes:
+                body = await self.compressor.compress(encoding, body)
+                start["headers"] = [
+                    (name, value) for name, value in start["headers"] if name.lower() != b"content-length"
+                ] + [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode())
+                ]
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
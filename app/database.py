@@ -1,13 +1,594 @@
 import os
-import mysql.connector
+import asyncio
+import functools
+from contextlib import AsyncExitStack, asynccontextmanager
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from .backends import get_backend
+from .cache import LRUCache
+from .metrics import CONNECTION_ACQUIRE, InstrumentedConnection
 
 load_dotenv()
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host=os.getenv("DB_HOST"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        database=os.getenv("DB_NAME")
-    )
\ No newline at end of file
+# Configuración del pool de conexiones (variables de entorno opcionales)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "3600"))
+DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", "30"))
+
+# Réplicas de lectura como "host" o "host:puerto" separados por comas; cada
+# una tiene su propio pool con la misma configuración que el primario
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+# Retraso de replicación máximo (segundos) para seguir recibiendo lecturas; 0 lo desactiva
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "30"))
+# Tras una escritura, las lecturas del mismo cliente van al primario durante este tiempo
+DB_READ_YOUR_WRITES_WINDOW = float(os.getenv("DB_READ_YOUR_WRITES_WINDOW", "5"))
+DB_READ_YOUR_WRITES_MAX_CLIENTS = int(os.getenv("DB_READ_YOUR_WRITES_MAX_CLIENTS", "10000"))
+
+# Ejecutor dedicado para las llamadas bloqueantes del driver MySQL
+DB_EXECUTOR_WORKERS = int(os.getenv(
+    "DB_EXECUTOR_WORKERS", str((DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW) * (1 + len(DB_REPLICA_HOSTS)))
+))
+DB_EXECUTOR_MAX_PENDING = int(os.getenv("DB_EXECUTOR_MAX_PENDING", "200"))
+
+READ_METHODS = ("GET", "HEAD")
+CLIENT_ID_HEADER = "x-client-id"
+# Con "primary" la petición se lee del primario sin importar el pin
+CONSISTENCY_HEADER = "x-consistency"
+
+
+def get_db_connection(host=None):
+    """
+    Conexión del motor configurado (ver backends.py) al primario o a la réplica `host`
+    """
+    return get_backend().connect(host)
+
+
+class PoolTimeoutError(Exception):
+    """No se pudo obtener una conexión del pool dentro del tiempo de espera"""
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones MySQL con tamaño fijo más un margen de desborde.
+
+    Las conexiones inactivas se verifican con ping antes de entregarse y se
+    reemplazan cuando superan el tiempo de reciclaje.
+    """
+
+    def __init__(
+        self,
+        connect=get_db_connection,
+        size=DB_POOL_SIZE,
+        max_overflow=DB_POOL_MAX_OVERFLOW,
+        timeout=DB_POOL_TIMEOUT,
+        recycle=DB_POOL_RECYCLE,
+        ping_interval=DB_POOL_PING_INTERVAL
+    ):
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conexion, ultimo_uso)
+        self._created_at = {}
+        self._total = 0
+        self._in_use = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._stale_replaced = 0
+
+    def _open(self):
+        conn = self._connect()
+        self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, last_used):
+        now = time.monotonic()
+        if self.recycle and now - self._created_at.get(id(conn), now) > self.recycle:
+            return False
+        if now - last_used < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """
+        Obtiene una conexión del pool, esperando como máximo `timeout` segundos
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._cond:
+            if self._closed:
+                raise PoolTimeoutError("El pool de conexiones está cerrado")
+            while not self._idle and self._total >= self.size + self.max_overflow:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No hay conexiones disponibles tras {self.timeout}s"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+            if self._idle:
+                conn, last_used = self._idle.pop()
+            else:
+                conn, last_used = None, None
+                self._total += 1
+            self._in_use += 1
+
+        if conn is not None and not self._is_healthy(conn, last_used):
+            # Conexión vencida: se reemplaza por una nueva fuera del lock
+            self._discard(conn)
+            self._stale_replaced += 1
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+        elapsed = time.monotonic() - start
+        with self._cond:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+            self._wait_time_total += elapsed
+            self._wait_time_max = max(self._wait_time_max, elapsed)
+        return conn
+
+    def release(self, conn):
+        """
+        Devuelve una conexión al pool, descartándola si quedó inservible
+        """
+        reusable = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            reusable = False
+
+        with self._cond:
+            self._in_use -= 1
+            if reusable and not self._closed and len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._total -= 1
+                self._discard(conn)
+            self._cond.notify()
+
+    def close(self):
+        """
+        Cierra todas las conexiones inactivas; las que estén en uso se cierran al devolverse
+        """
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._total -= 1
+                self._discard(conn)
+            self._cond.notify_all()
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "total": self._total,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "stale_replaced": self._stale_replaced,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_avg": round(self._wait_time_total / self._checkouts, 6) if self._checkouts else 0.0,
+                "wait_time_max": round(self._wait_time_max, 6)
+            }
+
+
+class ReplicaLagError(Exception):
+    """La réplica está demasiado atrasada respecto al primario"""
+
+
+def check_replica(conn):
+    """
+    Chequeo de salud de una réplica: responde y su retraso no supera DB_REPLICA_MAX_LAG
+    """
+    conn.ping(reconnect=False)
+    if not DB_REPLICA_MAX_LAG:
+        return
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SHOW REPLICA STATUS")
+        status = cursor.fetchone()
+    finally:
+        cursor.close()
+    if status is None:
+        # Sin replicación configurada no hay retraso que medir
+        return
+    lag = status.get("Seconds_Behind_Source")
+    if lag is None or lag > DB_REPLICA_MAX_LAG:
+        raise ReplicaLagError(f"Retraso de replicación: {lag}")
+
+
+class ReplicaSet:
+    """
+    Réplicas de lectura, cada una con su propio pool.
+
+    Las lecturas van a la réplica sana con menos conexiones en uso (en empate,
+    por turnos). Una réplica sale de la rotación cuando falla al conectar o en
+    el chequeo periódico, y vuelve cuando el chequeo la encuentra sana; si no
+    queda ninguna, las lecturas van al primario.
+    """
+
+    def __init__(self, pools, check=check_replica):
+        self.pools = list(pools)
+        self._check = check
+        self._lock = threading.Lock()
+        self._healthy = [True] * len(self.pools)
+        self._errors = [None] * len(self.pools)
+        self._reads = [0] * len(self.pools)
+        self._next = 0
+        self.fallbacks = 0
+
+    def __len__(self):
+        return len(self.pools)
+
+    def choose(self):
+        """
+        Pool para la siguiente lectura, o None si no hay réplicas sanas
+        """
+        with self._lock:
+            best = None
+            for offset in range(len(self.pools)):
+                index = (self._next + offset) % len(self.pools)
+                if not self._healthy[index]:
+                    continue
+                if best is None or self.pools[index].in_use < self.pools[best].in_use:
+                    best = index
+            if best is None:
+                self.fallbacks += 1
+                return None
+            self._next = (best + 1) % len(self.pools)
+            self._reads[best] += 1
+            return self.pools[best]
+
+    def mark_down(self, pool, error):
+        with self._lock:
+            index = self.pools.index(pool)
+            self._healthy[index] = False
+            self._errors[index] = str(error)
+
+    def check(self, index):
+        """
+        Chequea una réplica con una conexión de su propio pool
+        """
+        pool = self.pools[index]
+        try:
+            conn = pool.acquire()
+            try:
+                self._check(conn)
+            finally:
+                pool.release(conn)
+        except Exception as e:
+            self.mark_down(pool, e)
+            return
+        with self._lock:
+            self._healthy[index] = True
+            self._errors[index] = None
+
+    def check_all(self):
+        for index in range(len(self.pools)):
+            self.check(index)
+
+    def close(self):
+        for pool in self.pools:
+            pool.close()
+
+    def stats(self):
+        with self._lock:
+            healthy, errors, reads = list(self._healthy), list(self._errors), list(self._reads)
+        return {
+            "fallbacks": self.fallbacks,
+            "replicas": [
+                {**pool.stats(), "healthy": healthy[i], "error": errors[i], "reads": reads[i]}
+                for i, pool in enumerate(self.pools)
+            ]
+        }
+
+
+_pool = None
+_replicas = None
+
+
+def _backend_pool(host=None):
+    backend = get_backend()
+    connect = lambda: InstrumentedConnection(backend.connect(host))
+    if backend.single_connection:
+        return ConnectionPool(connect=connect, size=1, max_overflow=0)
+    return ConnectionPool(connect=connect)
+
+
+def init_pool():
+    global _pool, _replicas
+    if _pool is None:
+        get_backend().setup()
+        _pool = _backend_pool()
+    if _replicas is None:
+        _replicas = ReplicaSet(_backend_pool(host) for host in DB_REPLICA_HOSTS)
+    return _pool
+
+
+def close_pool():
+    global _pool, _replicas
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+    if _replicas is not None:
+        _replicas.close()
+        _replicas = None
+
+
+def get_pool():
+    return _pool if _pool is not None else init_pool()
+
+
+def get_replicas():
+    if _replicas is None:
+        init_pool()
+    return _replicas
+
+
+_checks_task = None
+
+
+async def _check_replicas_periodically():
+    while True:
+        await asyncio.sleep(DB_REPLICA_CHECK_INTERVAL)
+        # El chequeo no pasa por el límite de pendientes: debe correr aunque haya carga
+        await _submit(get_replicas().check_all)
+
+
+def start_replica_checks():
+    global _checks_task
+    if _checks_task is None and len(get_replicas()):
+        _checks_task = asyncio.create_task(_check_replicas_periodically())
+
+
+async def stop_replica_checks():
+    global _checks_task
+    if _checks_task is not None:
+        _checks_task.cancel()
+        try:
+            await _checks_task
+        except asyncio.CancelledError:
+            pass
+        _checks_task = None
+
+
+# Clientes que escribieron hace menos de DB_READ_YOUR_WRITES_WINDOW segundos.
+# Es por proceso: con varios workers, el cliente que necesite leer lo recién
+# escrito en cualquiera de ellos puede enviar X-Consistency: primary.
+_pinned_clients = LRUCache(max_entries=DB_READ_YOUR_WRITES_MAX_CLIENTS, ttl=DB_READ_YOUR_WRITES_WINDOW)
+
+
+def client_key(request: Request):
+    client_id = request.headers.get(CLIENT_ID_HEADER)
+    if client_id:
+        return f"id:{client_id}"
+    return f"ip:{request.client.host if request.client else ''}"
+
+
+def pin_to_primary(request: Request):
+    if DB_READ_YOUR_WRITES_WINDOW > 0:
+        _pinned_clients.set(client_key(request), True)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Middleware ASGI que fija al primario al cliente de cada escritura justo
+    antes de enviarle la respuesta. La salida de las dependencias corre
+    después de enviarla, así que ahí una lectura hecha apenas llega la
+    respuesta todavía podría ir a una réplica atrasada.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            return await self.app(scope, receive, send)
+        request = Request(scope)
+
+        async def send_pinned(message):
+            if message["type"] == "http.response.start":
+                pin_to_primary(request)
+            await send(message)
+
+        await self.app(scope, receive, send_pinned)
+
+
+def reads_from_replica(request: Request | None):
+    """
+    Si la petición puede leerse desde una réplica: solo lecturas, de clientes
+    que no escribieron recientemente ni pidieron leer del primario
+    """
+    if request is None or request.method not in READ_METHODS:
+        return False
+    if request.headers.get(CONSISTENCY_HEADER, "").lower() == "primary":
+        return False
+    return _pinned_clients.get(client_key(request)) is None
+
+
+_executor = None
+_checkout_slots = None  # pool -> semáforo de cupos
+_pending = 0
+
+
+def init_executor():
+    """
+    Crea el ejecutor de hilos de la base de datos y los cupos de checkout.
+
+    Los cupos limitan las conexiones prestadas de cada pool (primario y
+    réplicas) a `size + max_overflow`, de modo que la espera por una conexión
+    ocurre en el event loop y nunca ocupa un hilo del ejecutor.
+    """
+    global _executor, _checkout_slots
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=DB_EXECUTOR_WORKERS,
+            thread_name_prefix="db"
+        )
+        _checkout_slots = {
+            pool: asyncio.Semaphore(pool.size + pool.max_overflow)
+            for pool in [get_pool(), *get_replicas().pools]
+        }
+    return _executor
+
+
+def shutdown_executor():
+    global _executor, _checkout_slots
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        _checkout_slots = None
+
+
+def _submit(fn, *args, **kwargs):
+    executor = _executor if _executor is not None else init_executor()
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+async def run_db(fn, *args, **kwargs):
+    """
+    Ejecuta una función bloqueante de acceso a datos en el ejecutor de la base
+    de datos sin bloquear el event loop
+    """
+    global _pending
+    if _pending >= DB_EXECUTOR_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Demasiadas operaciones pendientes en la base de datos"
+        )
+    _pending += 1
+    try:
+        return await _submit(fn, *args, **kwargs)
+    finally:
+        _pending -= 1
+
+
+def executor_stats():
+    return {
+        "workers": DB_EXECUTOR_WORKERS,
+        "max_pending": DB_EXECUTOR_MAX_PENDING,
+        "pending": _pending
+    }
+
+
+def _slots_for(pool):
+    if _checkout_slots is None:
+        init_executor()
+    slots = _checkout_slots.get(pool)
+    if slots is None:
+        # Pool creado después del ejecutor (por ejemplo, en los benchmarks)
+        slots = _checkout_slots[pool] = asyncio.Semaphore(pool.size + pool.max_overflow)
+    return slots
+
+
+@asynccontextmanager
+async def _checkout(pool):
+    """
+    Presta una conexión de `pool` y la devuelve al terminar
+    """
+    slots = _slots_for(pool)
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=pool.timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail=f"No hay conexiones disponibles tras {pool.timeout}s"
+        )
+    try:
+        try:
+            conn = await run_db(pool.acquire)
+        except PoolTimeoutError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        CONNECTION_ACQUIRE.observe(time.perf_counter() - start)
+        try:
+            yield conn
+        finally:
+            # La devolución no pasa por el límite de pendientes para no perder conexiones
+            await _submit(pool.release, conn)
+    finally:
+        slots.release()
+
+
+@asynccontextmanager
+async def db_session(request: Request | None = None):
+    """
+    Conexión para la petición `request`: las lecturas van a una réplica sana
+    si la hay y todo lo demás al primario. Sin `request` la conexión es del
+    primario (escrituras y tareas de fondo).
+    """
+    replica = get_replicas().choose() if reads_from_replica(request) else None
+    async with AsyncExitStack() as stack:
+        conn = None
+        if replica is not None:
+            try:
+                conn = await stack.enter_async_context(_checkout(replica))
+            except HTTPException:
+                raise
+            except Exception as e:
+                # La réplica no acepta conexiones: sale de la rotación hasta el
+                # próximo chequeo y esta lectura va al primario
+                get_replicas().mark_down(replica, e)
+        if conn is None:
+            conn = await stack.enter_async_context(_checkout(get_pool()))
+        yield conn
+
+
+async def get_db(request: Request):
+    """
+    Dependencia de FastAPI: entrega una conexión del pool que corresponde a la
+    petición (ver db_session) y la devuelve al terminar
+    """
+    async with db_session(request) as conn:
+        yield conn
@@ -0,0 +1,321 @@
+"""
+Motor embebido sobre SQLite, para instalaciones pequeñas sin servidor MySQL,
+pruebas en proceso y benchmarks.
+
+Expone la parte de la interfaz de mysql.connector que usa la aplicación
+(cursor(dictionary=..., buffered=...), execute, executemany, fetch*,
+lastrowid, rowcount, commit, rollback, ping, in_transaction) y traduce al
+dialecto de SQLite las construcciones de MySQL de las consultas comunes a
+los dos motores: parámetros %s, FOR UPDATE y ON DUPLICATE KEY UPDATE. La
+búsqueda de texto completo, que sí difiere, la escriben en SQLite sus
+repositorios (app/repositories.py) con la función match_against.
+"""
+import re
+import sqlite3
+import unicodedata
+from datetime import date, datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pacientes (
+    id_paciente INTEGER PRIMARY KEY AUTOINCREMENT,
+    documento TEXT NOT NULL UNIQUE,
+    nombre TEXT NOT NULL,
+    fecha_nacimiento DATE NOT NULL,
+    telefono TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pacientes_nombre ON pacientes (nombre, id_paciente);
+
+CREATE TABLE IF NOT EXISTS especialistas (
+    id_especialista INTEGER PRIMARY KEY AUTOINCREMENT,
+    documento TEXT NOT NULL UNIQUE,
+    nombre TEXT NOT NULL,
+    especialidad TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_especialistas_nombre ON especialistas (nombre, id_especialista);
+CREATE INDEX IF NOT EXISTS idx_especialistas_especialidad_nombre ON especialistas (especialidad, nombre, id_especialista);
+
+CREATE TABLE IF NOT EXISTS citas (
+    id_cita INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_paciente INTEGER NOT NULL REFERENCES pacientes (id_paciente),
+    id_especialista INTEGER NOT NULL REFERENCES especialistas (id_especialista),
+    fecha_hora DATETIME NOT NULL,
+    estado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_citas_fecha_hora ON citas (fecha_hora, id_cita);
+CREATE INDEX IF NOT EXISTS idx_citas_estado_fecha_hora ON citas (estado, fecha_hora, id_cita);
+CREATE INDEX IF NOT EXISTS idx_citas_paciente_fecha_hora ON citas (id_paciente, fecha_hora);
+CREATE INDEX IF NOT EXISTS idx_citas_especialista_fecha_hora ON citas (id_especialista, fecha_hora);
+
+CREATE TABLE IF NOT EXISTS medicamentos (
+    id_medicamento INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    descripcion TEXT NOT NULL,
+    stock INTEGER NOT NULL CHECK (stock >= 0)
+);
+CREATE INDEX IF NOT EXISTS idx_medicamentos_nombre ON medicamentos (nombre, id_medicamento);
+CREATE INDEX IF NOT EXISTS idx_medicamentos_stock ON medicamentos (stock, id_medicamento);
+
+CREATE TABLE IF NOT EXISTS diagnosticos (
+    id_diagnostico INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_cita INTEGER NOT NULL REFERENCES citas (id_cita),
+    id_paciente INTEGER NOT NULL REFERENCES pacientes (id_paciente),
+    descripcion TEXT NOT NULL,
+    fecha_diagnostico DATE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_diagnosticos_cita ON diagnosticos (id_cita);
+CREATE INDEX IF NOT EXISTS idx_diagnosticos_paciente_fecha ON diagnosticos (id_paciente, fecha_diagnostico);
+CREATE INDEX IF NOT EXISTS idx_diagnosticos_fecha ON diagnosticos (fecha_diagnostico, id_diagnostico);
+
+CREATE TABLE IF NOT EXISTS formulas (
+    id_formula INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_diagnostico INTEGER NOT NULL REFERENCES diagnosticos (id_diagnostico),
+    id_medicamento INTEGER NOT NULL REFERENCES medicamentos (id_medicamento),
+    dosis TEXT NOT NULL,
+    duracion INTEGER NOT NULL,
+    cantidad INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_formulas_diagnostico ON formulas (id_diagnostico);
+CREATE INDEX IF NOT EXISTS idx_formulas_medicamento ON formulas (id_medicamento);
+
+CREATE TABLE IF NOT EXISTS movimientos_stock (
+    id_movimiento INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_medicamento INTEGER NOT NULL REFERENCES medicamentos (id_medicamento),
+    cantidad INTEGER NOT NULL,
+    stock_resultante INTEGER NOT NULL,
+    motivo TEXT NOT NULL,
+    id_formula INTEGER NULL REFERENCES formulas (id_formula),
+    creado_en DATETIME NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_movimientos_stock_medicamento ON movimientos_stock (id_medicamento, id_movimiento);
+
+CREATE TABLE IF NOT EXISTS est_citas_dia (
+    dia DATE NOT NULL,
+    id_especialista INTEGER NOT NULL,
+    especialidad TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (dia, id_especialista, estado)
+);
+CREATE INDEX IF NOT EXISTS idx_est_citas_dia_especialidad ON est_citas_dia (especialidad, dia);
+
+CREATE TABLE IF NOT EXISTS est_medicamentos (
+    id_medicamento INTEGER PRIMARY KEY REFERENCES medicamentos (id_medicamento),
+    formulas INTEGER NOT NULL,
+    unidades INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_est_medicamentos_unidades ON est_medicamentos (unidades);
+
+CREATE TABLE IF NOT EXISTS est_diagnosticos_mes (
+    mes DATE NOT NULL,
+    especialidad TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (mes, especialidad)
+);
+
+CREATE TABLE IF NOT EXISTS cambios (
+    id_cambio INTEGER PRIMARY KEY AUTOINCREMENT,
+    entidad TEXT NOT NULL,
+    id_registro INTEGER NOT NULL,
+    operacion TEXT NOT NULL,
+    datos TEXT NOT NULL,
+    creado_en DATETIME NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS import_jobs (
+    id_job TEXT PRIMARY KEY,
+    entidad TEXT NOT NULL,
+    formato TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    bytes_recibidos INTEGER NOT NULL DEFAULT 0,
+    filas_procesadas INTEGER NOT NULL DEFAULT 0,
+    filas_insertadas INTEGER NOT NULL DEFAULT 0,
+    filas_con_error INTEGER NOT NULL DEFAULT 0,
+    error TEXT NULL,
+    creado_en DATETIME NOT NULL,
+    iniciado_en DATETIME NULL,
+    actualizado_en DATETIME NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS import_job_errores (
+    id_job TEXT NOT NULL REFERENCES import_jobs (id_job),
+    fila INTEGER NOT NULL,
+    error TEXT NOT NULL,
+    PRIMARY KEY (id_job, fila)
+);
+"""
+
+# Mismo formato que str() de date/datetime, comparable con los tokens de paginación
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=" "))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+# Las columnas DATE y DATETIME se leen como date/datetime, igual que con MySQL
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+
+# Sentencias preparadas que SQLite conserva por conexión
+STATEMENT_CACHE_SIZE = 256
+
+_WORD = re.compile(r"\w+")
+
+
+def _fold(text):
+    """
+    Minúsculas y sin tildes, como la intercalación utf8mb4_0900_ai_ci
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def match_against(text, query):
+    """
+    Equivalente de MATCH ... AGAINST en modo booleano para las consultas que
+    arma search.fulltext_terms: cada término con + es obligatorio y con *
+    se busca como prefijo. Devuelve la fracción de términos encontrados
+    (0 si falta alguno obligatorio).
+    """
+    if text is None or not query:
+        return 0.0
+    words = _WORD.findall(_fold(text))
+    terms = query.split()
+    found = 0
+    for term in terms:
+        required, prefix = term.startswith("+"), term.endswith("*")
+        term = _fold(term.strip("+*"))
+        if any(word.startswith(term) if prefix else word == term for word in words):
+            found += 1
+        elif required:
+            return 0.0
+    return found / len(terms)
+
+
+def translate(query):
+    """
+    Traduce al dialecto de SQLite una consulta escrita para MySQL
+    """
+    # INSERT ... AS nuevo ON DUPLICATE KEY UPDATE x = x + nuevo.x (MySQL 8)
+    if " AS nuevo ON DUPLICATE KEY UPDATE " in query:
+        query = query.replace(" AS nuevo ON DUPLICATE KEY UPDATE ", " ON CONFLICT DO UPDATE SET ")
+        query = query.replace("nuevo.", "excluded.")
+    return query.replace("%s", "?")
+
+
+class SQLiteCursor:
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection.cursor()
+        self._dictionary = dictionary
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def execute(self, query, params=None):
+        # SQLite no tiene bloqueos por fila: FOR UPDATE se emula tomando el
+        # bloqueo de escritura de toda la base al inicio de la transacción
+        if " FOR UPDATE" in query:
+            query = query.replace(" FOR UPDATE", "")
+            if not self._connection.in_transaction:
+                self._connection.execute("BEGIN IMMEDIATE")
+        query = translate(query)
+        self._cursor.execute(query, tuple(params or ()))
+        self.rowcount = self._cursor.rowcount
+        if self._cursor.lastrowid and query.lstrip().upper().startswith("INSERT"):
+            # MySQL informa el ID de la primera fila de un INSERT multi-fila
+            self.lastrowid = self._cursor.lastrowid - max(self.rowcount, 1) + 1
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(translate(query), [tuple(p) for p in seq_params])
+        self.rowcount = self._cursor.rowcount
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+def _connect(path):
+    """
+    `path` es un archivo o ":memory:"; en memoria, todas las conexiones del
+    proceso comparten la misma base mientras alguna siga abierta
+    """
+    memory = path == ":memory:"
+    connection = sqlite3.connect(
+        "file:hospital?mode=memory&cache=shared" if memory else path,
+        uri=memory,
+        check_same_thread=False,
+        timeout=30,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    if not memory:
+        connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    connection.create_function("match_against", 2, match_against, deterministic=True)
+    return connection
+
+
+class SQLiteConnection:
+    def __init__(self, path):
+        self._connection = _connect(path)
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    def cursor(self, dictionary=False, buffered=None):
+        return SQLiteCursor(self._connection, dictionary)
+
+    def discard_results(self):
+        # Los cursores de SQLite se pueden cerrar sin leer todas las filas
+        pass
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def ping(self, reconnect=False):
+        self._connection.execute("SELECT 1")
+
+    def close(self):
+        self._connection.close()
+
+
+# Llena las tablas de resumen de app/stats.py a partir de los datos cargados
+REBUILD_SUMMARIES = """
+DELETE FROM est_citas_dia;
+INSERT INTO est_citas_dia (dia, id_especialista, especialidad, estado, total)
+SELECT date(c.fecha_hora), c.id_especialista, e.especialidad, c.estado, COUNT(*)
+FROM citas c JOIN especialistas e ON c.id_especialista = e.id_especialista
+GROUP BY date(c.fecha_hora), c.id_especialista, e.especialidad, c.estado;
+
+DELETE FROM est_medicamentos;
+INSERT INTO est_medicamentos (id_medicamento, formulas, unidades)
+SELECT id_medicamento, COUNT(*), SUM(cantidad) FROM formulas GROUP BY id_medicamento;
+
+DELETE FROM est_diagnosticos_mes;
+INSERT INTO est_diagnosticos_mes (mes, especialidad, total)
+SELECT strftime('%Y-%m-01', d.fecha_diagnostico), e.especialidad, COUNT(*)
+FROM diagnosticos d
+JOIN citas c ON d.id_cita = c.id_cita
+JOIN especialistas e ON c.id_especialista = e.id_especialista
+GROUP BY strftime('%Y-%m-01', d.fecha_diagnostico), e.especialidad;
+"""
+
+
+def create_schema(path):
+    connection = _connect(path)
+    connection.executescript(SCHEMA)
+    connection.close()
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from .database import db_session, run_db
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_batch(rows, columns):
+    return "".join(
+        json.dumps({col: row[col] for col in columns}, default=_json_default, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def csv_batch(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            row[col].isoformat() if isinstance(row[col], (date, datetime)) else row[col]
+            for col in columns
+        ])
+    return buffer.getvalue()
+
+
+def csv_header(columns):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue()
+
+
+def _close_cursor(cursor, conn, exhausted):
+    """
+    Cierra el cursor de una exportación. Si la transmisión se cortó antes del
+    final (el cliente se desconectó), primero descarta las filas que el
+    servidor no alcanzó a enviar: con un cursor sin buffer el cierre fallaría
+    con "Unread result found"
+    """
+    if not exhausted:
+        conn.discard_results()
+    cursor.close()
+
+
+async def stream_query(query, columns, serialize, header=None, batch_size=EXPORT_BATCH_SIZE, request=None):
+    """
+    Genera el resultado de `query` por lotes usando un cursor sin buffer, de
+    modo que la memoria del servidor no depende del número de filas.
+
+    La conexión se obtiene aquí y no como dependencia porque debe seguir
+    abierta mientras se transmite la respuesta. Con `request` la conexión
+    puede ser de una réplica de lectura (ver db_session).
+    """
+    if header is not None:
+        yield header
+    async with db_session(request) as conn:
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        exhausted = False
+        try:
+            await run_db(cursor.execute, query)
+            while True:
+                rows = await run_db(cursor.fetchmany, batch_size)
+                if not rows:
+                    exhausted = True
+                    break
+                yield serialize(rows, columns)
+        finally:
+            await run_db(_close_cursor, cursor, conn, exhausted)
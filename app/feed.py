@@ -0,0 +1,125 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from .bulk import insert_many
+from .database import db_session, run_db
+from .pagination import encode_cursor, decode_cursor
+from .serialization import dumps, loads
+
+# Tiempo que se espera a un id_cambio faltante antes de darlo por descartado:
+# una transacción más lenta que esto puede confirmar cambios que el feed ya saltó
+CAMBIOS_GAP_WAIT = float(os.getenv("CAMBIOS_GAP_WAIT", "5"))
+# Cada cuánto vuelve a consultar el outbox un stream SSE sin cambios pendientes
+CAMBIOS_POLL_INTERVAL = float(os.getenv("CAMBIOS_POLL_INTERVAL", "1"))
+CAMBIOS_HEARTBEAT = float(os.getenv("CAMBIOS_HEARTBEAT", "15"))
+
+ENTIDADES = ("citas", "diagnosticos")
+CAMBIO_COLUMNS = ["entidad", "id_registro", "operacion", "datos", "creado_en"]
+
+
+def record_changes(cursor, entidad, operacion, key, rows):
+    """
+    Agrega al outbox una entrada por fila de `rows` (dicts con la forma en que
+    se listan), en la transacción de la escritura que las produjo
+    """
+    now = datetime.now()
+    insert_many(cursor, "cambios", CAMBIO_COLUMNS, [
+        (entidad, row[key], operacion, dumps(row).decode(), now)
+        for row in rows
+    ])
+
+
+def decode_since(token):
+    if not token:
+        return 0
+    try:
+        return int(decode_cursor(token, 1)[0])
+    except (HTTPException, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Parámetro 'since' inválido")
+
+
+def visible_changes(rows, since_id, now):
+    """
+    Prefijo de `rows` (ordenadas por id_cambio) que se puede entregar sin
+    perder cambios: los id_cambio se reservan al insertar pero se ven al
+    confirmar, así que un hueco reciente puede ser una transacción en curso
+    y el feed se detiene antes de él hasta que se llene o pase CAMBIOS_GAP_WAIT
+    """
+    visible = []
+    expected = since_id + 1
+    for row in rows:
+        if row["id_cambio"] != expected and now - row["creado_en"] < timedelta(seconds=CAMBIOS_GAP_WAIT):
+            break
+        visible.append(row)
+        expected = row["id_cambio"] + 1
+    return visible
+
+
+def read_changes(since_id, entidades, limit, db):
+    """
+    Cambios posteriores a `since_id` de las entidades pedidas y el id_cambio
+    hasta el que se leyó. Recorre el outbox por su llave primaria, así que el
+    costo depende del tamaño del lote y no de las tablas de origen; con filtro
+    de entidad el lote puede traer menos de `limit` cambios.
+    """
+    cursor = db.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT id_cambio, entidad, id_registro, operacion, datos, creado_en
+            FROM cambios
+            WHERE id_cambio > %s
+            ORDER BY id_cambio
+            LIMIT %s
+            """,
+            (since_id, limit)
+        )
+        rows = visible_changes(cursor.fetchall(), since_id, datetime.now())
+        last_id = rows[-1]["id_cambio"] if rows else since_id
+        changes = [
+            {**row, "datos": loads(row["datos"])}
+            for row in rows if row["entidad"] in entidades
+        ]
+        return changes, last_id
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al leer los cambios: {str(e)}")
+    finally:
+        cursor.close()
+
+
+async def fetch_changes(since_id, entidades, limit):
+    # Siempre del primario: en una réplica atrasada un hueco podría durar más
+    # que CAMBIOS_GAP_WAIT y el feed saltaría cambios que aún no llegan
+    async with db_session() as conn:
+        return await run_db(read_changes, since_id, entidades, limit, conn)
+
+
+def since_token(last_id):
+    return encode_cursor([last_id])
+
+
+async def event_stream(since_id, entidades, limit):
+    """
+    Server-Sent Events con cada cambio (el `id` del evento es el token para
+    reanudar con Last-Event-ID) y un comentario periódico mientras no hay
+    cambios, para que los proxies no cierren la conexión
+    """
+    idle = 0.0
+    while True:
+        changes, last_id = await fetch_changes(since_id, entidades, limit)
+        for change in changes:
+            yield (
+                f"id: {since_token(change['id_cambio'])}\n"
+                f"event: {change['entidad']}\n"
+                f"data: {dumps(change).decode()}\n\n"
+            )
+        if last_id != since_id:
+            since_id = last_id
+            idle = 0.0
+            continue
+        await asyncio.sleep(CAMBIOS_POLL_INTERVAL)
+        idle += CAMBIOS_POLL_INTERVAL
+        if idle >= CAMBIOS_HEARTBEAT:
+            idle = 0.0
+            yield ": ping\n\n"
@@ -0,0 +1,240 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+import zlib
+from dataclasses import dataclass, field
+from fastapi import HTTPException, Request, Response
+from .cache import LRUCache, shared_backend
+from .metrics import InstrumentedRoute
+
+# Respuestas guardadas por Idempotency-Key
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# Tiempo máximo que otro worker espera a que termine la ejecución en curso
+IDEMPOTENCY_LOCK_TTL = float(os.getenv("IDEMPOTENCY_LOCK_TTL", "60"))
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+# Cuerpos desde este tamaño se guardan comprimidos
+IDEMPOTENCY_COMPRESS_MIN_BYTES = 1024
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    body: bytes
+    compressed: bool = False
+    headers: dict = field(default_factory=dict)
+
+    @classmethod
+    def capture(cls, fingerprint, status_code, body, headers):
+        headers = {
+            name: value for name, value in headers.items()
+            if name.lower() not in ("content-length", "content-encoding")
+        }
+        compressed = len(body) >= IDEMPOTENCY_COMPRESS_MIN_BYTES
+        if compressed:
+            body = zlib.compress(body, 1)
+        return cls(fingerprint, status_code, body, compressed, headers)
+
+    def to_response(self):
+        body = zlib.decompress(self.body) if self.compressed else self.body
+        return Response(
+            content=body,
+            status_code=self.status_code,
+            headers={**self.headers, REPLAYED_HEADER: "true"}
+        )
+
+    def dumps(self):
+        return json.dumps({
+            "fingerprint": self.fingerprint,
+            "status_code": self.status_code,
+            "body": base64.b64encode(self.body).decode(),
+            "compressed": self.compressed,
+            "headers": self.headers
+        })
+
+    @classmethod
+    def loads(cls, raw):
+        data = json.loads(raw)
+        return cls(
+            data["fingerprint"], data["status_code"], base64.b64decode(data["body"]),
+            data["compressed"], data["headers"]
+        )
+
+
+class IdempotencyStore:
+    """
+    Respuestas por Idempotency-Key con la huella de la petición que las generó.
+
+    Las peticiones repetidas se responden desde aquí sin tocar la base de
+    datos; las que llegan mientras la original sigue en curso esperan su
+    resultado en vez de ejecutarse de nuevo. Con un backend compartido la
+    exclusión y las respuestas valen entre workers.
+    """
+
+    def __init__(self, local=None, shared=None, ttl=IDEMPOTENCY_TTL):
+        self.local = local or LRUCache(max_entries=IDEMPOTENCY_MAX_ENTRIES, ttl=ttl)
+        self.shared = shared
+        self.ttl = ttl
+        self._in_flight = {}
+        self.replays = 0
+        self.collapsed = 0
+        self.executions = 0
+        self.mismatches = 0
+
+    async def _lookup(self, key):
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            raw = await self.shared.get(f"idem:{key}")
+            if raw is not None:
+                entry = StoredResponse.loads(raw)
+                self.local.set(key, entry)
+        return entry
+
+    async def _store(self, key, entry):
+        self.local.set(key, entry)
+        if self.shared is not None:
+            await self.shared.set(f"idem:{key}", entry.dumps(), self.ttl)
+
+    def _replay(self, entry, fingerprint):
+        if entry.fingerprint != fingerprint:
+            self.mismatches += 1
+            raise HTTPException(
+                status_code=422,
+                detail="La Idempotency-Key ya se usó con una petición distinta"
+            )
+        self.replays += 1
+        return entry.to_response()
+
+    async def _claim_shared(self, key):
+        """
+        Toma el candado compartido de la llave; si otro worker lo tiene, espera
+        a que publique la respuesta. Devuelve la respuesta guardada o None si
+        este worker debe ejecutar la petición.
+        """
+        lock = f"idem:lock:{key}"
+        deadline = time.monotonic() + IDEMPOTENCY_LOCK_TTL
+        while not await self.shared.add(lock, "1", IDEMPOTENCY_LOCK_TTL):
+            entry = await self._lookup(key)
+            if entry is not None:
+                return entry
+            if time.monotonic() > deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="Hay una petición con la misma Idempotency-Key en curso"
+                )
+            await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+        return None
+
+    async def run(self, key, fingerprint, execute):
+        """
+        Ejecuta `execute` una sola vez por llave y devuelve su resultado, o la
+        respuesta guardada si la llave ya se usó con la misma petición.
+        `execute` devuelve (status_code, cuerpo, encabezados, resultado).
+        """
+        while True:
+            entry = await self._lookup(key)
+            if entry is not None:
+                return self._replay(entry, fingerprint)
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            # Misma llave en curso en este proceso: esperar a que termine y volver
+            # a mirar; si no dejó respuesta (error 5xx) la reintenta esta petición
+            self.collapsed += 1
+            await asyncio.shield(pending)
+
+        done = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = done
+        try:
+            if self.shared is not None:
+                entry = await self._claim_shared(key)
+                if entry is not None:
+                    self.collapsed += 1
+                    return self._replay(entry, fingerprint)
+            try:
+                self.executions += 1
+                status_code, body, headers, outcome = await execute()
+                if body is not None and status_code < 500:
+                    await self._store(key, StoredResponse.capture(fingerprint, status_code, body, headers))
+                return outcome
+            finally:
+                if self.shared is not None:
+                    await self.shared.delete(f"idem:lock:{key}")
+        finally:
+            del self._in_flight[key]
+            done.set_result(None)
+
+    def stats(self):
+        return {
+            "replays": self.replays,
+            "collapsed": self.collapsed,
+            "executions": self.executions,
+            "mismatches": self.mismatches,
+            "in_flight": len(self._in_flight),
+            "entries": len(self.local),
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations
+        }
+
+
+idempotency_store = IdempotencyStore(shared=shared_backend())
+
+
+class IdempotentRoute(InstrumentedRoute):
+    """
+    Ruta que, en los POST con encabezado Idempotency-Key, responde a los
+    reintentos con la respuesta guardada antes de resolver las dependencias
+    (y por lo tanto sin pedir una conexión a la base de datos)
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if "POST" not in self.methods:
+            return handler
+        # Las rutas sin cuerpo declarado (como la importación, que lo lee como
+        # stream) se identifican solo por ruta y parámetros
+        hash_body = self.body_field is not None
+
+        async def idempotent_handler(request: Request):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if key is None:
+                return await handler(request)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Idempotency-Key debe tener entre 1 y {MAX_KEY_LENGTH} caracteres"
+                )
+
+            digest = hashlib.sha256()
+            digest.update(f"{request.method} {request.url.path}?{request.url.query}\n".encode())
+            if hash_body:
+                digest.update(await request.body())
+
+            async def execute():
+                try:
+                    response = await handler(request)
+                except HTTPException as e:
+                    # Los rechazos (404, 409, 422...) también se repiten tal cual
+                    if e.status_code >= 500:
+                        raise
+                    body = json.dumps(
+                        {"detail": e.detail}, ensure_ascii=False, separators=(",", ":")
+                    ).encode()
+                    headers = {**(e.headers or {}), "content-type": "application/json"}
+                    return e.status_code, body, headers, e
+                return response.status_code, getattr(response, "body", None), response.headers, response
+
+            outcome = await idempotency_store.run(key, digest.hexdigest(), execute)
+            if isinstance(outcome, HTTPException):
+                raise outcome
+            return outcome
+
+        return idempotent_handler
@@ -0,0 +1,471 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from fastapi import HTTPException
+from pydantic import ValidationError
+from .bulk import insert_many
+from .cache import reference_cache
+from .database import db_session, run_db
+from .models import Especialista, Medicamento, Paciente
+from .stock import initial_movements, record_movements
+
+# Directorio donde se guarda cada archivo recibido hasta terminar su importación
+IMPORTS_DIR = os.getenv("IMPORTS_DIR", "imports")
+# Filas por transacción: el avance se confirma, y se reanuda, de a un lote
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "1"))
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(512 * 1024 * 1024)))
+# Espera antes de reintentar un lote cuando la base de datos está saturada (503)
+IMPORT_RETRY_DELAY = float(os.getenv("IMPORT_RETRY_DELAY", "1"))
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# Entidad -> (modelo de validación, tabla, columnas insertadas, espacio de caché)
+ENTITIES = {
+    "pacientes": (Paciente, "pacientes", ["documento", "nombre", "fecha_nacimiento", "telefono"], None),
+    "especialistas": (Especialista, "especialistas", ["documento", "nombre", "especialidad"], "especialistas"),
+    "medicamentos": (Medicamento, "medicamentos", ["nombre", "descripcion", "stock"], "medicamentos"),
+}
+
+
+def _record_initial_stock(cursor, ids, rows):
+    record_movements(cursor, initial_movements(ids, [stock for _, _, stock in rows]))
+
+
+# Escrituras adicionales por entidad, en la misma transacción que cada lote
+AFTER_INSERT = {"medicamentos": _record_initial_stock}
+
+PENDING_STATES = ("en_cola", "en_proceso")
+
+logger = logging.getLogger("app.imports")
+
+_queue = None
+_workers = []
+
+
+def detect_format(formato, content_type):
+    """
+    Formato explícito (`?formato=`) o, si no se indicó, el del Content-Type
+    """
+    if formato:
+        return formato
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    for name, expected in FORMATS.items():
+        if media_type == expected:
+            return name
+    raise HTTPException(
+        status_code=415,
+        detail="Indique formato=csv o formato=ndjson, o envíe Content-Type text/csv o application/x-ndjson"
+    )
+
+
+def _spool_path(id_job, formato):
+    return os.path.join(IMPORTS_DIR, f"{id_job}.{formato}")
+
+
+async def receive_upload(request, entidad, formato):
+    """
+    Copia el cuerpo de la petición a disco a medida que llega, sin cargarlo en
+    memoria, y registra el trabajo en cola. Devuelve el ID del trabajo.
+    """
+    if entidad not in ENTITIES:
+        raise HTTPException(status_code=404, detail=f"No se pueden importar {entidad}")
+    os.makedirs(IMPORTS_DIR, exist_ok=True)
+    id_job = uuid.uuid4().hex
+    path = _spool_path(id_job, formato)
+    received = 0
+    try:
+        with open(path, "wb") as spool:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > IMPORT_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"El archivo supera el máximo de {IMPORT_MAX_BYTES} bytes"
+                    )
+                spool.write(chunk)
+        async with db_session() as conn:
+            await run_db(_create_job, id_job, entidad, formato, path, received, conn)
+    except BaseException:
+        os.remove(path)
+        raise
+    await enqueue(id_job)
+    return id_job
+
+
+def _create_job(id_job, entidad, formato, path, received, conn):
+    cursor = conn.cursor()
+    try:
+        now = datetime.now()
+        cursor.execute(
+            """
+            INSERT INTO import_jobs
+                (id_job, entidad, formato, archivo, estado, bytes_recibidos, creado_en, actualizado_en)
+            VALUES (%s, %s, %s, %s, 'en_cola', %s, %s, %s)
+            """,
+            (id_job, entidad, formato, path, received, now, now)
+        )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al registrar la importación: {str(e)}")
+    finally:
+        cursor.close()
+
+
+def get_job(id_job, errores_limit, conn):
+    """
+    Estado de un trabajo con su avance, filas por segundo y los primeros
+    `errores_limit` errores por fila
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT id_job, entidad, formato, estado, bytes_recibidos, filas_procesadas,
+                   filas_insertadas, filas_con_error, error, creado_en, iniciado_en, actualizado_en
+            FROM import_jobs
+            WHERE id_job = %s
+            """,
+            (id_job,)
+        )
+        job = cursor.fetchone()
+        if not job:
+            raise HTTPException(status_code=404, detail="Importación no encontrada")
+
+        cursor.execute(
+            """
+            SELECT fila, error
+            FROM import_job_errores
+            WHERE id_job = %s
+            ORDER BY fila
+            LIMIT %s
+            """,
+            (id_job, errores_limit)
+        )
+        job["errores"] = cursor.fetchall()
+
+        started, updated = job["iniciado_en"], job["actualizado_en"]
+        elapsed = (updated - started).total_seconds() if started and updated else 0
+        job["filas_por_segundo"] = round(job["filas_procesadas"] / elapsed, 1) if elapsed > 0 else 0.0
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar la importación: {str(e)}")
+    finally:
+        cursor.close()
+
+
+def _mark_resumable(id_job, conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            UPDATE import_jobs
+            SET estado = 'en_cola', error = NULL, actualizado_en = %s
+            WHERE id_job = %s AND estado = 'fallido'
+            """,
+            (datetime.now(), id_job)
+        )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al reanudar la importación: {str(e)}")
+    finally:
+        cursor.close()
+
+
+async def resume(id_job):
+    """
+    Vuelve a encolar un trabajo fallido; continúa después del último lote confirmado
+    """
+    async with db_session() as conn:
+        job = await run_db(get_job, id_job, 0, conn)
+        if job["estado"] != "fallido":
+            raise HTTPException(
+                status_code=409,
+                detail=f"Solo se reanudan importaciones fallidas (estado actual: {job['estado']})"
+            )
+        await run_db(_mark_resumable, id_job, conn)
+    await enqueue(id_job)
+
+
+def _read_records(path, formato, skip):
+    """
+    Recorre el archivo registro a registro, saltando los `skip` ya procesados.
+    Entrega (fila, dict) o (fila, mensaje de error) si el registro no se pudo leer.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as source:
+        if formato == "csv":
+            for fila, record in enumerate(csv.DictReader(source), start=1):
+                if fila <= skip:
+                    continue
+                # En CSV una celda vacía equivale a un campo ausente
+                yield fila, {key: value for key, value in record.items() if key and value != ""}
+        else:
+            fila = 0
+            for line in source:
+                if not line.strip():
+                    continue
+                fila += 1
+                if fila <= skip:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield fila, f"JSON inválido: {e}"
+                    continue
+                if not isinstance(record, dict):
+                    yield fila, "Cada línea debe ser un objeto JSON"
+                    continue
+                yield fila, record
+
+
+def _validation_message(error):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'fila'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+def _next_chunk(records, model, columns):
+    """
+    Valida hasta IMPORT_CHUNK_SIZE registros con el modelo de la entidad.
+    Devuelve (filas válidas como [(fila, valores)], errores como [(fila, mensaje)]).
+    """
+    valid, errors = [], []
+    for fila, record in records:
+        if isinstance(record, str):
+            errors.append((fila, record))
+        else:
+            try:
+                item = model.model_validate(record)
+                valid.append((fila, tuple(getattr(item, column) for column in columns)))
+            except ValidationError as e:
+                errors.append((fila, _validation_message(e)))
+        if len(valid) + len(errors) >= IMPORT_CHUNK_SIZE:
+            break
+    return valid, errors
+
+
+def _insert_rows_individually(cursor, table, columns, valid):
+    """
+    Reintenta un lote fila a fila con savepoints para aislar las que fallan
+    (p. ej. un documento repetido) sin descartar el resto del lote
+    """
+    placeholders = ", ".join(["%s"] * len(columns))
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    ids, rows, errors = [], [], []
+    for fila, values in valid:
+        cursor.execute("SAVEPOINT fila_importada")
+        try:
+            cursor.execute(query, values)
+            ids.append(cursor.lastrowid)
+            rows.append(values)
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT fila_importada")
+            errors.append((fila, str(e)))
+    return ids, rows, errors
+
+
+def _import_chunk(id_job, records, entidad, conn):
+    """
+    Valida e inserta el siguiente lote, y en la misma transacción registra sus
+    errores y el avance del trabajo. Devuelve el número de registros leídos.
+    """
+    model, table, columns, _ = ENTITIES[entidad]
+    valid, errors = _next_chunk(records, model, columns)
+    processed = len(valid) + len(errors)
+    if not processed:
+        return 0
+
+    cursor = conn.cursor()
+    try:
+        rows = [values for _, values in valid]
+        try:
+            ids = insert_many(cursor, table, columns, rows)
+        except Exception:
+            conn.rollback()
+            ids, rows, row_errors = _insert_rows_individually(cursor, table, columns, valid)
+            errors = sorted(errors + row_errors)
+        inserted = len(ids)
+        if entidad in AFTER_INSERT and ids:
+            AFTER_INSERT[entidad](cursor, ids, rows)
+
+        if errors:
+            cursor.executemany(
+                "INSERT INTO import_job_errores (id_job, fila, error) VALUES (%s, %s, %s)",
+                [(id_job, fila, message) for fila, message in errors]
+            )
+        cursor.execute(
+            """
+            UPDATE import_jobs
+            SET filas_procesadas = filas_procesadas + %s,
+                filas_insertadas = filas_insertadas + %s,
+                filas_con_error = filas_con_error + %s,
+                actualizado_en = %s
+            WHERE id_job = %s
+            """,
+            (processed, inserted, len(errors), datetime.now(), id_job)
+        )
+        conn.commit()
+        return processed
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _start_job(id_job, conn):
+    """
+    Marca el trabajo en proceso y devuelve sus datos, o None si ya no está pendiente
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT entidad, formato, archivo, estado, filas_procesadas, iniciado_en FROM import_jobs WHERE id_job = %s",
+            (id_job,)
+        )
+        job = cursor.fetchone()
+        if not job or job["estado"] not in PENDING_STATES:
+            return None
+        now = datetime.now()
+        cursor.execute(
+            """
+            UPDATE import_jobs
+            SET estado = 'en_proceso', iniciado_en = COALESCE(iniciado_en, %s), actualizado_en = %s
+            WHERE id_job = %s
+            """,
+            (now, now, id_job)
+        )
+        conn.commit()
+        return job
+    finally:
+        cursor.close()
+
+
+def _finish_job(id_job, estado, error, conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE import_jobs SET estado = %s, error = %s, actualizado_en = %s WHERE id_job = %s",
+            (estado, error, datetime.now(), id_job)
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def _pending_jobs(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT id_job FROM import_jobs WHERE estado IN (%s, %s) ORDER BY creado_en",
+            PENDING_STATES
+        )
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+async def _run_chunk(id_job, records, entidad):
+    """
+    Procesa un lote con su propia conexión; si la base de datos está saturada
+    espera y reintenta en lugar de dar por fallido el trabajo
+    """
+    while True:
+        try:
+            async with db_session() as conn:
+                return await run_db(_import_chunk, id_job, records, entidad, conn)
+        except HTTPException as e:
+            if e.status_code != 503:
+                raise
+            await asyncio.sleep(IMPORT_RETRY_DELAY)
+
+
+async def _process(id_job):
+    async with db_session() as conn:
+        job = await run_db(_start_job, id_job, conn)
+    if job is None:
+        return
+
+    entidad = job["entidad"]
+    records = _read_records(job["archivo"], job["formato"], job["filas_procesadas"])
+    try:
+        # Cada lote es una transacción que también avanza filas_procesadas:
+        # tras una caída se reanuda justo después del último lote confirmado
+        while await _run_chunk(id_job, records, entidad):
+            pass
+    except asyncio.CancelledError:
+        # Apagado: el trabajo queda en proceso y se reanuda al iniciar de nuevo
+        raise
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.exception("Importación %s fallida", id_job)
+        async with db_session() as conn:
+            await run_db(_finish_job, id_job, "fallido", str(detail), conn)
+        return
+    finally:
+        records.close()
+
+    async with db_session() as conn:
+        await run_db(_finish_job, id_job, "completado", None, conn)
+    os.remove(job["archivo"])
+    namespace = ENTITIES[entidad][3]
+    if namespace:
+        await reference_cache.invalidate(namespace)
+
+
+async def _worker():
+    while True:
+        id_job = await _queue.get()
+        try:
+            await _process(id_job)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Error inesperado procesando la importación %s", id_job)
+        finally:
+            _queue.task_done()
+
+
+async def enqueue(id_job):
+    if _queue is None:
+        await start_import_workers(resume_pending=False)
+    await _queue.put(id_job)
+
+
+async def start_import_workers(resume_pending=True):
+    """
+    Inicia los trabajadores de importación y vuelve a encolar los trabajos que
+    quedaron pendientes o a medias en una ejecución anterior
+    """
+    global _queue
+    if _queue is not None:
+        return
+    _queue = asyncio.Queue()
+    _workers.extend(asyncio.create_task(_worker()) for _ in range(IMPORT_WORKERS))
+    if resume_pending:
+        try:
+            async with db_session() as conn:
+                pending = await run_db(_pending_jobs, conn)
+        except Exception:
+            logger.exception("No se pudieron recuperar las importaciones pendientes")
+            return
+        for id_job in pending:
+            await _queue.put(id_job)
+
+
+async def stop_import_workers():
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
@@ -1,13 +1,110 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.routes import router
+from app.cache import reference_cache
+from app.idempotency import idempotency_store
+from app.singleflight import read_flight
+from app.compression import CompressionMiddleware, compressor
+from app.imports import start_import_workers, stop_import_workers
+from app.metrics import metrics_middleware, render_metrics, gauge_lines
+from app.database import (
+    init_pool, close_pool, get_pool, get_replicas, init_executor, shutdown_executor, executor_stats,
+    start_replica_checks, stop_replica_checks, ReadYourWritesMiddleware
+)
 from pydantic import BaseModel, Field
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Crear el pool de conexiones y el ejecutor al iniciar y cerrarlos al apagar la aplicación;
+    # los trabajadores de importación retoman los trabajos que quedaron pendientes
+    # y las réplicas de lectura se chequean periódicamente
+    init_pool()
+    init_executor()
+    start_replica_checks()
+    await start_import_workers()
+    yield
+    await stop_import_workers()
+    await stop_replica_checks()
+    shutdown_executor()
+    close_pool()
+
+
 app = FastAPI(
     title="API Gestión Hospitalaria",
     description="API para la gestión de pacientes, citas, diagnósticos y medicamentos",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+app.add_middleware(ReadYourWritesMiddleware)
+# Por dentro de las métricas: el middleware HTTP reenvía el cuerpo en
+# fragmentos y la compresión solo actúa sobre respuestas de un solo cuerpo
+app.add_middleware(CompressionMiddleware)
+app.middleware("http")(metrics_middleware)
 app.include_router(router)
 
 
+@app.get("/sistema/pool", tags=["Sistema"])
+async def estadisticas_pool():
+    """
+    Estadísticas del pool de conexiones (en uso, inactivas, tiempos de espera),
+    de las réplicas de lectura y del ejecutor de base de datos
+    """
+    return {**get_pool().stats(), **get_replicas().stats(), "executor": executor_stats()}
+
+
+@app.get("/sistema/cache", tags=["Sistema"])
+async def estadisticas_cache():
+    """
+    Contadores de la caché de datos de referencia (aciertos, fallos, desalojos)
+    """
+    return reference_cache.stats()
+
+
+@app.get("/sistema/idempotencia", tags=["Sistema"])
+async def estadisticas_idempotencia():
+    """
+    Contadores de las Idempotency-Key (respuestas repetidas, duplicados
+    colapsados, ejecuciones)
+    """
+    return idempotency_store.stats()
+
+
+@app.get("/sistema/singleflight", tags=["Sistema"])
+async def estadisticas_singleflight():
+    """
+    Lecturas ejecutadas y peticiones agrupadas con una lectura idéntica en
+    curso (listado de citas y cargas de la caché de referencia)
+    """
+    return read_flight.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Sistema"])
+async def metricas():
+    """
+    Métricas en formato de exposición de Prometheus
+    """
+    pool = get_pool().stats()
+    replicas = get_replicas().stats()
+    return render_metrics(
+        gauge_lines("db_pool", "Estado del pool de conexiones", {
+            "in_use": pool["in_use"],
+            "idle": pool["idle"],
+            "total": pool["total"],
+            "timeouts": pool["timeouts"],
+            "wait_seconds_max": pool["wait_time_max"]
+        })
+        + gauge_lines("db_replicas", "Estado de las réplicas de lectura", {
+            "total": len(replicas["replicas"]),
+            "healthy": sum(replica["healthy"] for replica in replicas["replicas"]),
+            "in_use": sum(replica["in_use"] for replica in replicas["replicas"]),
+            "reads": sum(replica["reads"] for replica in replicas["replicas"]),
+            "fallbacks": replicas["fallbacks"]
+        })
+        + gauge_lines("reference_cache", "Contadores de la caché de datos de referencia", reference_cache.stats())
+        + gauge_lines("idempotency", "Contadores de las Idempotency-Key", idempotency_store.stats())
+        + gauge_lines("singleflight", "Lecturas ejecutadas y peticiones agrupadas", read_flight.stats())
+        + gauge_lines("compression", "Respuestas comprimidas y bytes antes y después", compressor.stats())
+    )
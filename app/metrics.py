@@ -0,0 +1,269 @@
+import bisect
+import contextvars
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from fastapi.routing import APIRoute
+
+# Consultas más lentas que este umbral (ms) se registran en el log
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+slow_query_log = logging.getLogger("app.slow_query")
+
+# Tiempos de la petición en curso; lo crea el middleware y lo completan las rutas
+request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}  # etiquetas -> [conteos por bucket, suma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labels, label_values, [("le", bound)])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, label_values, [("le", "+Inf")])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP",
+    ("method", "route", "status")
+)
+SERIALIZATION_TIME = Histogram(
+    "http_response_serialization_seconds",
+    "Tiempo de validación y serialización de la respuesta", ("route",)
+)
+QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Latencia de las sentencias SQL", ("statement",)
+)
+QUERY_ROWS = Histogram(
+    "db_query_rows", "Filas devueltas por sentencia SQL", ("statement",), buckets=ROW_BUCKETS
+)
+SLOW_QUERIES = Counter(
+    "db_slow_queries_total", "Sentencias SQL por encima de DB_SLOW_QUERY_MS", ("statement",)
+)
+CONNECTION_ACQUIRE = Histogram(
+    "db_connection_acquire_seconds", "Tiempo para obtener una conexión del pool"
+)
+
+REGISTRY = [
+    REQUEST_LATENCY, SERIALIZATION_TIME, QUERY_LATENCY, QUERY_ROWS,
+    SLOW_QUERIES, CONNECTION_ACQUIRE
+]
+
+_IN_LIST = re.compile(r"\(\s*%s(\s*,\s*%s)*\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\.\.\.\))(\s*,\s*\(\.\.\.\))+", re.IGNORECASE)
+
+
+def statement_label(query):
+    """
+    Forma normalizada de una sentencia para usarla como etiqueta: sin espacios
+    repetidos y con las listas de parámetros colapsadas
+    """
+    normalized = " ".join(query.split())
+    normalized = _IN_LIST.sub("(...)", normalized)
+    normalized = _VALUES_LIST.sub(r"\1", normalized)
+    return normalized[:300]
+
+
+def observe_query(query, elapsed):
+    label = statement_label(query)
+    QUERY_LATENCY.observe(elapsed, label)
+    if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(label)
+        slow_query_log.warning("Consulta lenta (%.1f ms): %s", elapsed * 1000, label)
+    return label
+
+
+def render_metrics(extra_lines=()):
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
+
+
+def gauge_lines(name, documentation, values):
+    """
+    Líneas de un gauge sin etiquetas por cada par (sufijo, valor) de `values`
+    """
+    lines = []
+    for suffix, value in values.items():
+        metric = f"{name}_{suffix}"
+        lines.append(f"# HELP {metric} {documentation}")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+    return lines
+
+
+class InstrumentedCursor:
+    """
+    Envoltura de un cursor que mide cada sentencia y las filas devueltas
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._label = None
+
+    def execute(self, query, params=None):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(query, params)
+        finally:
+            self._label = observe_query(query, time.perf_counter() - start)
+
+    def executemany(self, query, seq_params):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, seq_params)
+        finally:
+            self._label = observe_query(query, time.perf_counter() - start)
+
+    def _rows(self, count):
+        if self._label is not None:
+            QUERY_ROWS.observe(count, self._label)
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._rows(len(rows))
+        return rows
+
+    def fetchmany(self, size=1):
+        rows = self._cursor.fetchmany(size)
+        self._rows(len(rows))
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._rows(0 if row is None else 1)
+        return row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """
+    Envoltura de una conexión cuyos cursores quedan instrumentados
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    Ruta que separa el tiempo del endpoint del de validación y serialización
+    de la respuesta (response_model)
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kw):
+            try:
+                return await endpoint(*args, **kw)
+            finally:
+                timings = request_timings.get()
+                if timings is not None:
+                    timings["endpoint_done"] = time.perf_counter()
+
+        super().__init__(path, timed_endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timings = request_timings.get()
+            if timings is not None and "endpoint_done" in timings:
+                SERIALIZATION_TIME.observe(time.perf_counter() - timings["endpoint_done"], route)
+            return response
+
+        return timed_handler
+
+
+async def metrics_middleware(request, call_next):
+    """
+    Middleware HTTP: latencia por método, ruta y código de estado
+    """
+    timings = {}
+    request_timings.set(timings)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "sin_ruta"
+        REQUEST_LATENCY.observe(time.perf_counter() - start, request.method, path, status)
@@ -0,0 +1,248 @@
+"""
+Migraciones versionadas del esquema y revisión de planes de ejecución.
+
+Uso:
+    python -m app.migrate            # aplica las migraciones pendientes
+    python -m app.migrate status     # muestra las migraciones aplicadas y pendientes
+    python -m app.migrate explain    # EXPLAIN de cada consulta de routes.py
+"""
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from .backends import get_backend
+from .database import get_db_connection
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+# Exportaciones completas: recorren toda la tabla por diseño
+EXPECTED_FULL_SCANS = {"exportar_citas", "exportar_diagnosticos"}
+
+
+def _split_statements(sql):
+    statements, current = [], []
+    for line in sql.splitlines():
+        if line.strip().startswith("--"):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(";"):
+            statement = "\n".join(current).strip().rstrip(";")
+            if statement:
+                statements.append(statement)
+            current = []
+    if "\n".join(current).strip():
+        statements.append("\n".join(current).strip())
+    return statements
+
+
+def _migration_files():
+    return sorted(MIGRATIONS_DIR.glob("*.sql"))
+
+
+def _applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            aplicada_en DATETIME NOT NULL
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def upgrade():
+    backend = get_backend()
+    if backend.name == "sqlite":
+        # El motor embebido no tiene historial de migraciones: su esquema
+        # completo está en embedded.SCHEMA y se crea si falta
+        backend.setup()
+        print("Esquema actualizado")
+        return
+    db = get_db_connection()
+    cursor = db.cursor()
+    try:
+        applied = _applied_versions(cursor)
+        for path in _migration_files():
+            version = path.stem
+            if version in applied:
+                continue
+            print(f"Aplicando {version}...")
+            for statement in _split_statements(path.read_text(encoding="utf-8")):
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, aplicada_en) VALUES (%s, %s)",
+                (version, datetime.now())
+            )
+            db.commit()
+        print("Esquema actualizado")
+    finally:
+        cursor.close()
+        db.close()
+
+
+def status():
+    db = get_db_connection()
+    cursor = db.cursor()
+    try:
+        applied = _applied_versions(cursor)
+        for path in _migration_files():
+            mark = "aplicada " if path.stem in applied else "pendiente"
+            print(f"[{mark}] {path.stem}")
+    finally:
+        cursor.close()
+        db.close()
+
+
+class _CapturingCursor:
+    """
+    Cursor que registra las consultas en lugar de ejecutarlas
+    """
+
+    def __init__(self, queries):
+        self._queries = queries
+        self.lastrowid = 0
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        self._queries.append((" ".join(query.split()), tuple(params or ())))
+
+    def executemany(self, query, params):
+        pass
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return None
+
+    def close(self):
+        pass
+
+
+class _CapturingConnection:
+    def __init__(self):
+        self.queries = []
+
+    def cursor(self, **kwargs):
+        return _CapturingCursor(self.queries)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def _route_queries():
+    """
+    Ejecuta los accesos a datos de routes.py con parámetros de ejemplo
+    y devuelve las consultas SELECT que generan
+    """
+    from . import agenda, feed, imports, routes
+    from .repositories import CITA_SELECT, DIAGNOSTICO_SELECT, CitaRepository, DiagnosticoRepository
+    from .models import CitaCreate, DiagnosticoBulkCreate, DiagnosticoCreate, Formula, Paciente
+    from .pagination import DEFAULT_PAGE_SIZE, encode_cursor
+
+    hoy = date.today()
+    ahora = datetime.now()
+    def _conflictos_citas(conn):
+        agenda.find_conflicts(conn.cursor(), 1, [ahora])
+
+    calls = [
+        (routes._listar_pacientes, DEFAULT_PAGE_SIZE, None),
+        (routes._listar_pacientes, DEFAULT_PAGE_SIZE, encode_cursor(["Ana", 1])),
+        (routes._listar_especialistas, DEFAULT_PAGE_SIZE, None, None),
+        (routes._listar_especialistas, DEFAULT_PAGE_SIZE, encode_cursor(["Ana", 1]), "Cardiología"),
+        (routes._listar_citas, DEFAULT_PAGE_SIZE, None, None, None, None, None, tuple(CITA_SELECT)),
+        (routes._listar_citas, DEFAULT_PAGE_SIZE, encode_cursor([str(ahora), 1]), ahora, ahora, "programada",
+         "Cardiología", tuple(CITA_SELECT)),
+        (routes._listar_citas, DEFAULT_PAGE_SIZE, None, None, None, None, None, ("id_cita", "estado")),
+        (routes._listar_medicamentos, DEFAULT_PAGE_SIZE, None),
+        (routes._listar_medicamentos_stock_bajo, 10, DEFAULT_PAGE_SIZE, None),
+        (routes._listar_medicamentos_stock_bajo, 10, DEFAULT_PAGE_SIZE, encode_cursor([3, 1])),
+        (routes._listar_movimientos_stock, 1, DEFAULT_PAGE_SIZE, None),
+        (routes._listar_formulas, DEFAULT_PAGE_SIZE, None),
+        (routes._listar_formulas, DEFAULT_PAGE_SIZE, encode_cursor([1])),
+        (routes._listar_diagnosticos, DEFAULT_PAGE_SIZE, None, None, None, None, list(DIAGNOSTICO_SELECT)),
+        (routes._listar_diagnosticos, DEFAULT_PAGE_SIZE, encode_cursor([str(hoy), 1]), hoy, hoy, "Cardiología",
+         list(DIAGNOSTICO_SELECT)),
+        (routes._listar_diagnosticos, DEFAULT_PAGE_SIZE, None, None, None, None, ["id_diagnostico", "descripcion"]),
+        (routes._buscar_pacientes, "+ana*", None, DEFAULT_PAGE_SIZE, None),
+        (routes._buscar_pacientes, None, "123%", DEFAULT_PAGE_SIZE, encode_cursor([1000, 1])),
+        (routes._buscar_diagnosticos, "+control*", DEFAULT_PAGE_SIZE, None),
+        (routes._obtener_formulas_por_diagnostico, 1),
+        (routes._obtener_diagnosticos_por_paciente, 1),
+        (routes._crear_pacientes_bulk, [Paciente(documento="1", nombre="Ana", fecha_nacimiento=hoy, telefono="1")]),
+        (routes._crear_citas_bulk, 1, 1, [CitaCreate(fecha_hora=ahora, estado="programada")]),
+        (routes._crear_formulas_bulk, [Formula(id_diagnostico=1, id_medicamento=1, dosis="1", duracion=1)]),
+        (routes._crear_diagnostico, 1, 1, DiagnosticoCreate(descripcion="-", fecha_diagnostico=hoy)),
+        (routes._crear_diagnosticos_bulk, [
+            DiagnosticoBulkCreate(id_cita=1, id_paciente=1, descripcion="-", fecha_diagnostico=hoy)
+        ]),
+        (routes._disponibilidad_especialista, 1, hoy, hoy),
+        (routes._disponibilidad_especialidad, "Cardiología", hoy, hoy),
+        (_conflictos_citas,),
+        (imports.get_job, "0" * 32, 100),
+        (imports._pending_jobs,),
+        (feed.read_changes, 0, feed.ENTIDADES, DEFAULT_PAGE_SIZE),
+    ]
+
+    queries = []
+    for fn, *args in calls:
+        conn = _CapturingConnection()
+        try:
+            fn(*args, conn)
+        except Exception:
+            # Sin datos reales los accesos terminan en 404 o similar; basta con lo capturado
+            pass
+        queries.extend((fn.__name__.lstrip("_"), q, p) for q, p in conn.queries)
+
+    queries.append(("exportar_citas", " ".join(CitaRepository.export_query.split()), ()))
+    queries.append(("exportar_diagnosticos", " ".join(DiagnosticoRepository.export_query.split()), ()))
+    return [(name, q, p) for name, q, p in queries if q.upper().startswith("SELECT")]
+
+
+def explain():
+    """
+    Corre EXPLAIN sobre cada consulta y señala los recorridos completos de tabla
+    """
+    db = get_db_connection()
+    cursor = db.cursor(dictionary=True)
+    full_scans = 0
+    try:
+        for name, query, params in _route_queries():
+            cursor.execute("EXPLAIN " + query, params)
+            plan = cursor.fetchall()
+            scans = [row for row in plan if row.get("type") == "ALL"]
+            if scans and name in EXPECTED_FULL_SCANS:
+                label = "esperado"
+            else:
+                label = "FULL SCAN" if scans else "ok"
+                full_scans += len(scans)
+            print(f"{label:<9} {name}")
+            for row in plan:
+                print(
+                    f"          {row.get('table') or '-':<14} type={row.get('type')} "
+                    f"key={row.get('key')} rows={row.get('rows')} {row.get('Extra') or ''}"
+                )
+    finally:
+        cursor.close()
+        db.close()
+    print(f"\n{full_scans} recorrido(s) completo(s) de tabla")
+    return full_scans
+
+
+def main(argv):
+    command = argv[0] if argv else "upgrade"
+    if command == "upgrade":
+        upgrade()
+    elif command == "status":
+        status()
+    elif command == "explain":
+        sys.exit(1 if explain() else 0)
+    else:
+        print(__doc__)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
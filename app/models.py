@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class Paciente(BaseModel):
     id_paciente: int | None = None
@@ -11,7 +11,7 @@ class Paciente(BaseModel):
 class MedicamentoCreate(BaseModel):
     nombre: str
     descripcion: str
-    stock: int
+    stock: int = Field(ge=0)
 
 class Medicamento(MedicamentoCreate):
     id_medicamento: int | None = None
@@ -34,6 +34,7 @@ class FormulaCreate(BaseModel):
     id_medicamento: int
     dosis: str
     duracion: int
+    cantidad: int = Field(1, ge=1)  # unidades que se descuentan del stock
 
 class Formula(FormulaCreate):
     id_formula: int | None = None
@@ -57,4 +58,104 @@ class Cita(BaseModel):
     fecha_hora: datetime
     estado: str
     nombre_paciente: str | None = None
-    nombre_especialista: str | None = None
\ No newline at end of file
+    nombre_especialista: str | None = None
+
+class DiagnosticoDetalle(Diagnostico):
+    formulas: list[Formula] = []
+
+class FormulaDiagnosticoCreate(BaseModel):
+    id_medicamento: int
+    dosis: str
+    duracion: int
+    cantidad: int = Field(1, ge=1)
+
+class DiagnosticoBulkCreate(DiagnosticoCreate):
+    id_cita: int
+    id_paciente: int
+    formulas: list[FormulaDiagnosticoCreate] = []
+
+class CitaDetalle(Cita):
+    diagnosticos: list[DiagnosticoDetalle] = []
+
+class HistorialPaciente(BaseModel):
+    paciente: Paciente
+    citas: list[CitaDetalle]
+
+class ResultadoBulk(BaseModel):
+    fila: int
+    id: int
+
+class ErrorFila(BaseModel):
+    fila: int
+    error: str
+
+class ErrorImportacion(ErrorFila):
+    pass
+
+class ResultadoDiagnosticosBulk(BaseModel):
+    diagnosticos: list[DiagnosticoDetalle]
+    errores: list[ErrorFila]
+
+class ImportJob(BaseModel):
+    id_job: str
+    entidad: str
+    formato: str
+    estado: str
+    bytes_recibidos: int
+    filas_procesadas: int
+    filas_insertadas: int
+    filas_con_error: int
+    filas_por_segundo: float
+    error: str | None = None
+    creado_en: datetime
+    iniciado_en: datetime | None = None
+    actualizado_en: datetime
+    errores: list[ErrorImportacion] = []
+
+class HorarioDisponible(BaseModel):
+    id_especialista: int
+    nombre_especialista: str
+    fecha_hora: datetime
+
+class MovimientoStock(BaseModel):
+    id_movimiento: int
+    id_medicamento: int
+    cantidad: int
+    stock_resultante: int
+    motivo: str
+    id_formula: int | None = None
+    creado_en: datetime
+
+class CitasEspecialistaDia(BaseModel):
+    dia: date
+    id_especialista: int
+    especialidad: str
+    total: int
+
+class CitasEspecialidadDia(BaseModel):
+    dia: date
+    especialidad: str
+    total: int
+
+class CitasPorEstado(BaseModel):
+    estado: str
+    total: int
+    porcentaje: float
+
+class MedicamentoPrescrito(BaseModel):
+    id_medicamento: int
+    nombre: str
+    formulas: int
+    unidades: int
+
+class DiagnosticosMes(BaseModel):
+    mes: date
+    total: int
+
+class Cambio(BaseModel):
+    id_cambio: int
+    entidad: str
+    id_registro: int
+    operacion: str
+    datos: dict
+    creado_en: datetime
@@ -0,0 +1,66 @@
+import base64
+import json
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values):
+    """
+    Codifica los valores de la última fila en un token opaco
+    """
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Parámetro 'after' inválido")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Parámetro 'after' inválido")
+    return values
+
+
+def fetch_keyset_page(cursor, query, order_by, filters, params, limit, after, descending=False):
+    """
+    Ejecuta `query` (SELECT ... FROM ... sin WHERE ni ORDER BY) paginando por
+    keyset sobre las columnas `order_by`.
+
+    Devuelve las filas de la página y el token de la siguiente, o None si no hay más.
+    """
+    conditions = list(filters)
+    params = list(params)
+
+    if after is not None:
+        # (a, b) > (x, y) expandido para que MySQL use el índice compuesto
+        values = decode_cursor(after, len(order_by))
+        op = "<" if descending else ">"
+        alternatives = []
+        for i, column in enumerate(order_by):
+            parts = [f"{prev} = %s" for prev in order_by[:i]] + [f"{column} {op} %s"]
+            alternatives.append("(" + " AND ".join(parts) + ")")
+            params.extend(values[:i + 1])
+        conditions.append("(" + " OR ".join(alternatives) + ")")
+
+    direction = "DESC" if descending else "ASC"
+    sql = query
+    if conditions:
+        sql += "\nWHERE " + "\n  AND ".join(conditions)
+    sql += "\nORDER BY " + ", ".join(f"{column} {direction}" for column in order_by)
+    sql += "\nLIMIT %s"
+    params.append(limit + 1)
+
+    cursor.execute(sql, tuple(params))
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last[column.split(".")[-1]] for column in order_by])
+    return rows, next_cursor
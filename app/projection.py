@@ -0,0 +1,37 @@
+from fastapi import HTTPException
+
+
+def parse_fields(fields, model):
+    """
+    Campos pedidos en el parámetro `fields` ("id_cita,fecha_hora,estado"),
+    en el orden de `model`; sin el parámetro se devuelven todos
+    """
+    available = list(model.model_fields)
+    if fields is None:
+        return available
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = sorted(requested - set(available))
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Parámetro 'fields' inválido{': ' + ', '.join(unknown) if unknown else ''}. "
+                f"Campos disponibles: {', '.join(available)}"
+            )
+        )
+    return [field for field in available if field in requested]
+
+
+def select_list(columns, fields, order_by):
+    """
+    Lista del SELECT con las columnas de `fields` (según el mapa campo ->
+    expresión SQL `columns`) más las del orden keyset, que el token de la
+    siguiente página necesita aunque no se devuelvan
+    """
+    selected = {field: columns[field] for field in fields}
+    for column in order_by:
+        selected.setdefault(column.split(".")[-1], column)
+    return ",\n            ".join(
+        expression if expression.split(".")[-1] == field else f"{expression} AS {field}"
+        for field, expression in selected.items()
+    )
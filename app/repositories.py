@@ -0,0 +1,683 @@
+"""
+Repositorios: todo el SQL de las entidades de app/models.py, uno por entidad.
+
+Cada repositorio trabaja sobre la conexión de la operación en curso y abre
+sus propios cursores; las escrituras no confirman, la transacción la cierra
+quien llama. Las clases base están escritas para MySQL y cada motor
+(app/backends.py) tiene las suyas en REPOSITORIES: el motor embebido
+reemplaza solo lo que cambia de dialecto (la búsqueda de texto completo).
+"""
+from contextlib import contextmanager
+from .backends import get_backend
+from .agenda import availability, find_conflicts, to_utc_naive
+from .bulk import FK_CHECK_CHUNK_SIZE, chunks, find_missing_ids, ids_by_key, insert_many, raise_existing_keys
+from .feed import record_changes
+from .models import Formula
+from .pagination import fetch_keyset_page
+from .projection import select_list
+from .search import SCORE_SCALE, DOCUMENT_SCORE
+from .stats import record_citas, record_diagnosticos, record_formulas
+from .stock import decrement_stock, formula_movements, initial_movements, lock_stock, record_movements
+
+
+class Repository:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @contextmanager
+    def cursor(self, dictionary=True):
+        cursor = self.conn.cursor(dictionary=dictionary)
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    def fetch_page(self, query, order_by, filters, params, limit, after, descending=False):
+        with self.cursor() as cursor:
+            return fetch_keyset_page(cursor, query, order_by, filters, params, limit, after, descending)
+
+    def fetch_all(self, query, params=()):
+        with self.cursor() as cursor:
+            cursor.execute(query, tuple(params))
+            return cursor.fetchall()
+
+    def fetch_one(self, query, params=()):
+        with self.cursor() as cursor:
+            cursor.execute(query, tuple(params))
+            return cursor.fetchone()
+
+
+class FulltextMixin:
+    """
+    Búsqueda de texto completo de MySQL: índice FULLTEXT en modo booleano
+    """
+
+    @staticmethod
+    def match(column):
+        return f"MATCH({column}) AGAINST (%s IN BOOLEAN MODE)"
+
+    # En MySQL la barra invertida escapa % y _ sin declararlo
+    prefix_match = "LIKE %s"
+
+
+class SQLiteFulltextMixin(FulltextMixin):
+    """
+    La misma búsqueda en el motor embebido, con la función match_against
+    que registra app/embedded.py
+    """
+
+    @staticmethod
+    def match(column):
+        return f"match_against({column}, %s)"
+
+    prefix_match = "LIKE %s ESCAPE '\\'"
+
+
+class PacienteRepository(FulltextMixin, Repository):
+    def raise_existing(self, documentos):
+        with self.cursor() as cursor:
+            raise_existing_keys(cursor, "pacientes", "documento", documentos)
+
+    def insert(self, pacientes):
+        """
+        Inserta `pacientes` y devuelve sus IDs en el mismo orden, releídos por
+        documento (llave natural)
+        """
+        with self.cursor() as cursor:
+            cursor.executemany("""
+            INSERT INTO pacientes (documento, nombre, fecha_nacimiento, telefono)
+            VALUES (%s, %s, %s, %s)
+            """, [
+                (paciente.documento, paciente.nombre, paciente.fecha_nacimiento, paciente.telefono)
+                for paciente in pacientes
+            ])
+            return ids_by_key(
+                cursor, "pacientes", "documento", "id_paciente", [paciente.documento for paciente in pacientes]
+            )
+
+    def get(self, id_paciente):
+        return self.fetch_one("""
+            SELECT id_paciente, documento, nombre, fecha_nacimiento, telefono
+            FROM pacientes
+            WHERE id_paciente = %s
+        """, (id_paciente,))
+
+    def list_page(self, limit, after):
+        query = """
+        SELECT
+            id_paciente,
+            documento,
+            nombre,
+            fecha_nacimiento,
+            telefono
+        FROM pacientes
+        """
+        return self.fetch_page(query, ["nombre", "id_paciente"], [], [], limit, after)
+
+    def search(self, terms, documento, limit, after):
+        # Cada rama usa su propio índice (FULLTEXT de nombre, único de documento);
+        # con OR en un solo WHERE MySQL recorrería la tabla completa
+        branches, params = [], []
+        if terms is not None:
+            branches.append(f"""
+            SELECT id_paciente, documento, nombre, fecha_nacimiento, telefono,
+                   CAST(ROUND({self.match("nombre")} * {SCORE_SCALE}) AS SIGNED) AS relevancia
+            FROM pacientes
+            WHERE {self.match("nombre")}
+            """)
+            params.extend([terms, terms])
+        if documento is not None:
+            branches.append(f"""
+            SELECT id_paciente, documento, nombre, fecha_nacimiento, telefono,
+                   {DOCUMENT_SCORE} AS relevancia
+            FROM pacientes
+            WHERE documento {self.prefix_match}
+            """)
+            params.append(documento)
+        query = "SELECT * FROM (" + " UNION ALL ".join(branches) + ") AS r"
+        return self.fetch_page(query, ["r.relevancia", "r.id_paciente"], [], params, limit, after, descending=True)
+
+
+class EspecialistaRepository(Repository):
+    def raise_existing(self, documentos):
+        with self.cursor() as cursor:
+            raise_existing_keys(cursor, "especialistas", "documento", documentos)
+
+    def insert(self, especialistas):
+        with self.cursor() as cursor:
+            cursor.executemany("""
+            INSERT INTO especialistas (documento, nombre, especialidad)
+            VALUES (%s, %s, %s)
+            """, [
+                (especialista.documento, especialista.nombre, especialista.especialidad)
+                for especialista in especialistas
+            ])
+            return ids_by_key(
+                cursor, "especialistas", "documento", "id_especialista",
+                [especialista.documento for especialista in especialistas]
+            )
+
+    def lock(self, id_especialista):
+        """
+        Lee y bloquea al especialista hasta el commit, o None si no existe
+        """
+        return self.fetch_one(
+            "SELECT especialidad, nombre FROM especialistas WHERE id_especialista = %s FOR UPDATE",
+            (id_especialista,)
+        )
+
+    def list_page(self, limit, after, especialidad):
+        filters, params = [], []
+        if especialidad is not None:
+            filters.append("especialidad = %s")
+            params.append(especialidad)
+        return self.fetch_page(
+            "SELECT * FROM especialistas", ["nombre", "id_especialista"], filters, params, limit, after
+        )
+
+    def availability(self, id_especialista, desde, hasta):
+        with self.cursor(dictionary=False) as cursor:
+            return availability(cursor, "e.id_especialista = %s", [id_especialista], desde, hasta)
+
+    def availability_by_especialidad(self, especialidad, desde, hasta):
+        with self.cursor(dictionary=False) as cursor:
+            return availability(cursor, "e.especialidad = %s", [especialidad], desde, hasta)
+
+
+# Expresión SQL de cada campo de los listados, para proyectar con `fields`
+CITA_SELECT = {
+    "id_cita": "c.id_cita",
+    "id_paciente": "c.id_paciente",
+    "id_especialista": "c.id_especialista",
+    "fecha_hora": "c.fecha_hora",
+    "estado": "c.estado",
+    "nombre_paciente": "p.nombre",
+    "nombre_especialista": "e.nombre"
+}
+
+
+class CitaRepository(Repository):
+    export_query = """
+    SELECT
+        c.id_cita,
+        c.id_paciente,
+        c.id_especialista,
+        c.fecha_hora,
+        c.estado,
+        p.nombre as nombre_paciente,
+        e.nombre as nombre_especialista
+    FROM citas c
+    JOIN pacientes p ON c.id_paciente = p.id_paciente
+    JOIN especialistas e ON c.id_especialista = e.id_especialista
+    ORDER BY c.id_cita
+    """
+
+    def conflicts(self, id_especialista, starts):
+        with self.cursor(dictionary=False) as cursor:
+            return find_conflicts(cursor, id_especialista, starts)
+
+    def insert(self, id_especialista, especialidad, values):
+        """
+        Inserta las citas (filas id_paciente, id_especialista, fecha_hora,
+        estado) del especialista y las suma a sus estadísticas; devuelve los IDs
+        """
+        with self.cursor() as cursor:
+            ids = insert_many(
+                cursor, "citas", ["id_paciente", "id_especialista", "fecha_hora", "estado"], values
+            )
+            record_citas(cursor, id_especialista, especialidad, values)
+            return ids
+
+    def record_created(self, citas):
+        with self.cursor() as cursor:
+            record_changes(cursor, "citas", "crear", "id_cita", citas)
+
+    def list_page(self, limit, after, desde, hasta, estado, especialidad, campos):
+        order_by = ["c.fecha_hora", "c.id_cita"]
+        # Solo se unen las tablas de los campos pedidos o de los filtros
+        query = f"""
+        SELECT
+            {select_list(CITA_SELECT, campos, order_by)}
+        FROM citas c
+        """
+        if "nombre_paciente" in campos:
+            query += "JOIN pacientes p ON c.id_paciente = p.id_paciente\n"
+        if "nombre_especialista" in campos or especialidad is not None:
+            query += "JOIN especialistas e ON c.id_especialista = e.id_especialista\n"
+        filters, params = [], []
+        if desde is not None:
+            filters.append("c.fecha_hora >= %s")
+            params.append(to_utc_naive(desde))
+        if hasta is not None:
+            filters.append("c.fecha_hora <= %s")
+            params.append(to_utc_naive(hasta))
+        if estado is not None:
+            filters.append("c.estado = %s")
+            params.append(estado)
+        if especialidad is not None:
+            filters.append("e.especialidad = %s")
+            params.append(especialidad)
+        return self.fetch_page(query, order_by, filters, params, limit, after)
+
+    def page_for_paciente(self, id_paciente, limit, after, desde, hasta):
+        """
+        Citas del paciente con los nombres, de la más reciente a la más antigua
+        """
+        filters, params = ["c.id_paciente = %s"], [id_paciente]
+        if desde is not None:
+            filters.append("c.fecha_hora >= %s")
+            params.append(to_utc_naive(desde))
+        if hasta is not None:
+            filters.append("c.fecha_hora <= %s")
+            params.append(to_utc_naive(hasta))
+        query = """
+        SELECT
+            c.*,
+            p.nombre as nombre_paciente,
+            e.nombre as nombre_especialista
+        FROM citas c
+        JOIN pacientes p ON c.id_paciente = p.id_paciente
+        JOIN especialistas e ON c.id_especialista = e.id_especialista
+        """
+        return self.fetch_page(query, ["c.fecha_hora", "c.id_cita"], filters, params, limit, after, descending=True)
+
+    def with_names(self, ids):
+        """
+        {id_cita: fila} con el paciente, los nombres y la especialidad de cada
+        cita de `ids` que existe, con una consulta IN por lote
+        """
+        citas = {}
+        for chunk in chunks(sorted(set(ids)), FK_CHECK_CHUNK_SIZE):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            citas.update((row["id_cita"], row) for row in self.fetch_all(f"""
+                SELECT c.id_cita, c.id_paciente, p.nombre as nombre_paciente,
+                       e.nombre as nombre_especialista, e.especialidad
+                FROM citas c
+                JOIN pacientes p ON c.id_paciente = p.id_paciente
+                JOIN especialistas e ON c.id_especialista = e.id_especialista
+                WHERE c.id_cita IN ({placeholders})
+            """, chunk))
+        return citas
+
+    def get_for_paciente(self, id_cita, id_paciente):
+        """
+        Nombres y especialidad de la cita si pertenece al paciente, o None
+        """
+        return self.fetch_one("""
+            SELECT p.nombre as nombre_paciente, e.nombre as nombre_especialista, e.especialidad
+            FROM citas c
+            JOIN pacientes p ON c.id_paciente = p.id_paciente
+            JOIN especialistas e ON c.id_especialista = e.id_especialista
+            WHERE c.id_cita = %s AND c.id_paciente = %s
+        """, (id_cita, id_paciente))
+
+
+class MedicamentoRepository(Repository):
+    def insert(self, medicamentos):
+        """
+        Inserta los medicamentos con su movimiento de stock inicial; devuelve los IDs
+        """
+        with self.cursor() as cursor:
+            ids = insert_many(cursor, "medicamentos", ["nombre", "descripcion", "stock"], [
+                (medicamento.nombre, medicamento.descripcion, medicamento.stock)
+                for medicamento in medicamentos
+            ])
+            record_movements(cursor, initial_movements(ids, [medicamento.stock for medicamento in medicamentos]))
+            return ids
+
+    def lock_stock(self, ids):
+        with self.cursor() as cursor:
+            return lock_stock(cursor, ids)
+
+    def list_page(self, limit, after):
+        query = """
+        SELECT
+            id_medicamento,
+            nombre,
+            descripcion,
+            stock
+        FROM medicamentos
+        """
+        return self.fetch_page(query, ["nombre", "id_medicamento"], [], [], limit, after)
+
+    def low_stock_page(self, umbral, limit, after):
+        query = """
+        SELECT id_medicamento, nombre, descripcion, stock
+        FROM medicamentos
+        """
+        return self.fetch_page(query, ["stock", "id_medicamento"], ["stock <= %s"], [umbral], limit, after)
+
+    def movements_page(self, id_medicamento, limit, after):
+        query = """
+        SELECT id_movimiento, id_medicamento, cantidad, stock_resultante, motivo, id_formula, creado_en
+        FROM movimientos_stock
+        """
+        return self.fetch_page(
+            query, ["id_movimiento"], ["id_medicamento = %s"], [id_medicamento], limit, after, descending=True
+        )
+
+    def exists(self, id_medicamento):
+        with self.cursor() as cursor:
+            return not find_missing_ids(cursor, "medicamentos", "id_medicamento", [id_medicamento])
+
+
+class FormulaRepository(Repository):
+    def insert(self, formulas, stock):
+        """
+        Descuenta del stock (ya bloqueado con lock_stock) las unidades de
+        `formulas`, las inserta y registra sus movimientos y estadísticas
+        """
+        demand = {}
+        for formula in formulas:
+            demand[formula.id_medicamento] = demand.get(formula.id_medicamento, 0) + formula.cantidad
+        with self.cursor() as cursor:
+            stock_after = decrement_stock(cursor, demand, stock)
+            ids = insert_many(
+                cursor, "formulas",
+                ["id_diagnostico", "id_medicamento", "dosis", "duracion", "cantidad"],
+                [
+                    (formula.id_diagnostico, formula.id_medicamento, formula.dosis, formula.duracion, formula.cantidad)
+                    for formula in formulas
+                ]
+            )
+            record_movements(cursor, formula_movements(formulas, ids, stock_after))
+            record_formulas(cursor, formulas)
+        return [
+            Formula(
+                id_formula=id_formula,
+                id_diagnostico=formula.id_diagnostico,
+                id_medicamento=formula.id_medicamento,
+                dosis=formula.dosis,
+                duracion=formula.duracion,
+                cantidad=formula.cantidad
+            )
+            for id_formula, formula in zip(ids, formulas)
+        ]
+
+    def list_page(self, limit, after):
+        query = """
+        SELECT
+            f.*,
+            m.nombre as nombre_medicamento,
+            d.descripcion as descripcion_diagnostico
+        FROM formulas f
+        JOIN medicamentos m ON f.id_medicamento = m.id_medicamento
+        JOIN diagnosticos d ON f.id_diagnostico = d.id_diagnostico
+        """
+        return self.fetch_page(query, ["f.id_formula"], [], [], limit, after, descending=True)
+
+    def for_diagnostico(self, id_diagnostico):
+        return self.fetch_all("""
+        SELECT
+            f.*,
+            m.nombre as nombre_medicamento
+        FROM formulas f
+        JOIN medicamentos m ON f.id_medicamento = m.id_medicamento
+        WHERE f.id_diagnostico = %s
+        """, (id_diagnostico,))
+
+    def for_diagnosticos(self, ids):
+        """
+        Fórmulas de todos los diagnósticos `ids`, con el nombre del medicamento
+        """
+        formulas = []
+        for chunk in chunks(list(ids), FK_CHECK_CHUNK_SIZE):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            formulas.extend(self.fetch_all(f"""
+                SELECT
+                    f.*,
+                    m.nombre as nombre_medicamento
+                FROM formulas f
+                JOIN medicamentos m ON f.id_medicamento = m.id_medicamento
+                WHERE f.id_diagnostico IN ({placeholders})
+                ORDER BY f.id_formula
+            """, chunk))
+        return formulas
+
+
+DIAGNOSTICO_SELECT = {
+    "id_diagnostico": "d.id_diagnostico",
+    "id_cita": "d.id_cita",
+    "id_paciente": "d.id_paciente",
+    "descripcion": "d.descripcion",
+    "fecha_diagnostico": "d.fecha_diagnostico",
+    "nombre_paciente": "p.nombre",
+    "nombre_especialista": "e.nombre"
+}
+
+
+class DiagnosticoRepository(FulltextMixin, Repository):
+    export_query = """
+    SELECT
+        d.id_diagnostico,
+        d.id_cita,
+        d.id_paciente,
+        d.descripcion,
+        d.fecha_diagnostico,
+        p.nombre as nombre_paciente,
+        e.nombre as nombre_especialista
+    FROM diagnosticos d
+    JOIN citas c ON d.id_cita = c.id_cita
+    JOIN pacientes p ON c.id_paciente = p.id_paciente
+    JOIN especialistas e ON c.id_especialista = e.id_especialista
+    ORDER BY d.id_diagnostico
+    """
+
+    def missing(self, ids):
+        with self.cursor() as cursor:
+            return find_missing_ids(cursor, "diagnosticos", "id_diagnostico", ids)
+
+    def insert(self, diagnosticos, citas):
+        """
+        Inserta los diagnósticos, cada uno con la fila de su cita en `citas`
+        (nombres y especialidad, ver CitaRepository.with_names), los suma a
+        las estadísticas y al feed de cambios. Devuelve los creados como se listan.
+        """
+        with self.cursor() as cursor:
+            ids = insert_many(
+                cursor, "diagnosticos", ["id_cita", "id_paciente", "descripcion", "fecha_diagnostico"],
+                [
+                    (diagnostico.id_cita, diagnostico.id_paciente, diagnostico.descripcion, diagnostico.fecha_diagnostico)
+                    for diagnostico in diagnosticos
+                ]
+            )
+            record_diagnosticos(cursor, [
+                (diagnostico.fecha_diagnostico, cita["especialidad"]) for diagnostico, cita in zip(diagnosticos, citas)
+            ])
+            creados = [
+                {
+                    "id_diagnostico": id_diagnostico,
+                    "id_cita": diagnostico.id_cita,
+                    "id_paciente": diagnostico.id_paciente,
+                    "descripcion": diagnostico.descripcion,
+                    "fecha_diagnostico": diagnostico.fecha_diagnostico,
+                    "nombre_paciente": cita["nombre_paciente"],
+                    "nombre_especialista": cita["nombre_especialista"]
+                }
+                for id_diagnostico, diagnostico, cita in zip(ids, diagnosticos, citas)
+            ]
+            record_changes(cursor, "diagnosticos", "crear", "id_diagnostico", creados)
+            return creados
+
+    def list_page(self, limit, after, desde, hasta, especialidad, campos):
+        order_by = ["d.fecha_diagnostico", "d.id_diagnostico"]
+        # El paciente del diagnóstico es el de su cita, así que se une por
+        # d.id_paciente; la cita solo hace falta para llegar al especialista
+        query = f"""
+        SELECT
+            {select_list(DIAGNOSTICO_SELECT, campos, order_by)}
+        FROM diagnosticos d
+        """
+        if "nombre_paciente" in campos:
+            query += "JOIN pacientes p ON d.id_paciente = p.id_paciente\n"
+        if "nombre_especialista" in campos or especialidad is not None:
+            query += (
+                "JOIN citas c ON d.id_cita = c.id_cita\n"
+                "JOIN especialistas e ON c.id_especialista = e.id_especialista\n"
+            )
+        filters, params = [], []
+        if desde is not None:
+            filters.append("d.fecha_diagnostico >= %s")
+            params.append(desde)
+        if hasta is not None:
+            filters.append("d.fecha_diagnostico <= %s")
+            params.append(hasta)
+        if especialidad is not None:
+            filters.append("e.especialidad = %s")
+            params.append(especialidad)
+        return self.fetch_page(query, order_by, filters, params, limit, after, descending=True)
+
+    def search(self, terms, limit, after):
+        query = f"""
+        SELECT * FROM (
+            SELECT
+                d.*,
+                p.nombre as nombre_paciente,
+                e.nombre as nombre_especialista,
+                CAST(ROUND({self.match("d.descripcion")} * {SCORE_SCALE}) AS SIGNED) AS relevancia
+            FROM diagnosticos d
+            JOIN citas c ON d.id_cita = c.id_cita
+            JOIN pacientes p ON c.id_paciente = p.id_paciente
+            JOIN especialistas e ON c.id_especialista = e.id_especialista
+            WHERE {self.match("d.descripcion")}
+        ) AS r
+        """
+        return self.fetch_page(
+            query, ["r.relevancia", "r.id_diagnostico"], [], [terms, terms], limit, after, descending=True
+        )
+
+    def for_paciente(self, id_paciente):
+        return self.fetch_all("""
+        SELECT
+            d.*,
+            p.nombre as nombre_paciente,
+            e.nombre as nombre_especialista
+        FROM diagnosticos d
+        JOIN citas c ON d.id_cita = c.id_cita
+        JOIN pacientes p ON c.id_paciente = p.id_paciente
+        JOIN especialistas e ON c.id_especialista = e.id_especialista
+        WHERE p.id_paciente = %s
+        ORDER BY d.fecha_diagnostico DESC
+        """, (id_paciente,))
+
+    def for_citas(self, ids):
+        """
+        Diagnósticos de todas las citas `ids`, del más reciente al más antiguo
+        """
+        if not ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(ids))
+        return self.fetch_all(f"""
+            SELECT d.*
+            FROM diagnosticos d
+            WHERE d.id_cita IN ({placeholders})
+            ORDER BY d.fecha_diagnostico DESC, d.id_diagnostico DESC
+        """, ids)
+
+
+class EstadisticaRepository(Repository):
+    """
+    Estadísticas sobre las tablas de resumen (ver app/stats.py): el costo
+    depende de la ventana pedida, no del tamaño de citas, fórmulas o diagnósticos
+    """
+
+    def citas_por_especialista(self, desde, hasta, id_especialista):
+        query = """
+        SELECT dia, id_especialista, especialidad, CAST(SUM(total) AS SIGNED) AS total
+        FROM est_citas_dia
+        WHERE dia BETWEEN %s AND %s
+        """
+        params = [desde, hasta]
+        if id_especialista is not None:
+            query += " AND id_especialista = %s"
+            params.append(id_especialista)
+        query += " GROUP BY dia, id_especialista, especialidad ORDER BY dia, id_especialista"
+        return self.fetch_all(query, params)
+
+    def citas_por_especialidad(self, desde, hasta, especialidad):
+        query = """
+        SELECT dia, especialidad, CAST(SUM(total) AS SIGNED) AS total
+        FROM est_citas_dia
+        WHERE dia BETWEEN %s AND %s
+        """
+        params = [desde, hasta]
+        if especialidad is not None:
+            query += " AND especialidad = %s"
+            params.append(especialidad)
+        query += " GROUP BY dia, especialidad ORDER BY dia, especialidad"
+        return self.fetch_all(query, params)
+
+    def citas_por_estado(self, desde, hasta, especialidad):
+        query = """
+        SELECT estado, CAST(SUM(total) AS SIGNED) AS total
+        FROM est_citas_dia
+        WHERE dia BETWEEN %s AND %s
+        """
+        params = [desde, hasta]
+        if especialidad is not None:
+            query += " AND especialidad = %s"
+            params.append(especialidad)
+        query += " GROUP BY estado ORDER BY estado"
+        return self.fetch_all(query, params)
+
+    def medicamentos_top(self, limit):
+        return self.fetch_all("""
+        SELECT s.id_medicamento, m.nombre, s.formulas, s.unidades
+        FROM est_medicamentos s
+        JOIN medicamentos m ON s.id_medicamento = m.id_medicamento
+        ORDER BY s.unidades DESC, s.id_medicamento DESC
+        LIMIT %s
+        """, (limit,))
+
+    def diagnosticos_por_mes(self, desde, hasta, especialidad):
+        query = """
+        SELECT mes, CAST(SUM(total) AS SIGNED) AS total
+        FROM est_diagnosticos_mes
+        WHERE mes BETWEEN %s AND %s
+        """
+        params = [desde.replace(day=1), hasta.replace(day=1)]
+        if especialidad is not None:
+            query += " AND especialidad = %s"
+            params.append(especialidad)
+        query += " GROUP BY mes ORDER BY mes"
+        return self.fetch_all(query, params)
+
+
+class SQLitePacienteRepository(SQLiteFulltextMixin, PacienteRepository):
+    pass
+
+
+class SQLiteDiagnosticoRepository(SQLiteFulltextMixin, DiagnosticoRepository):
+    pass
+
+
+MYSQL_REPOSITORIES = {
+    "pacientes": PacienteRepository,
+    "especialistas": EspecialistaRepository,
+    "citas": CitaRepository,
+    "medicamentos": MedicamentoRepository,
+    "formulas": FormulaRepository,
+    "diagnosticos": DiagnosticoRepository,
+    "estadisticas": EstadisticaRepository
+}
+
+# Repositorios de cada motor, por el `name` de su clase en app/backends.py
+REPOSITORIES = {
+    "mysql": MYSQL_REPOSITORIES,
+    "sqlite": {
+        **MYSQL_REPOSITORIES,
+        "pacientes": SQLitePacienteRepository,
+        "diagnosticos": SQLiteDiagnosticoRepository
+    }
+}
+
+
+def repository_class(entidad):
+    return REPOSITORIES[get_backend().name][entidad]
+
+
+def repository(entidad, conn):
+    """
+    Repositorio de `entidad` del motor en uso, sobre la conexión `conn`
+    """
+    return repository_class(entidad)(conn)
@@ -1,53 +1,70 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
-from .models import Paciente, Especialista, Cita, CitaCreate, Medicamento, Formula, Diagnostico, DiagnosticoCreate
-from .database import get_db_connection
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal
+from .models import (
+    Paciente, Especialista, Cita, CitaCreate, Medicamento, Formula, Diagnostico,
+    DiagnosticoCreate, HistorialPaciente, ResultadoBulk, ImportJob, HorarioDisponible,
+    MovimientoStock, CitasEspecialistaDia, CitasEspecialidadDia, CitasPorEstado,
+    MedicamentoPrescrito, DiagnosticosMes, Cambio, DiagnosticoDetalle, DiagnosticoBulkCreate,
+    ResultadoDiagnosticosBulk
+)
+from .cache import CachedBody, reference_cache
+from .database import get_db, db_session, run_db, reads_from_replica
+from .singleflight import read_flight
+from .bulk import raise_duplicated_keys, raise_missing_references, compact_result
+from .repositories import repository, repository_class
+from .idempotency import IdempotentRoute
+from .export import stream_query, ndjson_batch, csv_batch, csv_header
+from .agenda import occupies_slot, raise_conflicts, validate_window, to_utc_naive
+from .stock import STOCK_BAJO_UMBRAL
+from .stats import validate_range
+from .search import fulltext_terms, document_prefix, require_terms
+from .feed import ENTIDADES, decode_since, fetch_changes, since_token, event_stream
+from .imports import FORMATS, detect_format, receive_upload, get_job, resume
+from .serialization import dumps, project, rows_to_json, json_response
+from .projection import parse_fields
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
 from datetime import date, datetime
-import mysql.connector
-from datetime import timezone
 
-router = APIRouter()
+router = APIRouter(route_class=IdempotentRoute)
 
 @router.post("/pacientes/bulk", response_model=List[Paciente], tags=["Pacientes"])
-async def crear_pacientes_bulk(pacientes: List[Paciente]):
+async def crear_pacientes_bulk(pacientes: List[Paciente], db=Depends(get_db)):
     """
     Crea múltiples pacientes en la base de datos
     """
-    db = get_db_connection()
-    cursor = db.cursor()
+    return await run_db(_crear_pacientes_bulk, pacientes, db)
+
+
+def _crear_pacientes_bulk(pacientes: List[Paciente], db):
+    repo = repository("pacientes", db)
     try:
-        query = """
-        INSERT INTO pacientes (documento, nombre, fecha_nacimiento, telefono)
-        VALUES (%s, %s, %s, %s)
-        """
+        documentos = [paciente.documento for paciente in pacientes]
+        raise_duplicated_keys("documento", documentos)
+        repo.raise_existing(documentos)
         
-        # Preparar los valores para la inserción
-        values = [
-            (
-                paciente.documento,
-                paciente.nombre,
-                paciente.fecha_nacimiento,
-                paciente.telefono
-            ) 
-            for paciente in pacientes
-        ]
-        
-        # Ejecutar la inserción múltiple
-        cursor.executemany(query, values)
+        # Inserción múltiple; los IDs se releen por documento (llave natural)
+        try:
+            ids = repo.insert(pacientes)
+        except Exception:
+            # Otra petición pudo crear el mismo documento después de la verificación
+            db.rollback()
+            repo.raise_existing(documentos)
+            raise
         db.commit()
         
-        # Obtener el ID del primer paciente insertado
-        first_id = cursor.lastrowid
-        
         # Crear lista de pacientes creados con sus IDs
         pacientes_creados = []
-        for idx, paciente in enumerate(pacientes):
+        for id_paciente, paciente in zip(ids, pacientes):
             paciente_dict = paciente.model_dump()
-            paciente_dict['id_paciente'] = first_id + idx
+            paciente_dict['id_paciente'] = id_paciente
             pacientes_creados.append(Paciente(**paciente_dict))
         
         return pacientes_creados
 
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         print(f"Error al crear pacientes: {str(e)}")
@@ -55,203 +72,461 @@ async def crear_pacientes_bulk(pacientes: List[Paciente]):
             status_code=500,
             detail=f"Error al crear los pacientes: {str(e)}"
         )
-    finally:
-        cursor.close()
-        db.close()
 
 
 @router.get("/pacientes/", response_model=List[Paciente], tags=["Pacientes"])
-async def listar_pacientes():
+async def listar_pacientes(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None
+):
     """
-    Obtiene la lista de todos los pacientes registrados en la base de datos
+    Obtiene una página de los pacientes registrados, ordenados por nombre.
+    El token de la página siguiente se devuelve en la cabecera X-Next-Cursor.
     """
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
-    
+    pacientes, next_cursor = await _coalesced_read(request, _listar_pacientes, limit, after)
+    return json_response(pacientes, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+def _listar_pacientes(limit: int, after: str | None, db):
     try:
-        # Consulta SQL para obtener todos los pacientes
-        query = """
-        SELECT 
-            id_paciente,
-            documento,
-            nombre,
-            fecha_nacimiento,
-            telefono
-        FROM pacientes
-        ORDER BY nombre ASC
-        """
-        
-        cursor.execute(query)
-        pacientes = cursor.fetchall()
+        pacientes, next_cursor = repository("pacientes", db).list_page(limit, after)
         
         # Convertir los resultados a objetos Paciente
-        return [Paciente(**paciente) for paciente in pacientes]
+        return rows_to_json(Paciente, pacientes), next_cursor
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error al consultar pacientes: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Error al consultar los pacientes: {str(e)}"
         )
-    finally:
-        cursor.close()
-        db.close()
+
+@router.get("/pacientes/buscar", response_model=List[Paciente], tags=["Pacientes"])
+async def buscar_pacientes(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None
+):
+    """
+    Busca pacientes por nombre (todas las palabras, como prefijo y sin
+    distinguir tildes) o por prefijo de documento, de mayor a menor relevancia.
+    El token de la página siguiente se devuelve en la cabecera X-Next-Cursor.
+    """
+    terms, documento = fulltext_terms(q), document_prefix(q)
+    require_terms(terms, documento)
+    pacientes, next_cursor = await _coalesced_read(
+        request, _buscar_pacientes, terms, documento, limit, after
+    )
+    return json_response(pacientes, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+def _buscar_pacientes(terms: str | None, documento: str | None, limit: int, after: str | None, db):
+    try:
+        pacientes, next_cursor = repository("pacientes", db).search(terms, documento, limit, after)
+        return rows_to_json(Paciente, pacientes), next_cursor
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al buscar pacientes: {str(e)}")
+
+
+@router.get("/pacientes/{id_paciente}/historial", response_model=HistorialPaciente, tags=["Pacientes"])
+async def obtener_historial_paciente(
+    request: Request,
+    id_paciente: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None
+):
+    """
+    Historial clínico de un paciente: sus citas (de la más reciente a la más
+    antigua) con los diagnósticos de cada cita y las fórmulas de cada
+    diagnóstico. Usa cuatro consultas sin importar cuántos diagnósticos haya;
+    la página se limita por `limit`, `desde` y `hasta` sobre la fecha de la cita.
+    """
+    historial, next_cursor = await _coalesced_read(
+        request, _obtener_historial_paciente, id_paciente, limit, after, desde, hasta
+    )
+    return json_response(historial, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+def _obtener_historial_paciente(
+    id_paciente: int,
+    limit: int,
+    after: str | None,
+    desde: datetime | None,
+    hasta: datetime | None,
+    db
+):
+    try:
+        paciente = repository("pacientes", db).get(id_paciente)
+        if not paciente:
+            raise HTTPException(status_code=404, detail=f"Paciente {id_paciente} no encontrado")
+        
+        # 1. Página de citas del paciente
+        citas, next_cursor = repository("citas", db).page_for_paciente(id_paciente, limit, after, desde, hasta)
+        
+        citas_por_id = {}
+        for cita in citas:
+            detalle = project(Cita, cita)
+            detalle["diagnosticos"] = []
+            citas_por_id[cita["id_cita"]] = detalle
+        
+        # 2. Diagnósticos de todas las citas de la página
+        diagnosticos_por_id = {}
+        for diagnostico in repository("diagnosticos", db).for_citas(list(citas_por_id)):
+            cita = citas_por_id[diagnostico["id_cita"]]
+            detalle = project(Diagnostico, {
+                **diagnostico,
+                "nombre_paciente": cita["nombre_paciente"],
+                "nombre_especialista": cita["nombre_especialista"]
+            })
+            detalle["formulas"] = []
+            cita["diagnosticos"].append(detalle)
+            diagnosticos_por_id[diagnostico["id_diagnostico"]] = detalle
+        
+        # 3. Fórmulas de todos esos diagnósticos, con el nombre del medicamento
+        for formula in repository("formulas", db).for_diagnosticos(list(diagnosticos_por_id)):
+            diagnostico = diagnosticos_por_id[formula["id_diagnostico"]]
+            diagnostico["formulas"].append(project(Formula, {
+                **formula,
+                "descripcion_diagnostico": diagnostico["descripcion"]
+            }))
+        
+        historial = {
+            "paciente": project(Paciente, paciente),
+            "citas": list(citas_por_id.values())
+        }
+        return dumps(historial), next_cursor
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al consultar el historial: {str(e)}"
+        )
 
 # POST Especialistas
 @router.post("/especialistas/bulk", response_model=List[Especialista], tags=["Especialistas"])
-async def crear_especialistas_bulk(especialistas: List[Especialista]):
-    db = get_db_connection()
-    cursor = db.cursor()
+async def crear_especialistas_bulk(especialistas: List[Especialista], db=Depends(get_db)):
+    especialistas_creados = await run_db(_crear_especialistas_bulk, especialistas, db)
+    await reference_cache.invalidate("especialistas")
+    return especialistas_creados
+
+
+def _crear_especialistas_bulk(especialistas: List[Especialista], db):
+    repo = repository("especialistas", db)
     try:
-        query = """
-        INSERT INTO especialistas (documento, nombre, especialidad)
-        VALUES (%s, %s, %s)
-        """
-        values = [
-            (
-                especialista.documento,
-                especialista.nombre,
-                especialista.especialidad
-            ) 
-            for especialista in especialistas
-        ]
-        cursor.executemany(query, values)
+        documentos = [especialista.documento for especialista in especialistas]
+        raise_duplicated_keys("documento", documentos)
+        repo.raise_existing(documentos)
+        
+        try:
+            ids = repo.insert(especialistas)
+        except Exception:
+            # Otra petición pudo crear el mismo documento después de la verificación
+            db.rollback()
+            repo.raise_existing(documentos)
+            raise
         db.commit()
         
-        first_id = cursor.lastrowid
         especialistas_creados = []
-        for idx, especialista in enumerate(especialistas):
+        for id_especialista, especialista in zip(ids, especialistas):
             especialista_dict = especialista.model_dump()
-            especialista_dict['id_especialista'] = first_id + idx
+            especialista_dict['id_especialista'] = id_especialista
             especialistas_creados.append(Especialista(**especialista_dict))
         
         return especialistas_creados
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        db.close()
+
+async def _coalesced(request: Request, key: tuple, loader):
+    """
+    Ejecuta `loader` una sola vez para las peticiones idénticas simultáneas.
+    Las que deben leer del primario (cliente que acaba de escribir o que lo
+    pidió) no se agrupan, para no recibir un resultado iniciado antes de su escritura.
+    """
+    if not reads_from_replica(request):
+        return await loader()
+    return await read_flight.do(key, loader)
+
+
+async def _coalesced_read(request: Request, fn, *args):
+    """
+    Ejecuta el acceso a datos `fn(*args, conn)` una sola vez para las
+    peticiones idénticas simultáneas (la llave es `fn` con sus argumentos).
+    La conexión se pide dentro de la carga: las peticiones que se agrupan con
+    una en curso no ocupan conexiones mientras esperan.
+    """
+    async def cargar():
+        async with db_session(request) as conn:
+            return await run_db(fn, *args, conn)
+
+    return await _coalesced(request, (fn.__name__, *args), cargar)
 
 # GET Especialistas
 @router.get("/especialistas/", response_model=List[Especialista], tags=["Especialistas"])
-async def listar_especialistas():
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
+async def listar_especialistas(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    especialidad: str | None = None
+):
+    # Datos de referencia: se sirven desde caché y solo se pide conexión si falla.
+    # Se leen del primario para no guardar en caché datos de una réplica atrasada.
+    async def cargar():
+        async with db_session() as db:
+            especialistas, next_cursor = await run_db(
+                _listar_especialistas, limit, after, especialidad, db
+            )
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return CachedBody.from_body(especialistas, headers)
+
+    entry = await reference_cache.get_or_load(
+        "especialistas", [limit, after, especialidad], cargar
+    )
+    return entry.to_response(request)
+
+
+def _listar_especialistas(limit: int, after: str | None, especialidad: str | None, db):
     try:
-        cursor.execute("SELECT * FROM especialistas ORDER BY nombre")
-        return [Especialista(**esp) for esp in cursor.fetchall()]
+        especialistas, next_cursor = repository("especialistas", db).list_page(limit, after, especialidad)
+        return rows_to_json(Especialista, especialistas), next_cursor
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        db.close()
 
 # POST Citas
-@router.post("/citas/{id_paciente}/{id_especialista}/", response_model=List[Cita], tags=["Citas"])
-async def crear_citas_bulk(id_paciente: int, id_especialista: int, citas: List[CitaCreate]):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+@router.post(
+    "/citas/{id_paciente}/{id_especialista}/",
+    response_model=List[Cita] | List[ResultadoBulk],
+    tags=["Citas"]
+)
+async def crear_citas_bulk(
+    id_paciente: int,
+    id_especialista: int,
+    citas: List[CitaCreate],
+    compacto: bool = False,
+    conn=Depends(get_db)
+):
+    """
+    Crea citas para un paciente con un especialista. Responde 409 si algún
+    horario se cruza con otra cita vigente del especialista.
+    """
+    citas_creadas = await run_db(_crear_citas_bulk, id_paciente, id_especialista, citas, conn)
+    return compact_result(citas_creadas, "id_cita") if compacto else citas_creadas
+
+
+def _crear_citas_bulk(id_paciente: int, id_especialista: int, citas: List[CitaCreate], conn):
+    repo = repository("citas", conn)
     
     try:
-        # Verificar si existe el paciente y especialista
-        cursor.execute("SELECT * FROM pacientes WHERE id_paciente = %s", (id_paciente,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail=f"Paciente {id_paciente} no encontrado")
+        # Bloquear al especialista serializa las reservas concurrentes de su agenda
+        # hasta el commit, así dos peticiones no pueden tomar el mismo horario.
+        # Debe ser la primera lectura: en REPEATABLE READ una lectura sin
+        # bloqueo anterior fijaría una instantánea previa a la espera
+        especialista = repository("especialistas", conn).lock(id_especialista)
+        paciente = repository("pacientes", conn).get(id_paciente)
+        raise_missing_references({
+            "id_paciente": [] if paciente is not None else [id_paciente],
+            "id_especialista": [] if especialista is not None else [id_especialista]
+        })
         
-        cursor.execute("SELECT * FROM especialistas WHERE id_especialista = %s", (id_especialista,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail=f"Especialista {id_especialista} no encontrado")
+        values = [
+            (
+                id_paciente,
+                id_especialista,
+                to_utc_naive(cita.fecha_hora),
+                cita.estado
+            )
+            for cita in citas
+        ]
+
+        # Rechazar horarios que se cruzan con otras citas del especialista
+        starts = [(fila, value[2]) for fila, value in enumerate(values) if occupies_slot(value[3])]
+        conflicts = repo.conflicts(id_especialista, [start for _, start in starts])
+        raise_conflicts(starts, conflicts)
+        ids = repo.insert(id_especialista, especialista["especialidad"], values)
+        repo.record_created([
+            {
+                "id_cita": id_cita,
+                "id_paciente": id_paciente,
+                "id_especialista": id_especialista,
+                "fecha_hora": fecha_hora,
+                "estado": estado,
+                "nombre_paciente": paciente["nombre"],
+                "nombre_especialista": especialista["nombre"]
+            }
+            for id_cita, (_, _, fecha_hora, estado) in zip(ids, values)
+        ])
         
-        citas_creadas = []
-        for cita in citas:
-            try:
-                fecha_hora_utc = cita.fecha_hora.astimezone(timezone.utc).replace(tzinfo=None)
-                
-                query = """
-                INSERT INTO citas (id_paciente, id_especialista, fecha_hora, estado)
-                VALUES (%s, %s, %s, %s)
-                """
-                values = (id_paciente, id_especialista, fecha_hora_utc, cita.estado)
-                
-                cursor.execute(query, values)
-                id_cita = cursor.lastrowid
-                citas_creadas.append(Cita(
-                    id_cita=id_cita,
-                    id_paciente=id_paciente,
-                    id_especialista=id_especialista,
-                    fecha_hora=cita.fecha_hora,
-                    estado=cita.estado
-                ))
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Error al crear cita: {str(e)}")
+        citas_creadas = [
+            Cita(
+                id_cita=id_cita,
+                id_paciente=id_paciente,
+                id_especialista=id_especialista,
+                fecha_hora=cita.fecha_hora,
+                estado=cita.estado
+            )
+            for id_cita, cita in zip(ids, citas)
+        ]
         
         conn.commit()
         return citas_creadas
     
+    except HTTPException:
+        conn.rollback()
+        raise
     except Exception as e:
         conn.rollback()
         raise HTTPException(status_code=500, detail=f"Error en la operación: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
+
+@router.get(
+    "/especialistas/{id_especialista}/disponibilidad",
+    response_model=List[HorarioDisponible],
+    tags=["Citas"]
+)
+async def disponibilidad_especialista(
+    id_especialista: int,
+    desde: date,
+    hasta: date,
+    conn=Depends(get_db)
+):
+    """
+    Horarios libres de un especialista entre dos fechas (inclusive)
+    """
+    validate_window(desde, hasta)
+    horarios = await run_db(_disponibilidad_especialista, id_especialista, desde, hasta, conn)
+    return json_response(dumps(horarios))
+
+
+def _disponibilidad_especialista(id_especialista: int, desde: date, hasta: date, conn):
+    try:
+        horarios = repository("especialistas", conn).availability(id_especialista, desde, hasta)
+        if horarios is None:
+            raise HTTPException(status_code=404, detail="Especialista no encontrado")
+        return horarios
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/disponibilidad/", response_model=List[HorarioDisponible], tags=["Citas"])
+async def disponibilidad_especialidad(
+    especialidad: str,
+    desde: date,
+    hasta: date,
+    conn=Depends(get_db)
+):
+    """
+    Horarios libres de todos los especialistas de una especialidad entre dos
+    fechas (inclusive), ordenados por fecha
+    """
+    validate_window(desde, hasta)
+    horarios = await run_db(_disponibilidad_especialidad, especialidad, desde, hasta, conn)
+    return json_response(dumps(horarios))
+
+
+def _disponibilidad_especialidad(especialidad: str, desde: date, hasta: date, conn):
+    try:
+        horarios = repository("especialistas", conn).availability_by_especialidad(especialidad, desde, hasta)
+        if horarios is None:
+            raise HTTPException(status_code=404, detail="No hay especialistas con esa especialidad")
+        return horarios
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 # GET Citas
 @router.get("/citas/", response_model=List[Cita], tags=["Citas"])
-async def listar_citas():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+async def listar_citas(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    estado: str | None = None,
+    especialidad: str | None = None,
+    fields: str | None = Query(None, description="Campos a devolver, separados por comas")
+):
+    """
+    Obtiene una página de las citas con los nombres del paciente y del
+    especialista; con `fields` solo se leen y devuelven esos campos
+    """
+    campos = tuple(parse_fields(fields, Cita))
+    citas, next_cursor = await _coalesced_read(
+        request, _listar_citas, limit, after, desde, hasta, estado, especialidad, campos
+    )
+    return json_response(citas, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
+
+def _listar_citas(
+    limit: int,
+    after: str | None,
+    desde: datetime | None,
+    hasta: datetime | None,
+    estado: str | None,
+    especialidad: str | None,
+    campos: tuple,
+    conn
+):
     try:
-        query = """
-        SELECT 
-            c.*,
-            p.nombre as nombre_paciente,
-            e.nombre as nombre_especialista
-        FROM citas c
-        JOIN pacientes p ON c.id_paciente = p.id_paciente
-        JOIN especialistas e ON c.id_especialista = e.id_especialista
-        ORDER BY c.fecha_hora
-        """
-        cursor.execute(query)
-        citas = cursor.fetchall()
-        return [Cita(**cita) for cita in citas]
+        citas, next_cursor = repository("citas", conn).list_page(
+            limit, after, desde, hasta, estado, especialidad, campos
+        )
+        return rows_to_json(Cita, citas, campos), next_cursor
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
 
-@router.post("/medicamentos/bulk", response_model=List[Medicamento], tags=["Medicamentos"])
-async def crear_medicamentos_bulk(medicamentos: List[Medicamento]):
+@router.post(
+    "/medicamentos/bulk",
+    response_model=List[Medicamento] | List[ResultadoBulk],
+    tags=["Medicamentos"]
+)
+async def crear_medicamentos_bulk(
+    medicamentos: List[Medicamento],
+    compacto: bool = False,
+    db=Depends(get_db)
+):
     """
-    Crea múltiples medicamentos en la base de datos
+    Crea múltiples medicamentos en la base de datos.
+    Con `compacto=true` solo devuelve la posición y el ID de cada fila.
     """
-    db = get_db_connection()
-    cursor = db.cursor()
+    medicamentos_creados = await run_db(_crear_medicamentos_bulk, medicamentos, db)
+    await reference_cache.invalidate("medicamentos")
+    if compacto:
+        return compact_result(medicamentos_creados, "id_medicamento")
+    return medicamentos_creados
+
+
+def _crear_medicamentos_bulk(medicamentos: List[Medicamento], db):
     try:
-        query = """
-        INSERT INTO medicamentos (nombre, descripcion, stock)
-        VALUES (%s, %s, %s)
-        """
+        ids = repository("medicamentos", db).insert(medicamentos)
         
-        medicamentos_creados = []
-        for medicamento in medicamentos:
-            values = (
-                medicamento.nombre,
-                medicamento.descripcion,
-                medicamento.stock
-            )
-            
-            cursor.execute(query, values)
-            id_medicamento = cursor.lastrowid
-            
-            medicamentos_creados.append(Medicamento(
+        medicamentos_creados = [
+            Medicamento(
                 id_medicamento=id_medicamento,
                 nombre=medicamento.nombre,
                 descripcion=medicamento.descripcion,
                 stock=medicamento.stock
-            ))
+            )
+            for id_medicamento, medicamento in zip(ids, medicamentos)
+        ]
         
         db.commit()
         
@@ -263,161 +538,188 @@ async def crear_medicamentos_bulk(medicamentos: List[Medicamento]):
             status_code=500,
             detail=f"Error al crear los medicamentos: {str(e)}"
         )
-    finally:
-        cursor.close()
-        db.close()
 
 @router.get("/medicamentos/", response_model=List[Medicamento], tags=["Medicamentos"])
-async def listar_medicamentos():
+async def listar_medicamentos(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None
+):
     """
-    Obtiene la lista de todos los medicamentos registrados
+    Obtiene una página de los medicamentos registrados, ordenados por nombre.
+    Responde 304 si el ETag enviado en If-None-Match sigue vigente.
     """
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
-    
+    # Del primario, igual que en listar_especialistas
+    async def cargar():
+        async with db_session() as db:
+            medicamentos, next_cursor = await run_db(_listar_medicamentos, limit, after, db)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return CachedBody.from_body(medicamentos, headers)
+
+    entry = await reference_cache.get_or_load("medicamentos", [limit, after], cargar)
+    return entry.to_response(request)
+
+
+def _listar_medicamentos(limit: int, after: str | None, db):
     try:
-        query = """
-        SELECT 
-            id_medicamento,
-            nombre,
-            descripcion,
-            stock
-        FROM medicamentos
-        ORDER BY nombre ASC
-        """
-        
-        cursor.execute(query)
-        medicamentos = cursor.fetchall()
-        return [Medicamento(**medicamento) for medicamento in medicamentos]
+        medicamentos, next_cursor = repository("medicamentos", db).list_page(limit, after)
+        return rows_to_json(Medicamento, medicamentos), next_cursor
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al consultar los medicamentos: {str(e)}"
         )
-    finally:
-        cursor.close()
-        db.close()
 
-@router.post("/formulas/bulk", response_model=List[Formula], tags=["Fórmulas"])
-async def crear_formulas_bulk(formulas: List[Formula]):
+@router.get("/medicamentos/stock-bajo", response_model=List[Medicamento], tags=["Medicamentos"])
+async def listar_medicamentos_stock_bajo(
+    umbral: int = Query(STOCK_BAJO_UMBRAL, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    db=Depends(get_db)
+):
     """
-    Crea múltiples fórmulas médicas en la base de datos
+    Medicamentos con stock menor o igual a `umbral`, del menor stock al mayor.
+    Se consulta en tiempo real, sin pasar por la caché.
     """
-    db = get_db_connection()
-    cursor = db.cursor()
-    
+    medicamentos, next_cursor = await run_db(_listar_medicamentos_stock_bajo, umbral, limit, after, db)
+    return json_response(medicamentos, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+def _listar_medicamentos_stock_bajo(umbral: int, limit: int, after: str | None, db):
     try:
-        # Primero verificamos que existan los diagnósticos y medicamentos
-        for formula in formulas:
-            cursor.execute("SELECT * FROM diagnosticos WHERE id_diagnostico = %s", 
-                         (formula.id_diagnostico,))
-            if not cursor.fetchone():
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Diagnóstico {formula.id_diagnostico} no encontrado"
-                )
-            
-            cursor.execute("SELECT * FROM medicamentos WHERE id_medicamento = %s", 
-                         (formula.id_medicamento,))
-            if not cursor.fetchone():
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Medicamento {formula.id_medicamento} no encontrado"
-                )
-        
-        query = """
-        INSERT INTO formulas (id_diagnostico, id_medicamento, dosis, duracion)
-        VALUES (%s, %s, %s, %s)
-        """
-        
-        formulas_creadas = []
-        for formula in formulas:
-            values = (
-                formula.id_diagnostico,
-                formula.id_medicamento,
-                formula.dosis,
-                formula.duracion
-            )
-            
-            cursor.execute(query, values)
-            id_formula = cursor.lastrowid
-            
-            formulas_creadas.append(Formula(
-                id_formula=id_formula,
-                id_diagnostico=formula.id_diagnostico,
-                id_medicamento=formula.id_medicamento,
-                dosis=formula.dosis,
-                duracion=formula.duracion
-            ))
+        medicamentos, next_cursor = repository("medicamentos", db).low_stock_page(umbral, limit, after)
+        return rows_to_json(Medicamento, medicamentos), next_cursor
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar el stock: {str(e)}")
+
+
+@router.get(
+    "/medicamentos/{id_medicamento}/movimientos",
+    response_model=List[MovimientoStock],
+    tags=["Medicamentos"]
+)
+async def listar_movimientos_stock(
+    request: Request,
+    id_medicamento: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None
+):
+    """
+    Libro de movimientos de stock de un medicamento, del más reciente al más
+    antiguo: alta con su stock inicial y una salida por cada fórmula
+    """
+    movimientos, next_cursor = await _coalesced_read(
+        request, _listar_movimientos_stock, id_medicamento, limit, after
+    )
+    return json_response(movimientos, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+def _listar_movimientos_stock(id_medicamento: int, limit: int, after: str | None, db):
+    repo = repository("medicamentos", db)
+    try:
+        movimientos, next_cursor = repo.movements_page(id_medicamento, limit, after)
+        if not movimientos and after is None and not repo.exists(id_medicamento):
+            raise HTTPException(status_code=404, detail="Medicamento no encontrado")
+        return rows_to_json(MovimientoStock, movimientos), next_cursor
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar los movimientos: {str(e)}")
+
+
+@router.post(
+    "/formulas/bulk",
+    response_model=List[Formula] | List[ResultadoBulk],
+    tags=["Fórmulas"]
+)
+async def crear_formulas_bulk(
+    formulas: List[Formula],
+    compacto: bool = False,
+    db=Depends(get_db)
+):
+    """
+    Crea múltiples fórmulas médicas en la base de datos y descuenta del stock
+    la `cantidad` de cada una; responde 409 si algún medicamento no alcanza.
+    Con `compacto=true` solo devuelve la posición y el ID de cada fila.
+    """
+    formulas_creadas = await run_db(_crear_formulas_bulk, formulas, db)
+    await reference_cache.invalidate("medicamentos")
+    return compact_result(formulas_creadas, "id_formula") if compacto else formulas_creadas
+
+
+def _crear_formulas_bulk(formulas: List[Formula], db):
+    try:
+        # Primero verificamos que existan los diagnósticos y medicamentos,
+        # con una consulta por tabla para todos los IDs distintos. El stock
+        # de los medicamentos queda bloqueado hasta el commit.
+        id_medicamentos = [formula.id_medicamento for formula in formulas]
+        stock = repository("medicamentos", db).lock_stock(id_medicamentos)
+        raise_missing_references({
+            "id_diagnostico": repository("diagnosticos", db).missing(
+                [formula.id_diagnostico for formula in formulas]
+            ),
+            "id_medicamento": sorted(set(id_medicamentos) - stock.keys())
+        })
+
+        formulas_creadas = repository("formulas", db).insert(formulas, stock)
         
         db.commit()
         return formulas_creadas
 
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error al crear las fórmulas: {str(e)}"
         )
-    finally:
-        cursor.close()
-        db.close()
 
 @router.get("/formulas/", response_model=List[Formula], tags=["Fórmulas"])
-async def listar_formulas():
+async def listar_formulas(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None
+):
     """
-    Obtiene la lista de todas las fórmulas médicas con información detallada
+    Obtiene una página de las fórmulas médicas con información detallada,
+    de la más reciente a la más antigua
     """
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
-    
+    formulas, next_cursor = await _coalesced_read(request, _listar_formulas, limit, after)
+    return json_response(formulas, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+def _listar_formulas(limit: int, after: str | None, db):
     try:
-        query = """
-        SELECT 
-            f.*,
-            m.nombre as nombre_medicamento,
-            d.descripcion as descripcion_diagnostico
-        FROM formulas f
-        JOIN medicamentos m ON f.id_medicamento = m.id_medicamento
-        JOIN diagnosticos d ON f.id_diagnostico = d.id_diagnostico
-        ORDER BY f.id_formula DESC
-        """
-        
-        cursor.execute(query)
-        formulas = cursor.fetchall()
-        return [Formula(**formula) for formula in formulas]
+        formulas, next_cursor = repository("formulas", db).list_page(limit, after)
+        return rows_to_json(Formula, formulas), next_cursor
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al consultar las fórmulas: {str(e)}"
         )
-    finally:
-        cursor.close()
-        db.close()
 
 # Endpoint adicional para obtener fórmulas por diagnóstico
 @router.get("/formulas/diagnostico/{id_diagnostico}", response_model=List[Formula], tags=["Fórmulas"])
-async def obtener_formulas_por_diagnostico(id_diagnostico: int):
+async def obtener_formulas_por_diagnostico(request: Request, id_diagnostico: int):
     """
     Obtiene todas las fórmulas asociadas a un diagnóstico específico
     """
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
-    
+    return json_response(await _coalesced_read(request, _obtener_formulas_por_diagnostico, id_diagnostico))
+
+
+def _obtener_formulas_por_diagnostico(id_diagnostico: int, db):
     try:
-        query = """
-        SELECT 
-            f.*,
-            m.nombre as nombre_medicamento
-        FROM formulas f
-        JOIN medicamentos m ON f.id_medicamento = m.id_medicamento
-        WHERE f.id_diagnostico = %s
-        """
-        
-        cursor.execute(query, (id_diagnostico,))
-        formulas = cursor.fetchall()
+        formulas = repository("formulas", db).for_diagnostico(id_diagnostico)
         
         if not formulas:
             raise HTTPException(
@@ -425,42 +727,121 @@ async def obtener_formulas_por_diagnostico(id_diagnostico: int):
                 detail=f"No se encontraron fórmulas para el diagnóstico {id_diagnostico}"
             )
             
-        return [Formula(**formula) for formula in formulas]
+        return rows_to_json(Formula, formulas)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al consultar las fórmulas: {str(e)}"
         )
-    finally:
-        cursor.close()
-        db.close()
+
+@router.post("/diagnosticos/bulk", response_model=ResultadoDiagnosticosBulk, tags=["Diagnósticos"])
+async def crear_diagnosticos_bulk(diagnosticos: List[DiagnosticoBulkCreate], db=Depends(get_db)):
+    """
+    Crea diagnósticos de muchas citas en una sola transacción, cada uno con
+    sus fórmulas opcionales (que descuentan stock). Las filas cuya cita no
+    corresponde al paciente, con medicamentos inexistentes o sin stock
+    suficiente se informan en `errores` con su posición y no impiden crear
+    las demás.
+    """
+    resultado = await run_db(_crear_diagnosticos_bulk, diagnosticos, db)
+    if any(diagnostico.formulas for diagnostico in resultado.diagnosticos):
+        await reference_cache.invalidate("medicamentos")
+    return resultado
+
+
+def _crear_diagnosticos_bulk(diagnosticos: List[DiagnosticoBulkCreate], db):
+    try:
+        citas = repository("citas", db).with_names([diagnostico.id_cita for diagnostico in diagnosticos])
+        stock = repository("medicamentos", db).lock_stock(
+            [formula.id_medicamento for diagnostico in diagnosticos for formula in diagnostico.formulas]
+        )
+
+        # Validar fila por fila; el stock se reserva en el orden de la petición
+        aceptados, errores = [], []
+        disponible = dict(stock)
+        for fila, diagnostico in enumerate(diagnosticos):
+            cita = citas.get(diagnostico.id_cita)
+            if cita is None or cita["id_paciente"] != diagnostico.id_paciente:
+                errores.append({
+                    "fila": fila,
+                    "error": f"No se encontró una cita con ID {diagnostico.id_cita} "
+                             f"para el paciente {diagnostico.id_paciente}"
+                })
+                continue
+            pedido = {}
+            for formula in diagnostico.formulas:
+                pedido[formula.id_medicamento] = pedido.get(formula.id_medicamento, 0) + formula.cantidad
+            faltantes = sorted(pedido.keys() - stock.keys())
+            if faltantes:
+                errores.append({"fila": fila, "error": f"Medicamentos no encontrados: {faltantes}"})
+                continue
+            insuficientes = sorted(id_ for id_, cantidad in pedido.items() if disponible[id_] < cantidad)
+            if insuficientes:
+                errores.append({"fila": fila, "error": f"Stock insuficiente para los medicamentos: {insuficientes}"})
+                continue
+            for id_, cantidad in pedido.items():
+                disponible[id_] -= cantidad
+            aceptados.append((diagnostico, cita))
+
+        creados, formulas_por_diagnostico = [], {}
+        if aceptados:
+            creados = repository("diagnosticos", db).insert(
+                [diagnostico for diagnostico, _ in aceptados], [cita for _, cita in aceptados]
+            )
+            formulas = [
+                Formula(id_diagnostico=creado["id_diagnostico"], **formula.model_dump())
+                for creado, (diagnostico, _) in zip(creados, aceptados)
+                for formula in diagnostico.formulas
+            ]
+            for formula in repository("formulas", db).insert(formulas, stock) if formulas else []:
+                formulas_por_diagnostico.setdefault(formula.id_diagnostico, []).append(formula)
+        
+        db.commit()
+        return ResultadoDiagnosticosBulk(
+            diagnosticos=[
+                DiagnosticoDetalle(**creado, formulas=formulas_por_diagnostico.get(creado["id_diagnostico"], []))
+                for creado in creados
+            ],
+            errores=errores
+        )
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al crear los diagnósticos: {str(e)}"
+        )
 
 # Mantener solo un endpoint POST para crear diagnósticos
 @router.post("/diagnosticos/{id_cita}/{id_paciente}/", response_model=Diagnostico, tags=["Diagnósticos"])
 async def crear_diagnostico(
     id_cita: int,
     id_paciente: int,
-    diagnostico: DiagnosticoCreate
+    diagnostico: DiagnosticoCreate,
+    db=Depends(get_db)
 ):
     """
     Crea un diagnóstico en la base de datos.
     El id_cita y id_paciente se proporcionan como parámetros en la URL.
     """
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
-    
+    return await run_db(_crear_diagnostico, id_cita, id_paciente, diagnostico, db)
+
+
+def _crear_diagnostico(
+    id_cita: int,
+    id_paciente: int,
+    diagnostico: DiagnosticoCreate,
+    db
+):
     try:
         # Verificar que exista la cita
-        cursor.execute("""
-            SELECT c.*, p.nombre as nombre_paciente, e.nombre as nombre_especialista 
-            FROM citas c
-            JOIN pacientes p ON c.id_paciente = p.id_paciente
-            JOIN especialistas e ON c.id_especialista = e.id_especialista
-            WHERE c.id_cita = %s AND c.id_paciente = %s
-        """, (id_cita, id_paciente))
-        
-        cita = cursor.fetchone()
+        cita = repository("citas", db).get_for_paciente(id_cita, id_paciente)
         if not cita:
             raise HTTPException(
                 status_code=404,
@@ -468,104 +849,107 @@ async def crear_diagnostico(
             )
         
         # Insertar el diagnóstico
-        query = """
-        INSERT INTO diagnosticos (id_cita, id_paciente, descripcion, fecha_diagnostico)
-        VALUES (%s, %s, %s, %s)
-        """
-        
-        values = (
-            id_cita,
-            id_paciente,
-            diagnostico.descripcion,
-            diagnostico.fecha_diagnostico
+        [diagnostico_creado] = repository("diagnosticos", db).insert(
+            [DiagnosticoBulkCreate(id_cita=id_cita, id_paciente=id_paciente, **diagnostico.model_dump())],
+            [cita]
         )
         
-        cursor.execute(query, values)
-        id_diagnostico = cursor.lastrowid
-        
-        # Crear el objeto de respuesta
-        diagnostico_creado = {
-            "id_diagnostico": id_diagnostico,
-            "id_cita": id_cita,
-            "id_paciente": id_paciente,
-            "descripcion": diagnostico.descripcion,
-            "fecha_diagnostico": diagnostico.fecha_diagnostico,
-            "nombre_paciente": cita["nombre_paciente"],
-            "nombre_especialista": cita["nombre_especialista"]
-        }
-        
         db.commit()
         return Diagnostico(**diagnostico_creado)
 
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error al crear el diagnóstico: {str(e)}"
         )
-    finally:
-        cursor.close()
-        db.close()
 
 @router.get("/diagnosticos/", response_model=List[Diagnostico], tags=["Diagnósticos"])
-async def listar_diagnosticos():
+async def listar_diagnosticos(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    desde: date | None = None,
+    hasta: date | None = None,
+    especialidad: str | None = None,
+    fields: str | None = Query(None, description="Campos a devolver, separados por comas")
+):
     """
-    Obtiene la lista de todos los diagnósticos con información detallada
+    Obtiene una página de los diagnósticos con información detallada,
+    del más reciente al más antiguo; con `fields` solo se leen y devuelven
+    esos campos
     """
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
-    
+    campos = tuple(parse_fields(fields, Diagnostico))
+    diagnosticos, next_cursor = await _coalesced_read(
+        request, _listar_diagnosticos, limit, after, desde, hasta, especialidad, campos
+    )
+    return json_response(diagnosticos, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+def _listar_diagnosticos(
+    limit: int,
+    after: str | None,
+    desde: date | None,
+    hasta: date | None,
+    especialidad: str | None,
+    campos: tuple,
+    db
+):
     try:
-        query = """
-        SELECT 
-            d.*,
-            p.nombre as nombre_paciente,
-            e.nombre as nombre_especialista
-        FROM diagnosticos d
-        JOIN citas c ON d.id_cita = c.id_cita
-        JOIN pacientes p ON c.id_paciente = p.id_paciente
-        JOIN especialistas e ON c.id_especialista = e.id_especialista
-        ORDER BY d.fecha_diagnostico DESC
-        """
-        
-        cursor.execute(query)
-        diagnosticos = cursor.fetchall()
-        return [Diagnostico(**diagnostico) for diagnostico in diagnosticos]
+        diagnosticos, next_cursor = repository("diagnosticos", db).list_page(
+            limit, after, desde, hasta, especialidad, campos
+        )
+        return rows_to_json(Diagnostico, diagnosticos, campos), next_cursor
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al consultar los diagnósticos: {str(e)}"
         )
-    finally:
-        cursor.close()
-        db.close()
+
+@router.get("/diagnosticos/buscar", response_model=List[Diagnostico], tags=["Diagnósticos"])
+async def buscar_diagnosticos(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None
+):
+    """
+    Busca diagnósticos por su descripción (todas las palabras, como prefijo y
+    sin distinguir tildes), de mayor a menor relevancia
+    """
+    terms = fulltext_terms(q)
+    require_terms(terms)
+    diagnosticos, next_cursor = await _coalesced_read(request, _buscar_diagnosticos, terms, limit, after)
+    return json_response(diagnosticos, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+
+def _buscar_diagnosticos(terms: str, limit: int, after: str | None, db):
+    try:
+        diagnosticos, next_cursor = repository("diagnosticos", db).search(terms, limit, after)
+        return rows_to_json(Diagnostico, diagnosticos), next_cursor
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al buscar diagnósticos: {str(e)}")
 
 # Endpoint adicional para obtener diagnósticos por paciente
 @router.get("/diagnosticos/paciente/{id_paciente}", response_model=List[Diagnostico], tags=["Diagnósticos"])
-async def obtener_diagnosticos_por_paciente(id_paciente: int):
+async def obtener_diagnosticos_por_paciente(request: Request, id_paciente: int):
     """
     Obtiene todos los diagnósticos de un paciente específico
     """
-    db = get_db_connection()
-    cursor = db.cursor(dictionary=True)
-    
+    return json_response(await _coalesced_read(request, _obtener_diagnosticos_por_paciente, id_paciente))
+
+
+def _obtener_diagnosticos_por_paciente(id_paciente: int, db):
     try:
-        query = """
-        SELECT 
-            d.*,
-            p.nombre as nombre_paciente,
-            e.nombre as nombre_especialista
-        FROM diagnosticos d
-        JOIN citas c ON d.id_cita = c.id_cita
-        JOIN pacientes p ON c.id_paciente = p.id_paciente
-        JOIN especialistas e ON c.id_especialista = e.id_especialista
-        WHERE p.id_paciente = %s
-        ORDER BY d.fecha_diagnostico DESC
-        """
-        
-        cursor.execute(query, (id_paciente,))
-        diagnosticos = cursor.fetchall()
+        diagnosticos = repository("diagnosticos", db).for_paciente(id_paciente)
         
         if not diagnosticos:
             raise HTTPException(
@@ -573,13 +957,252 @@ async def obtener_diagnosticos_por_paciente(id_paciente: int):
                 detail=f"No se encontraron diagnósticos para el paciente {id_paciente}"
             )
             
-        return [Diagnostico(**diagnostico) for diagnostico in diagnosticos]
+        return rows_to_json(Diagnostico, diagnosticos)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al consultar los diagnósticos: {str(e)}"
         )
-    finally:
-        cursor.close()
-        db.close()
+
+
+# Estadísticas sobre las tablas de resumen (ver EstadisticaRepository)
+def _estadisticas(consulta: str, params: list, db):
+    try:
+        return getattr(repository("estadisticas", db), consulta)(*params)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al consultar las estadísticas: {str(e)}")
+
+
+@router.get(
+    "/estadisticas/citas/especialistas",
+    response_model=List[CitasEspecialistaDia],
+    tags=["Estadísticas"]
+)
+async def estadisticas_citas_especialistas(
+    desde: date,
+    hasta: date,
+    id_especialista: int | None = None,
+    db=Depends(get_db)
+):
+    """
+    Citas por especialista y día (todas las citas, en cualquier estado)
+    """
+    validate_range(desde, hasta)
+    return json_response(dumps(await run_db(
+        _estadisticas, "citas_por_especialista", [desde, hasta, id_especialista], db
+    )))
+
+
+@router.get(
+    "/estadisticas/citas/especialidades",
+    response_model=List[CitasEspecialidadDia],
+    tags=["Estadísticas"]
+)
+async def estadisticas_citas_especialidades(
+    desde: date,
+    hasta: date,
+    especialidad: str | None = None,
+    db=Depends(get_db)
+):
+    """
+    Citas por especialidad y día
+    """
+    validate_range(desde, hasta)
+    return json_response(dumps(await run_db(
+        _estadisticas, "citas_por_especialidad", [desde, hasta, especialidad], db
+    )))
+
+
+@router.get("/estadisticas/citas/estados", response_model=List[CitasPorEstado], tags=["Estadísticas"])
+async def estadisticas_citas_estados(
+    desde: date,
+    hasta: date,
+    especialidad: str | None = None,
+    db=Depends(get_db)
+):
+    """
+    Citas por estado y su porcentaje del total de la ventana; el de
+    `no_asistio` es la tasa de inasistencia
+    """
+    validate_range(desde, hasta)
+    estados = await run_db(_estadisticas, "citas_por_estado", [desde, hasta, especialidad], db)
+    total = sum(int(row["total"]) for row in estados)
+    return json_response(dumps([
+        {
+            "estado": row["estado"],
+            "total": int(row["total"]),
+            "porcentaje": round(100 * int(row["total"]) / total, 2)
+        }
+        for row in estados
+    ]))
+
+
+@router.get(
+    "/estadisticas/medicamentos/top",
+    response_model=List[MedicamentoPrescrito],
+    tags=["Estadísticas"]
+)
+async def estadisticas_medicamentos_top(
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    db=Depends(get_db)
+):
+    """
+    Medicamentos más recetados, por unidades
+    """
+    return json_response(dumps(await run_db(_estadisticas, "medicamentos_top", [limit], db)))
+
+
+@router.get("/estadisticas/diagnosticos/mensual", response_model=List[DiagnosticosMes], tags=["Estadísticas"])
+async def estadisticas_diagnosticos_mensual(
+    desde: date,
+    hasta: date,
+    especialidad: str | None = None,
+    db=Depends(get_db)
+):
+    """
+    Diagnósticos por mes (los meses de `desde` a `hasta`, inclusive)
+    """
+    validate_range(desde, hasta)
+    return json_response(dumps(await run_db(
+        _estadisticas, "diagnosticos_por_mes", [desde, hasta, especialidad], db
+    )))
+
+
+# Feed de cambios
+@router.get("/cambios", response_model=List[Cambio], tags=["Cambios"])
+async def listar_cambios(
+    request: Request,
+    since: str | None = None,
+    entidad: List[Literal[ENTIDADES]] | None = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """
+    Citas y diagnósticos creados después del token `since` (sin él, desde el
+    inicio del outbox), en orden. El token para continuar se devuelve siempre
+    en la cabecera X-Next-Cursor, aunque no haya cambios nuevos.
+
+    Con `Accept: text/event-stream` la respuesta es un stream Server-Sent
+    Events que sigue entregando cambios a medida que ocurren y se puede
+    reanudar con la cabecera Last-Event-ID.
+    """
+    entidades = tuple(entidad or ENTIDADES)
+    if "text/event-stream" in request.headers.get("accept", ""):
+        since_id = decode_since(request.headers.get("last-event-id") or since)
+        return StreamingResponse(
+            event_stream(since_id, entidades, limit),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    cambios, last_id = await fetch_changes(decode_since(since), entidades, limit)
+    return json_response(dumps(cambios), {NEXT_CURSOR_HEADER: since_token(last_id)})
+
+
+# Exportaciones completas por streaming
+CITA_COLUMNS = list(Cita.model_fields)
+DIAGNOSTICO_COLUMNS = list(Diagnostico.model_fields)
+
+
+@router.get("/export/citas.ndjson", tags=["Exportación"])
+async def exportar_citas_ndjson(request: Request):
+    """
+    Exporta todas las citas como JSON delimitado por líneas
+    """
+    return StreamingResponse(
+        stream_query(repository_class("citas").export_query, CITA_COLUMNS, ndjson_batch, request=request),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get("/export/citas.csv", tags=["Exportación"])
+async def exportar_citas_csv(request: Request):
+    """
+    Exporta todas las citas en formato CSV
+    """
+    return StreamingResponse(
+        stream_query(repository_class("citas").export_query, CITA_COLUMNS, csv_batch, header=csv_header(CITA_COLUMNS), request=request),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=citas.csv"}
+    )
+
+
+@router.get("/export/diagnosticos.ndjson", tags=["Exportación"])
+async def exportar_diagnosticos_ndjson(request: Request):
+    """
+    Exporta todos los diagnósticos como JSON delimitado por líneas
+    """
+    return StreamingResponse(
+        stream_query(repository_class("diagnosticos").export_query, DIAGNOSTICO_COLUMNS, ndjson_batch, request=request),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get("/export/diagnosticos.csv", tags=["Exportación"])
+async def exportar_diagnosticos_csv(request: Request):
+    """
+    Exporta todos los diagnósticos en formato CSV
+    """
+    return StreamingResponse(
+        stream_query(
+            repository_class("diagnosticos").export_query, DIAGNOSTICO_COLUMNS, csv_batch,
+            header=csv_header(DIAGNOSTICO_COLUMNS), request=request
+        ),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=diagnosticos.csv"}
+    )
+
+
+# Importaciones masivas asíncronas
+@router.post(
+    "/imports/{entidad}",
+    response_model=ImportJob,
+    status_code=202,
+    tags=["Importación"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {media_type: {"schema": {"type": "string"}} for media_type in FORMATS.values()}
+        }
+    }
+)
+async def importar(
+    entidad: Literal["pacientes", "especialistas", "medicamentos"],
+    request: Request,
+    response: Response,
+    formato: str | None = Query(None, pattern="^(csv|ndjson)$")
+):
+    """
+    Recibe un archivo CSV (con encabezado) o NDJSON y lo importa en segundo
+    plano por lotes. Consulte el avance en la URL del encabezado Location.
+    """
+    formato = detect_format(formato, request.headers.get("content-type"))
+    id_job = await receive_upload(request, entidad, formato)
+    async with db_session() as db:
+        job = await run_db(get_job, id_job, 0, db)
+    response.headers["Location"] = f"/imports/{id_job}"
+    return job
+
+
+@router.get("/imports/{id_job}", response_model=ImportJob, tags=["Importación"])
+async def obtener_importacion(
+    id_job: str,
+    errores_limit: int = Query(100, ge=0, le=MAX_PAGE_SIZE),
+    db=Depends(get_db)
+):
+    """
+    Avance de una importación: filas procesadas, insertadas y con error,
+    filas por segundo y los errores por fila
+    """
+    return await run_db(get_job, id_job, errores_limit, db)
+
+
+@router.post("/imports/{id_job}/reanudar", response_model=ImportJob, status_code=202, tags=["Importación"])
+async def reanudar_importacion(id_job: str):
+    """
+    Reanuda una importación fallida desde el último lote confirmado
+    """
+    await resume(id_job)
+    async with db_session() as db:
+        return await run_db(get_job, id_job, 0, db)
@@ -0,0 +1,47 @@
+import re
+from fastapi import HTTPException
+
+# Longitud mínima de palabra que indexa FULLTEXT en InnoDB (innodb_ft_min_token_size)
+MIN_TERM_LENGTH = 3
+MAX_TERMS = 8
+# La relevancia de MATCH se escala a entero para paginar por keyset sin
+# comparar flotantes
+SCORE_SCALE = 1000
+# Puntaje de una coincidencia por prefijo de documento: siempre antes que las de nombre
+DOCUMENT_SCORE = 1_000_000_000
+
+# Operadores del modo booleano de FULLTEXT que no deben venir del usuario
+_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+_DOCUMENT = re.compile(r"^(?=.*[0-9])[0-9A-Za-z.\-]+$")
+
+
+def fulltext_terms(q):
+    """
+    Convierte el texto buscado en una consulta FULLTEXT en modo booleano:
+    todas las palabras son obligatorias y cada una se busca como prefijo
+    ("ana gom" -> "+ana* +gom*"). Devuelve None si no queda ninguna palabra
+    indexable.
+    """
+    words = _OPERATORS.sub(" ", q).split()
+    terms = [word for word in words if len(word) >= MIN_TERM_LENGTH][:MAX_TERMS]
+    if not terms:
+        return None
+    return " ".join(f"+{term}*" for term in terms)
+
+
+def document_prefix(q):
+    """
+    Patrón LIKE para buscar por prefijo de documento, o None si `q` no parece un documento
+    """
+    q = q.strip()
+    if not _DOCUMENT.match(q):
+        return None
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def require_terms(*values):
+    if not any(values):
+        raise HTTPException(
+            status_code=400,
+            detail=f"La búsqueda necesita al menos una palabra de {MIN_TERM_LENGTH} letras o un documento"
+        )
@@ -0,0 +1,50 @@
+import json
+from typing import Any
+from fastapi import Response
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Serializador de pydantic-core sin esquema: no valida, solo convierte a JSON
+_any_adapter = TypeAdapter(Any)
+
+
+def project(model, row):
+    """
+    Fila reducida a los campos de `model`, en su orden
+    """
+    return {field: row.get(field) for field in model.model_fields}
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return _any_adapter.dump_json(data)
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def rows_to_json(model, rows, fields=None):
+    """
+    Serializa filas de la base de datos directamente a JSON con los campos
+    de `model` (o solo `fields`, si se indica), sin construir ni validar
+    modelos (los datos son de confianza).
+    Usa orjson si está instalado y si no, pydantic-core.
+    """
+    fields = fields or list(model.model_fields)
+    return dumps([{field: row.get(field) for field in fields} for row in rows])
+
+
+def json_response(body, headers=None):
+    """
+    Respuesta con un cuerpo JSON ya serializado; FastAPI no vuelve a
+    validarlo contra response_model, que solo documenta el esquema
+    """
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,54 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Agrupa las ejecuciones concurrentes con la misma llave: la primera corre
+    y las que llegan mientras sigue en curso esperan y reciben su mismo
+    resultado (o su misma excepción). No guarda nada al terminar, así que no
+    agrega datos viejos: una petición posterior vuelve a ejecutar.
+    """
+
+    def __init__(self):
+        self._in_flight = {}  # llave -> tarea
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    @staticmethod
+    def _retrieve(task):
+        # Si todos los que esperaban se cancelaron, nadie lee la excepción
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key, loader):
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            # En una tarea aparte para que, si el cliente que la inició se
+            # desconecta, la ejecución siga para los demás
+            task = asyncio.ensure_future(loader())
+            task.add_done_callback(self._retrieve)
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+
+    def stats(self):
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "in_flight": len(self._in_flight)
+        }
+
+
+# Lecturas de los listados y búsquedas, y cargas de la caché de referencia
+read_flight = SingleFlight()
@@ -0,0 +1,75 @@
+from datetime import date
+from fastapi import HTTPException
+
+# Ventana máxima de las consultas diarias
+ESTADISTICAS_MAX_DIAS = 366
+
+
+def _upsert(cursor, table, columns, increments, rows):
+    """
+    INSERT multi-fila que, si la llave ya existe, suma `increments` a la fila
+    existente en lugar de insertar
+    """
+    if not rows:
+        return
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    updates = ", ".join(f"{column} = {column} + nuevo.{column}" for column in increments)
+    cursor.execute(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        + ", ".join([placeholders] * len(rows))
+        + f" AS nuevo ON DUPLICATE KEY UPDATE {updates}",
+        tuple(value for row in rows for value in row)
+    )
+
+
+def record_citas(cursor, id_especialista, especialidad, values):
+    """
+    Suma las citas nuevas (filas id_paciente, id_especialista, fecha_hora, estado)
+    al resumen diario del especialista
+    """
+    totals = {}
+    for _, _, fecha_hora, estado in values:
+        key = (fecha_hora.date(), estado)
+        totals[key] = totals.get(key, 0) + 1
+    _upsert(
+        cursor, "est_citas_dia", ["dia", "id_especialista", "especialidad", "estado", "total"], ["total"],
+        [(dia, id_especialista, especialidad, estado, total) for (dia, estado), total in sorted(totals.items())]
+    )
+
+
+def record_formulas(cursor, formulas):
+    """
+    Suma fórmulas y unidades recetadas por medicamento
+    """
+    totals = {}
+    for formula in formulas:
+        count, units = totals.get(formula.id_medicamento, (0, 0))
+        totals[formula.id_medicamento] = (count + 1, units + formula.cantidad)
+    _upsert(
+        cursor, "est_medicamentos", ["id_medicamento", "formulas", "unidades"], ["formulas", "unidades"],
+        [(id_, count, units) for id_, (count, units) in sorted(totals.items())]
+    )
+
+
+def record_diagnosticos(cursor, rows):
+    """
+    Suma diagnósticos por mes y especialidad; `rows` son (fecha_diagnostico, especialidad)
+    """
+    totals = {}
+    for fecha, especialidad in rows:
+        key = (fecha.replace(day=1), especialidad)
+        totals[key] = totals.get(key, 0) + 1
+    _upsert(
+        cursor, "est_diagnosticos_mes", ["mes", "especialidad", "total"], ["total"],
+        [(mes, especialidad, total) for (mes, especialidad), total in sorted(totals.items())]
+    )
+
+
+def validate_range(desde: date, hasta: date):
+    if hasta < desde:
+        raise HTTPException(status_code=400, detail="hasta debe ser igual o posterior a desde")
+    if (hasta - desde).days >= ESTADISTICAS_MAX_DIAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"La ventana no puede superar {ESTADISTICAS_MAX_DIAS} días"
+        )
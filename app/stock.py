@@ -0,0 +1,116 @@
+import os
+from datetime import datetime
+from fastapi import HTTPException
+from .bulk import chunks, insert_many
+
+# Umbral por defecto de la consulta de stock bajo
+STOCK_BAJO_UMBRAL = int(os.getenv("STOCK_BAJO_UMBRAL", "10"))
+# Medicamentos por sentencia UPDATE al descontar stock
+STOCK_UPDATE_CHUNK_SIZE = 500
+
+MOTIVO_INICIAL = "inicial"
+MOTIVO_FORMULA = "formula"
+
+MOVIMIENTO_COLUMNS = [
+    "id_medicamento", "cantidad", "stock_resultante", "motivo", "id_formula", "creado_en"
+]
+
+
+def lock_stock(cursor, ids):
+    """
+    Lee y bloquea (FOR UPDATE) el stock de los medicamentos `ids`, en orden de
+    llave primaria para que lotes concurrentes que se solapan no se interbloqueen.
+    Devuelve {id_medicamento: stock}; los IDs inexistentes no aparecen.
+    """
+    stock = {}
+    for chunk in chunks(sorted(set(ids)), STOCK_UPDATE_CHUNK_SIZE):
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(
+            f"""
+            SELECT id_medicamento, stock FROM medicamentos
+            WHERE id_medicamento IN ({placeholders})
+            ORDER BY id_medicamento FOR UPDATE
+            """,
+            tuple(chunk)
+        )
+        for row in cursor.fetchall():
+            id_, value = (row["id_medicamento"], row["stock"]) if isinstance(row, dict) else row
+            stock[id_] = value
+    return stock
+
+
+def decrement_stock(cursor, demand, stock):
+    """
+    Descuenta `demand` ({id_medicamento: unidades}) sobre filas ya bloqueadas
+    con lock_stock, con un UPDATE por lote. Responde 409 sin descontar nada si
+    algún medicamento no alcanza. Devuelve el stock resultante por medicamento.
+    """
+    insuficientes = [
+        {"id_medicamento": id_, "stock": stock[id_], "solicitado": cantidad}
+        for id_, cantidad in sorted(demand.items()) if stock[id_] < cantidad
+    ]
+    if insuficientes:
+        raise HTTPException(
+            status_code=409,
+            detail={"mensaje": "Stock insuficiente", "insuficientes": insuficientes}
+        )
+
+    for chunk in chunks(sorted(demand), STOCK_UPDATE_CHUNK_SIZE):
+        case = " ".join(["WHEN %s THEN %s"] * len(chunk))
+        placeholders = ", ".join(["%s"] * len(chunk))
+        pairs = [value for id_ in chunk for value in (id_, demand[id_])]
+        # La condición stock >= n es redundante con el bloqueo, pero garantiza
+        # que ningún UPDATE deje el stock negativo
+        cursor.execute(
+            f"""
+            UPDATE medicamentos
+            SET stock = stock - CASE id_medicamento {case} END
+            WHERE id_medicamento IN ({placeholders})
+              AND stock >= CASE id_medicamento {case} END
+            """,
+            (*pairs, *chunk, *pairs)
+        )
+        if cursor.rowcount != len(chunk):
+            raise HTTPException(
+                status_code=409,
+                detail={"mensaje": "El stock cambió durante la operación; reintente"}
+            )
+    return {id_: stock[id_] - cantidad for id_, cantidad in demand.items()}
+
+
+def record_movements(cursor, movimientos):
+    """
+    Agrega filas al libro de movimientos de stock (solo inserción).
+    Cada movimiento es (id_medicamento, cantidad, stock_resultante, motivo, id_formula).
+    """
+    if movimientos:
+        now = datetime.now()
+        insert_many(
+            cursor, "movimientos_stock", MOVIMIENTO_COLUMNS,
+            [(*movimiento, now) for movimiento in movimientos]
+        )
+
+
+def initial_movements(ids, stocks):
+    """
+    Movimiento de alta de cada medicamento nuevo con su stock inicial
+    """
+    return [(id_, stock, stock, MOTIVO_INICIAL, None) for id_, stock in zip(ids, stocks)]
+
+
+def formula_movements(formulas, ids, stock_after):
+    """
+    Un movimiento por fórmula, con el stock que quedó tras cada una en el
+    orden de la petición
+    """
+    running = dict(stock_after)
+    for formula in formulas:
+        running[formula.id_medicamento] += formula.cantidad
+    movimientos = []
+    for id_formula, formula in zip(ids, formulas):
+        running[formula.id_medicamento] -= formula.cantidad
+        movimientos.append((
+            formula.id_medicamento, -formula.cantidad, running[formula.id_medicamento],
+            MOTIVO_FORMULA, id_formula
+        ))
+    return movimientos
@@ -0,0 +1,86 @@
+"""
+Benchmark de inserción masiva: filas por segundo con una sentencia por fila
+(comportamiento anterior) frente a INSERT multi-fila por lotes.
+
+La conexión es simulada: cada sentencia cuesta un viaje de ida y vuelta
+(--rtt-ms) más un costo por fila en el servidor (--fila-us), que es lo que
+domina en una importación real.
+
+Uso:
+    python -m benchmarks.bench_bulk_insert [--filas 5000] [--rtt-ms 0.5] [--lote 500]
+"""
+import argparse
+import time
+
+from app.bulk import insert_many
+
+COLUMNAS = ["id_paciente", "id_especialista", "fecha_hora", "estado"]
+
+
+class CursorSimulado:
+    def __init__(self, rtt, costo_fila):
+        self.rtt = rtt
+        self.costo_fila = costo_fila
+        self.lastrowid = 0
+        self.rowcount = 0
+        self.viajes = 0
+        self._siguiente_id = 1
+
+    def execute(self, query, params=()):
+        filas = max(1, len(params) // len(COLUMNAS))
+        time.sleep(self.rtt + self.costo_fila * filas)
+        self.viajes += 1
+        self.lastrowid = self._siguiente_id
+        self.rowcount = filas
+        self._siguiente_id += filas
+
+
+def antes(cursor, filas):
+    query = """
+    INSERT INTO citas (id_paciente, id_especialista, fecha_hora, estado)
+    VALUES (%s, %s, %s, %s)
+    """
+    ids = []
+    for fila in filas:
+        cursor.execute(query, fila)
+        ids.append(cursor.lastrowid)
+    return ids
+
+
+def despues(cursor, filas, lote):
+    return insert_many(cursor, "citas", COLUMNAS, filas, chunk_size=lote)
+
+
+def medir(nombre, fn, cursor, filas):
+    inicio = time.perf_counter()
+    ids = fn(cursor, filas)
+    total = time.perf_counter() - inicio
+    assert len(ids) == len(filas)
+    print(
+        f"{nombre:<28} {len(filas) / total:10.0f} filas/s"
+        f"  {total:7.2f} s  {cursor.viajes:6d} sentencias"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=5000)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    parser.add_argument("--fila-us", type=float, default=10)
+    parser.add_argument("--lote", type=int, default=500)
+    args = parser.parse_args()
+
+    filas = [(1, 1, "2024-01-01 08:00:00", "programada")] * args.filas
+    rtt, costo_fila = args.rtt_ms / 1000, args.fila_us / 1_000_000
+
+    medir("Antes: una sentencia/fila", antes, CursorSimulado(rtt, costo_fila), filas)
+    medir(
+        f"Después: lotes de {args.lote}",
+        lambda cursor, filas: despues(cursor, filas, args.lote),
+        CursorSimulado(rtt, costo_fila),
+        filas
+    )
+
+
+if __name__ == "__main__":
+    main()
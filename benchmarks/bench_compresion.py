@@ -0,0 +1,101 @@
+"""
+Benchmark de proyección y compresión: bytes en el cable y tiempo de punta a punta al recorrer listados de 50k filas.
+
+Recorre /citas/ y /diagnosticos/ página a página (limit=1000, con
+X-Next-Cursor) sobre el motor SQLite embebido, con todos los campos o solo
+los de `--fields`, y sin comprimir, con gzip o con brotli (si está
+instalado). El cliente descomprime cada respuesta, así que ese costo entra
+en el tiempo medido; la transferencia se estima aparte con `--mbps`, porque
+en proceso no hay red.
+
+Uso:
+    python -m benchmarks.bench_compresion [--pacientes 17000] [--filas 50000] \\
+        [--repeticiones 3] [--mbps 100]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app import compression, database
+from app.embedded import SQLiteConnection
+from app.main import app
+from app.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from benchmarks.carga import dataset, _copy
+
+RUTAS = {
+    "citas": ("/citas/", "id_cita,fecha_hora,estado"),
+    "diagnosticos": ("/diagnosticos/", "id_diagnostico,fecha_diagnostico,descripcion")
+}
+
+
+async def recorrer(client, ruta, filas, fields, encoding):
+    """
+    Pide páginas hasta leer `filas` filas o terminar el listado; devuelve
+    filas leídas, bytes recibidos (comprimidos, si aplica) y segundos
+    """
+    params = {"limit": MAX_PAGE_SIZE}
+    if fields:
+        params["fields"] = fields
+    headers = {"Accept-Encoding": encoding}
+    leidas, recibidos = 0, 0
+    start = time.perf_counter()
+    while leidas < filas:
+        response = await client.get(ruta, params=params, headers=headers)
+        response.raise_for_status()
+        leidas += len(response.json())
+        recibidos += response.num_bytes_downloaded
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+        params["after"] = cursor
+    return leidas, recibidos, time.perf_counter() - start
+
+
+async def run(args):
+    source = dataset(args.pacientes)
+    work = _copy(source, source.stem + "_run.db")
+    database.close_pool()
+    database.shutdown_executor()
+    database._pool = database.ConnectionPool(connect=lambda: SQLiteConnection(str(work)))
+    database.init_executor()
+
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for nombre, (ruta, fields) in RUTAS.items():
+            print(f"\n{nombre} (hasta {args.filas} filas, transferencia estimada a {args.mbps:g} Mbit/s)")
+            for proyeccion in (None, fields):
+                for encoding in encodings:
+                    await recorrer(client, ruta, MAX_PAGE_SIZE, proyeccion, encoding)  # calentamiento
+                    corridas = [
+                        await recorrer(client, ruta, args.filas, proyeccion, encoding)
+                        for _ in range(args.repeticiones)
+                    ]
+                    leidas, recibidos, _ = corridas[0]
+                    segundos = statistics.median(corrida[2] for corrida in corridas)
+                    red = recibidos * 8 / (args.mbps * 1_000_000)
+                    print(
+                        f"  {('fields=' + proyeccion) if proyeccion else 'todos los campos':<52}"
+                        f" {encoding:<9} {leidas:>7} filas {recibidos / 1024:>10.0f} KiB"
+                        f"  {segundos * 1000:8.0f} ms  + red {red * 1000:7.0f} ms"
+                        f"  = {(segundos + red) * 1000:8.0f} ms"
+                    )
+
+    database.shutdown_executor()
+    database.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pacientes", type=int, default=17000, help="17000 pacientes generan 51000 citas")
+    parser.add_argument("--filas", type=int, default=50000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--mbps", type=float, default=100.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark de concurrencia: latencia p50/p99 bajo carga mixta.
+
+Compara el comportamiento anterior (consultas bloqueantes en el event loop)
+con el ejecutor de base de datos. Usa conexiones simuladas que duermen el
+tiempo de una consulta, por lo que no requiere un servidor MySQL.
+
+Uso:
+    python -m benchmarks.bench_concurrencia [--peticiones 200] [--concurrencia 50]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+import httpx
+
+from app import database, routes
+from app.main import app
+
+LATENCIA_LENTA = 0.200   # listar_diagnosticos (join de tres tablas)
+LATENCIA_RAPIDA = 0.005  # listar_especialistas
+
+
+class CursorSimulado:
+    def __init__(self):
+        self._filas = []
+
+    def execute(self, query, params=None):
+        if "FROM diagnosticos" in query:
+            time.sleep(LATENCIA_LENTA)
+            self._filas = [{
+                "id_diagnostico": 1, "id_cita": 1, "id_paciente": 1,
+                "descripcion": "Control", "fecha_diagnostico": date(2024, 1, 1),
+                "nombre_paciente": "Ana", "nombre_especialista": "Luis"
+            }]
+        else:
+            time.sleep(LATENCIA_RAPIDA)
+            self._filas = [{
+                "id_especialista": 1, "documento": "1", "nombre": "Luis",
+                "especialidad": "Medicina general"
+            }]
+
+    def fetchall(self):
+        return self._filas
+
+    def close(self):
+        pass
+
+
+class ConexionSimulada:
+    in_transaction = False
+
+    def cursor(self, dictionary=False):
+        return CursorSimulado()
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    k = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[k]
+
+
+async def ejecutar_carga(peticiones, concurrencia):
+    latencias = {"/especialistas/": [], "/diagnosticos/": []}
+    semaforo = asyncio.Semaphore(concurrencia)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def una(ruta):
+            async with semaforo:
+                inicio = time.perf_counter()
+                r = await client.get(ruta)
+                r.raise_for_status()
+                latencias[ruta].append(time.perf_counter() - inicio)
+
+        # Mezcla: 1 consulta lenta por cada 4 rápidas
+        rutas = ["/diagnosticos/" if i % 5 == 0 else "/especialistas/" for i in range(peticiones)]
+        inicio = time.perf_counter()
+        await asyncio.gather(*(una(ruta) for ruta in rutas))
+        total = time.perf_counter() - inicio
+
+    return latencias, total
+
+
+async def escenario(nombre, bloqueante, peticiones, concurrencia):
+    database.close_pool()
+    database.shutdown_executor()
+    database._pool = database.ConnectionPool(
+        connect=ConexionSimulada, size=concurrencia, max_overflow=0
+    )
+    database.init_executor()
+
+    run_db_original = routes.run_db
+    if bloqueante:
+        async def en_linea(fn, *args, **kwargs):
+            return fn(*args, **kwargs)
+        routes.run_db = en_linea
+    try:
+        latencias, total = await ejecutar_carga(peticiones, concurrencia)
+    finally:
+        routes.run_db = run_db_original
+
+    print(f"\n{nombre}  ({peticiones} peticiones, concurrencia {concurrencia}, {total:.2f}s)")
+    for ruta, valores in latencias.items():
+        print(
+            f"  {ruta:<18} p50={statistics.median(valores) * 1000:8.1f} ms"
+            f"  p99={percentil(valores, 99) * 1000:8.1f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(escenario("Antes: consultas bloqueantes en el event loop", True, args.peticiones, args.concurrencia))
+    asyncio.run(escenario("Después: ejecutor de base de datos", False, args.peticiones, args.concurrencia))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark de serialización: CPU por respuesta de una lista de 10k citas.
+
+Antes: se construye un modelo Cita por fila y FastAPI lo vuelve a validar
+y serializar a través de response_model. Después: las filas se serializan
+directamente a JSON (rows_to_json) sin construir ni validar modelos.
+
+Uso:
+    python -m benchmarks.bench_serializacion [--filas 10000] [--repeticiones 20]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import serialization
+from app.models import Cita
+from app.serialization import json_response, rows_to_json
+
+
+def filas(n):
+    inicio = datetime(2024, 1, 1, 7, 0)
+    return [
+        {
+            "id_cita": i,
+            "id_paciente": i % 997 + 1,
+            "id_especialista": i % 31 + 1,
+            "fecha_hora": inicio + timedelta(minutes=30 * i),
+            "estado": "programada",
+            "nombre_paciente": "María Fernanda Rodríguez Gómez",
+            "nombre_especialista": "Luis Alberto Hernández Núñez"
+        }
+        for i in range(n)
+    ]
+
+
+def construir_app(rows):
+    app = FastAPI()
+
+    @app.get("/antes", response_model=List[Cita])
+    def antes():
+        return [Cita(**row) for row in rows]
+
+    @app.get("/despues", response_model=List[Cita])
+    def despues():
+        return json_response(rows_to_json(Cita, rows))
+
+    return app
+
+
+def medir(client, ruta, repeticiones):
+    client.get(ruta)  # calentamiento
+    cpu = time.process_time()
+    pared = time.perf_counter()
+    for _ in range(repeticiones):
+        client.get(ruta).raise_for_status()
+    return (
+        (time.process_time() - cpu) / repeticiones * 1000,
+        (time.perf_counter() - pared) / repeticiones * 1000
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = filas(args.filas)
+    client = TestClient(construir_app(rows))
+
+    resultados = [("Antes: modelos + response_model", "/antes")]
+    if serialization.orjson is not None:
+        resultados.append(("Después: rows_to_json (orjson)", "/despues"))
+    for nombre, ruta in resultados:
+        cpu, pared = medir(client, ruta, args.repeticiones)
+        print(f"{nombre:<40} CPU {cpu:8.1f} ms/respuesta   total {pared:8.1f} ms")
+
+    serialization.orjson = None
+    cpu, pared = medir(client, "/despues", args.repeticiones)
+    print(f"{'Después: rows_to_json (pydantic-core)':<40} CPU {cpu:8.1f} ms/respuesta   total {pared:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
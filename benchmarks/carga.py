@@ -0,0 +1,290 @@
+"""
+Suite de carga por endpoint sobre el motor SQLite embebido (app/embedded.py).
+
+Para cada tamaño de datos genera (o reutiliza) una base sembrada, arranca
+la aplicación en proceso y mide throughput y latencia p50/p95/p99 de cada
+ruta con varios niveles de concurrencia. El reporte JSON se puede comparar
+con el de otra corrida.
+
+Uso:
+    python -m benchmarks.carga --pacientes 1000 10000 --concurrencia 1 8 32 \\
+        --peticiones 200 --reporte bench_output.json
+    python -m benchmarks.carga --comparar antes.json despues.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+from app import database
+from app.main import app
+from benchmarks import datos
+from app.embedded import SQLiteConnection
+
+DATA_DIR = Path(tempfile.gettempdir()) / "hospital_bench"
+
+_documentos = itertools.count(1)
+INICIO_AGENDA = datetime(2030, 1, 1, 8, 0)
+
+
+def _bulk_pacientes(n, rng):
+    return "POST", "/pacientes/bulk", [
+        {
+            "documento": f"B{next(_documentos):012d}",
+            "nombre": "Paciente de carga",
+            "fecha_nacimiento": "1990-05-17",
+            "telefono": "3000000000"
+        }
+        for _ in range(20)
+    ]
+
+
+def _bulk_especialistas(n, rng):
+    return "POST", "/especialistas/bulk", [
+        {"documento": f"BE{next(_documentos):011d}", "nombre": "Especialista de carga", "especialidad": "Cardiología"}
+        for _ in range(5)
+    ]
+
+
+def _bulk_medicamentos(n, rng):
+    return "POST", "/medicamentos/bulk", [
+        {"nombre": "Medicamento de carga", "descripcion": "10 mg", "stock": 100} for _ in range(20)
+    ]
+
+
+def _bulk_citas(n, rng):
+    paciente = rng.randrange(1, n["pacientes"] + 1)
+    especialista = rng.randrange(1, n["especialistas"] + 1)
+    # Horarios distintos de media hora en una ventana amplia, para que los
+    # rechazos por cruce de agenda (409) sean raros
+    horarios = rng.sample(range(5 * 365 * 20), 10)
+    return "POST", f"/citas/{paciente}/{especialista}/", [
+        {
+            "fecha_hora": (INICIO_AGENDA + timedelta(days=h // 20, minutes=30 * (h % 20))).isoformat() + "Z",
+            "estado": "programada"
+        }
+        for h in horarios
+    ]
+
+
+def _bulk_formulas(n, rng):
+    return "POST", "/formulas/bulk", [
+        {
+            "id_diagnostico": rng.randrange(1, n["diagnosticos"] + 1),
+            "id_medicamento": rng.randrange(1, n["medicamentos"] + 1),
+            "dosis": "1 tableta cada 8 horas",
+            "duracion": 7
+        }
+        for _ in range(20)
+    ]
+
+
+def _diagnostico(n, rng):
+    cita = rng.randrange(1, n["citas"] + 1)
+    paciente = (cita - 1) % n["pacientes"] + 1
+    return "POST", f"/diagnosticos/{cita}/{paciente}/", {
+        "descripcion": "Control de carga", "fecha_diagnostico": "2026-01-15"
+    }
+
+
+def _bulk_diagnosticos(n, rng):
+    filas = []
+    for _ in range(20):
+        cita = rng.randrange(1, n["citas"] + 1)
+        filas.append({
+            "id_cita": cita,
+            "id_paciente": (cita - 1) % n["pacientes"] + 1,
+            "descripcion": "Control de carga",
+            "fecha_diagnostico": "2026-01-15"
+        })
+    return "POST", "/diagnosticos/bulk", filas
+
+
+def _get(path):
+    return lambda n, rng: ("GET", path, None)
+
+
+ESCENARIOS = {
+    "listar_pacientes": _get("/pacientes/"),
+    "listar_especialistas": _get("/especialistas/"),
+    "listar_citas": _get("/citas/"),
+    "listar_citas_filtradas": _get("/citas/?estado=programada&desde=2023-06-01T00:00:00"),
+    "listar_medicamentos": _get("/medicamentos/"),
+    "listar_formulas": _get("/formulas/"),
+    "listar_diagnosticos": _get("/diagnosticos/"),
+    "diagnosticos_por_paciente": lambda n, rng: ("GET", f"/diagnosticos/paciente/{rng.randrange(1, n['pacientes'] + 1)}", None),
+    "crear_pacientes_bulk": _bulk_pacientes,
+    "crear_especialistas_bulk": _bulk_especialistas,
+    "crear_medicamentos_bulk": _bulk_medicamentos,
+    "crear_citas_bulk": _bulk_citas,
+    "crear_formulas_bulk": _bulk_formulas,
+    "crear_diagnostico": _diagnostico,
+    "crear_diagnosticos_bulk": _bulk_diagnosticos,
+}
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def dataset(n_pacientes):
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    path = DATA_DIR / f"hospital_{n_pacientes}.db"
+    if not path.exists():
+        print(f"Generando datos para {n_pacientes} pacientes en {path}...")
+        tmp = path.with_suffix(".tmp")
+        for leftover in DATA_DIR.glob(tmp.name + "*"):
+            leftover.unlink()
+        datos.generate(str(tmp), n_pacientes)
+        tmp.rename(path)
+    return path
+
+
+async def run_scenario(client, build, sizes, concurrency, requests, seed):
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        method, path, body = build(sizes, rng)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3)
+    }
+
+
+def _copy(source, name):
+    target = source.with_name(name)
+    for leftover in DATA_DIR.glob(target.name + "*"):
+        leftover.unlink()
+    target.write_bytes(source.read_bytes())
+    return target
+
+
+async def run_dataset(n_pacientes, concurrencies, requests, scenarios, replicas=0):
+    source = dataset(n_pacientes)
+    # Cada corrida trabaja sobre una copia para no acumular escrituras
+    work = _copy(source, source.stem + "_run.db")
+    # Las réplicas son copias estáticas: no reciben las escrituras de la corrida
+    replica_paths = [_copy(source, f"{source.stem}_replica{i}.db") for i in range(replicas)]
+
+    database.close_pool()
+    database.shutdown_executor()
+    database._pool = database.ConnectionPool(connect=lambda: SQLiteConnection(str(work)))
+    database._replicas = database.ReplicaSet(
+        (database.ConnectionPool(connect=lambda path=path: SQLiteConnection(str(path))) for path in replica_paths),
+        check=lambda conn: conn.ping()
+    )
+    database.init_executor()
+
+    sizes = datos.sizes(n_pacientes)
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in scenarios:
+            for concurrency in concurrencies:
+                result = await run_scenario(client, ESCENARIOS[name], sizes, concurrency, requests, seed=concurrency)
+                result.update({"dataset": n_pacientes, "route": name, "concurrency": concurrency})
+                results.append(result)
+                print(
+                    f"{n_pacientes:>8} {name:<26} c={concurrency:<3} {result['throughput_rps']:9.1f} rps"
+                    f"  p50={result['p50_ms']:8.2f}  p95={result['p95_ms']:8.2f}"
+                    f"  p99={result['p99_ms']:8.2f} ms  errores={result['errors']}"
+                )
+
+    database.shutdown_executor()
+    database.close_pool()
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(base_path, new_path):
+    base = {(r["dataset"], r["route"], r["concurrency"]): r for r in json.loads(Path(base_path).read_text())["results"]}
+    new = json.loads(Path(new_path).read_text())["results"]
+    print(f"{'dataset':>8} {'ruta':<26} {'c':<3} {'rps':>18} {'p99 ms':>22}")
+    for r in new:
+        b = base.get((r["dataset"], r["route"], r["concurrency"]))
+        if b is None:
+            continue
+        rps = (r["throughput_rps"] / b["throughput_rps"] - 1) * 100 if b["throughput_rps"] else 0
+        p99 = (r["p99_ms"] / b["p99_ms"] - 1) * 100 if b["p99_ms"] else 0
+        print(
+            f"{r['dataset']:>8} {r['route']:<26} {r['concurrency']:<3}"
+            f" {b['throughput_rps']:8.1f}→{r['throughput_rps']:<8.1f}({rps:+.0f}%)"
+            f" {b['p99_ms']:8.2f}→{r['p99_ms']:<8.2f}({p99:+.0f}%)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pacientes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--concurrencia", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--replicas", type=int, default=0, help="réplicas de lectura (copias de la base)")
+    parser.add_argument("--rutas", nargs="+", choices=sorted(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument("--reporte", default="bench_output.json")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVO"))
+    args = parser.parse_args()
+
+    if args.comparar:
+        compare(*args.comparar)
+        return
+
+    results = []
+    for n_pacientes in args.pacientes:
+        results.extend(asyncio.run(run_dataset(n_pacientes, args.concurrencia, args.peticiones, args.rutas, args.replicas)))
+
+    report = {
+        "meta": {
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "peticiones": args.peticiones,
+            "concurrencia": args.concurrencia,
+            "pacientes": args.pacientes,
+            "replicas": args.replicas
+        },
+        "results": results
+    }
+    Path(args.reporte).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\nReporte escrito en {args.reporte}")
+
+
+if __name__ == "__main__":
+    main()
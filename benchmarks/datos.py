@@ -0,0 +1,156 @@
+"""
+Generador determinista de datos sintéticos para las seis entidades.
+
+Proporciones por cada paciente: 3 citas, 1 diagnóstico y 1,5 fórmulas;
+un especialista por cada 50 pacientes y 500 medicamentos fijos.
+
+Uso:
+    python -m benchmarks.datos --pacientes 100000 --salida /tmp/hospital.db
+"""
+import argparse
+import random
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+from app.embedded import REBUILD_SUMMARIES, create_schema
+
+NOMBRES = [
+    "Ana", "Luis", "María", "José", "Camila", "Andrés", "Lucía", "Jorge",
+    "Valentina", "Mateo", "Sofía", "Ángel", "Isabel", "Tomás", "Paula", "Nicolás"
+]
+APELLIDOS = [
+    "García", "Rodríguez", "Martínez", "Hernández", "López", "González",
+    "Pérez", "Sánchez", "Ramírez", "Torres", "Núñez", "Muñoz", "Díaz", "Gómez"
+]
+ESPECIALIDADES = [
+    "Medicina general", "Cardiología", "Pediatría", "Dermatología",
+    "Neurología", "Ortopedia", "Ginecología", "Oftalmología"
+]
+ESTADOS = ["programada", "completada", "cancelada", "no_asistio"]
+DIAGNOSTICOS = [
+    "Hipertensión arterial", "Diabetes tipo 2", "Migraña crónica", "Rinitis alérgica",
+    "Gastritis", "Lumbalgia mecánica", "Dermatitis atópica", "Asma bronquial"
+]
+LOTE = 10000
+MEDICAMENTOS = 500
+INICIO = datetime(2023, 1, 2, 7, 0)
+
+
+def sizes(pacientes):
+    return {
+        "pacientes": pacientes,
+        "especialistas": max(1, pacientes // 50),
+        "medicamentos": MEDICAMENTOS,
+        "citas": pacientes * 3,
+        "diagnosticos": pacientes,
+        "formulas": pacientes * 3 // 2
+    }
+
+
+def nombre(rng):
+    return f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+
+
+def pacientes(n, rng):
+    for i in range(1, n + 1):
+        nacimiento = date(1940, 1, 1) + timedelta(days=rng.randrange(30000))
+        yield (f"P{i:09d}", nombre(rng), nacimiento.isoformat(), f"3{rng.randrange(10**9):09d}")
+
+
+def especialistas(n, rng):
+    for i in range(1, n + 1):
+        yield (f"E{i:09d}", nombre(rng), ESPECIALIDADES[i % len(ESPECIALIDADES)])
+
+
+def medicamentos(n, rng):
+    for i in range(1, n + 1):
+        yield (f"Medicamento {i:04d}", f"Presentación {rng.randrange(1, 20)} mg", rng.randrange(0, 5000))
+
+
+def citas(n, n_pacientes, n_especialistas, rng):
+    # La cita i pertenece al paciente ((i - 1) % n_pacientes) + 1
+    for i in range(1, n + 1):
+        fecha = INICIO + timedelta(minutes=30 * rng.randrange(0, 2 * 365 * 20))
+        yield (
+            (i - 1) % n_pacientes + 1,
+            rng.randrange(1, n_especialistas + 1),
+            fecha.isoformat(sep=" "),
+            rng.choice(ESTADOS)
+        )
+
+
+def diagnosticos(n, n_pacientes, rng):
+    # El diagnóstico i corresponde a la cita i (y a su paciente)
+    for i in range(1, n + 1):
+        fecha = INICIO.date() + timedelta(days=rng.randrange(730))
+        yield (i, (i - 1) % n_pacientes + 1, rng.choice(DIAGNOSTICOS), fecha.isoformat())
+
+
+def formulas(n, n_diagnosticos, rng):
+    for _ in range(n):
+        yield (
+            rng.randrange(1, n_diagnosticos + 1),
+            rng.randrange(1, MEDICAMENTOS + 1),
+            f"{rng.randrange(1, 3)} tableta(s) cada {rng.choice([6, 8, 12, 24])} horas",
+            rng.randrange(3, 31)
+        )
+
+
+def _insert(connection, table, columns, rows):
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= LOTE:
+            connection.executemany(query, batch)
+            batch.clear()
+    if batch:
+        connection.executemany(query, batch)
+    connection.commit()
+
+
+def generate(path, n_pacientes, seed=42):
+    """
+    Crea y llena una base SQLite en `path`; devuelve el tamaño de cada tabla
+    """
+    rng = random.Random(seed)
+    n = sizes(n_pacientes)
+    create_schema(path)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=OFF")
+    try:
+        _insert(connection, "pacientes", ["documento", "nombre", "fecha_nacimiento", "telefono"],
+                pacientes(n["pacientes"], rng))
+        _insert(connection, "especialistas", ["documento", "nombre", "especialidad"],
+                especialistas(n["especialistas"], rng))
+        _insert(connection, "medicamentos", ["nombre", "descripcion", "stock"],
+                medicamentos(n["medicamentos"], rng))
+        _insert(connection, "citas", ["id_paciente", "id_especialista", "fecha_hora", "estado"],
+                citas(n["citas"], n["pacientes"], n["especialistas"], rng))
+        _insert(connection, "diagnosticos", ["id_cita", "id_paciente", "descripcion", "fecha_diagnostico"],
+                diagnosticos(n["diagnosticos"], n["pacientes"], rng))
+        _insert(connection, "formulas", ["id_diagnostico", "id_medicamento", "dosis", "duracion"],
+                formulas(n["formulas"], n["diagnosticos"], rng))
+        connection.executescript(REBUILD_SUMMARIES)
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pacientes", type=int, default=1000)
+    parser.add_argument("--salida", required=True)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    n = generate(args.salida, args.pacientes, args.semilla)
+    print(f"{args.salida}: {n} en {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+-- Esquema inicial de la base de datos de gestión hospitalaria (ver Esquema.png).
+-- Cada llave foránea tiene un índice con nombre cuya primera columna es la llave.
+
+CREATE TABLE IF NOT EXISTS pacientes (
+    id_paciente INT AUTO_INCREMENT PRIMARY KEY,
+    documento VARCHAR(20) NOT NULL,
+    nombre VARCHAR(100) NOT NULL,
+    fecha_nacimiento DATE NOT NULL,
+    telefono VARCHAR(15) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS especialistas (
+    id_especialista INT AUTO_INCREMENT PRIMARY KEY,
+    documento VARCHAR(20) NOT NULL,
+    nombre VARCHAR(100) NOT NULL,
+    especialidad VARCHAR(50) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS citas (
+    id_cita INT AUTO_INCREMENT PRIMARY KEY,
+    id_paciente INT NOT NULL,
+    id_especialista INT NOT NULL,
+    fecha_hora DATETIME NOT NULL,
+    estado VARCHAR(20) NOT NULL,
+    KEY idx_citas_paciente_fecha_hora (id_paciente, fecha_hora),
+    KEY idx_citas_especialista_fecha_hora (id_especialista, fecha_hora),
+    CONSTRAINT fk_citas_paciente FOREIGN KEY (id_paciente) REFERENCES pacientes (id_paciente),
+    CONSTRAINT fk_citas_especialista FOREIGN KEY (id_especialista) REFERENCES especialistas (id_especialista)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS medicamentos (
+    id_medicamento INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(100) NOT NULL,
+    descripcion TEXT NOT NULL,
+    stock INT NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS diagnosticos (
+    id_diagnostico INT AUTO_INCREMENT PRIMARY KEY,
+    id_cita INT NOT NULL,
+    id_paciente INT NOT NULL,
+    descripcion TEXT NOT NULL,
+    fecha_diagnostico DATE NOT NULL,
+    KEY idx_diagnosticos_cita (id_cita),
+    KEY idx_diagnosticos_paciente_fecha (id_paciente, fecha_diagnostico),
+    CONSTRAINT fk_diagnosticos_cita FOREIGN KEY (id_cita) REFERENCES citas (id_cita),
+    CONSTRAINT fk_diagnosticos_paciente FOREIGN KEY (id_paciente) REFERENCES pacientes (id_paciente)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS formulas (
+    id_formula INT AUTO_INCREMENT PRIMARY KEY,
+    id_diagnostico INT NOT NULL,
+    id_medicamento INT NOT NULL,
+    dosis VARCHAR(50) NOT NULL,
+    duracion INT NOT NULL,
+    KEY idx_formulas_diagnostico (id_diagnostico),
+    KEY idx_formulas_medicamento (id_medicamento),
+    CONSTRAINT fk_formulas_diagnostico FOREIGN KEY (id_diagnostico) REFERENCES diagnosticos (id_diagnostico),
+    CONSTRAINT fk_formulas_medicamento FOREIGN KEY (id_medicamento) REFERENCES medicamentos (id_medicamento)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
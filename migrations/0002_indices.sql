@@ -0,0 +1,23 @@
+-- Índices para el orden y los filtros de los listados de app/routes.py.
+-- InnoDB agrega la llave primaria al final de cada índice secundario, así que
+-- (nombre) sirve para la paginación por (nombre, id).
+
+-- Llaves naturales: también las usa la recuperación de IDs en los bulk
+ALTER TABLE pacientes
+    ADD UNIQUE KEY uq_pacientes_documento (documento),
+    ADD KEY idx_pacientes_nombre (nombre);
+
+ALTER TABLE especialistas
+    ADD UNIQUE KEY uq_especialistas_documento (documento),
+    ADD KEY idx_especialistas_nombre (nombre),
+    ADD KEY idx_especialistas_especialidad_nombre (especialidad, nombre);
+
+ALTER TABLE citas
+    ADD KEY idx_citas_fecha_hora (fecha_hora),
+    ADD KEY idx_citas_estado_fecha_hora (estado, fecha_hora);
+
+ALTER TABLE medicamentos
+    ADD KEY idx_medicamentos_nombre (nombre);
+
+ALTER TABLE diagnosticos
+    ADD KEY idx_diagnosticos_fecha (fecha_diagnostico);
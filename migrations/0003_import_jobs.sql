@@ -0,0 +1,28 @@
+-- Trabajos de importación masiva y sus errores por fila.
+-- El avance se actualiza en la misma transacción que cada lote insertado,
+-- así un trabajo interrumpido se reanuda desde el último lote confirmado.
+
+CREATE TABLE IF NOT EXISTS import_jobs (
+    id_job CHAR(32) PRIMARY KEY,
+    entidad VARCHAR(30) NOT NULL,
+    formato VARCHAR(10) NOT NULL,
+    archivo VARCHAR(255) NOT NULL,
+    estado VARCHAR(20) NOT NULL,
+    bytes_recibidos BIGINT NOT NULL DEFAULT 0,
+    filas_procesadas INT NOT NULL DEFAULT 0,
+    filas_insertadas INT NOT NULL DEFAULT 0,
+    filas_con_error INT NOT NULL DEFAULT 0,
+    error TEXT NULL,
+    creado_en DATETIME NOT NULL,
+    iniciado_en DATETIME NULL,
+    actualizado_en DATETIME NOT NULL,
+    KEY idx_import_jobs_estado (estado)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS import_job_errores (
+    id_job CHAR(32) NOT NULL,
+    fila INT NOT NULL,
+    error TEXT NOT NULL,
+    PRIMARY KEY (id_job, fila),
+    CONSTRAINT fk_import_job_errores_job FOREIGN KEY (id_job) REFERENCES import_jobs (id_job)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,12 @@
+-- Búsqueda de texto en pacientes (nombre) y diagnósticos (descripción).
+-- La intercalación _ai_ci hace que tanto FULLTEXT como LIKE ignoren tildes
+-- y mayúsculas ("jose" encuentra "José"). La búsqueda por documento usa el
+-- índice único uq_pacientes_documento como prefijo (LIKE 'q%').
+
+ALTER TABLE pacientes
+    MODIFY nombre VARCHAR(100) NOT NULL COLLATE utf8mb4_0900_ai_ci,
+    ADD FULLTEXT KEY ft_pacientes_nombre (nombre);
+
+ALTER TABLE diagnosticos
+    MODIFY descripcion TEXT NOT NULL COLLATE utf8mb4_0900_ai_ci,
+    ADD FULLTEXT KEY ft_diagnosticos_descripcion (descripcion);
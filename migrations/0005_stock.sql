@@ -0,0 +1,23 @@
+-- Stock de medicamentos: unidades por fórmula, libro de movimientos de solo
+-- inserción e índice para la consulta de stock bajo.
+
+ALTER TABLE formulas
+    ADD COLUMN cantidad INT NOT NULL DEFAULT 1;
+
+ALTER TABLE medicamentos
+    ADD CONSTRAINT chk_medicamentos_stock CHECK (stock >= 0),
+    ADD KEY idx_medicamentos_stock (stock);
+
+CREATE TABLE IF NOT EXISTS movimientos_stock (
+    id_movimiento BIGINT AUTO_INCREMENT PRIMARY KEY,
+    id_medicamento INT NOT NULL,
+    cantidad INT NOT NULL,
+    stock_resultante INT NOT NULL,
+    motivo VARCHAR(20) NOT NULL,
+    id_formula INT NULL,
+    creado_en DATETIME NOT NULL,
+    KEY idx_movimientos_stock_medicamento (id_medicamento, id_movimiento),
+    KEY idx_movimientos_stock_formula (id_formula),
+    CONSTRAINT fk_movimientos_stock_medicamento FOREIGN KEY (id_medicamento) REFERENCES medicamentos (id_medicamento),
+    CONSTRAINT fk_movimientos_stock_formula FOREIGN KEY (id_formula) REFERENCES formulas (id_formula)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
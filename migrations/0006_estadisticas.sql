@@ -0,0 +1,48 @@
+-- Tablas de resumen para /estadisticas. Las mantienen las rutas de escritura
+-- en la misma transacción que cada inserción (ver app/stats.py); aquí se
+-- llenan una única vez con los datos existentes.
+
+CREATE TABLE IF NOT EXISTS est_citas_dia (
+    dia DATE NOT NULL,
+    id_especialista INT NOT NULL,
+    especialidad VARCHAR(50) NOT NULL,
+    estado VARCHAR(20) NOT NULL,
+    total INT NOT NULL,
+    PRIMARY KEY (dia, id_especialista, estado),
+    KEY idx_est_citas_dia_especialidad (especialidad, dia),
+    KEY idx_est_citas_dia_especialista (id_especialista, dia)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS est_medicamentos (
+    id_medicamento INT PRIMARY KEY,
+    formulas INT NOT NULL,
+    unidades INT NOT NULL,
+    KEY idx_est_medicamentos_unidades (unidades),
+    CONSTRAINT fk_est_medicamentos_medicamento FOREIGN KEY (id_medicamento) REFERENCES medicamentos (id_medicamento)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS est_diagnosticos_mes (
+    mes DATE NOT NULL,
+    especialidad VARCHAR(50) NOT NULL,
+    total INT NOT NULL,
+    PRIMARY KEY (mes, especialidad),
+    KEY idx_est_diagnosticos_mes_especialidad (especialidad, mes)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO est_citas_dia (dia, id_especialista, especialidad, estado, total)
+SELECT DATE(c.fecha_hora), c.id_especialista, e.especialidad, c.estado, COUNT(*)
+FROM citas c
+JOIN especialistas e ON c.id_especialista = e.id_especialista
+GROUP BY DATE(c.fecha_hora), c.id_especialista, e.especialidad, c.estado;
+
+INSERT INTO est_medicamentos (id_medicamento, formulas, unidades)
+SELECT id_medicamento, COUNT(*), SUM(cantidad)
+FROM formulas
+GROUP BY id_medicamento;
+
+INSERT INTO est_diagnosticos_mes (mes, especialidad, total)
+SELECT DATE_FORMAT(d.fecha_diagnostico, '%Y-%m-01'), e.especialidad, COUNT(*)
+FROM diagnosticos d
+JOIN citas c ON d.id_cita = c.id_cita
+JOIN especialistas e ON c.id_especialista = e.id_especialista
+GROUP BY DATE_FORMAT(d.fecha_diagnostico, '%Y-%m-01'), e.especialidad;
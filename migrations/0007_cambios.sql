@@ -0,0 +1,12 @@
+-- Outbox de solo inserción para el feed /cambios. Las rutas de escritura de
+-- citas y diagnósticos agregan una fila por registro en su misma transacción.
+-- No se llena con los datos existentes: el estado inicial se toma de /export.
+
+CREATE TABLE IF NOT EXISTS cambios (
+    id_cambio BIGINT AUTO_INCREMENT PRIMARY KEY,
+    entidad VARCHAR(20) NOT NULL,
+    id_registro INT NOT NULL,
+    operacion VARCHAR(10) NOT NULL,
+    datos JSON NOT NULL,
+    creado_en DATETIME(6) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import backends, database
+from app.backends import SQLiteBackend, set_backend
+from app.cache import reference_cache
+from app.main import app
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "hospital.db")
+
+
+@pytest.fixture
+def client(db_path):
+    """
+    Aplicación completa sobre una base SQLite nueva (app/embedded.py)
+    """
+    previous = backends._backend
+    database.close_pool()
+    set_backend(SQLiteBackend(db_path))
+    # La caché de referencia vive en el proceso: sin esto se verían datos de otra prueba
+    for namespace in ("especialistas", "medicamentos"):
+        asyncio.run(reference_cache.invalidate(namespace))
+    with TestClient(app) as client:
+        yield client
+    database.close_pool()
+    set_backend(previous)
+
+
+@pytest.fixture
+def datos(client):
+    """
+    Dos pacientes y dos especialistas; devuelve sus IDs
+    """
+    pacientes = client.post("/pacientes/bulk", json=[
+        {"documento": "1001", "nombre": "Ana Gómez", "fecha_nacimiento": "1990-05-17", "telefono": "3001112233"},
+        {"documento": "1002", "nombre": "José Díaz", "fecha_nacimiento": "1985-02-03", "telefono": "3004445566"}
+    ])
+    especialistas = client.post("/especialistas/bulk", json=[
+        {"documento": "2001", "nombre": "Luis Hernández", "especialidad": "Cardiología"},
+        {"documento": "2002", "nombre": "Isabel Torres", "especialidad": "Pediatría"}
+    ])
+    assert pacientes.status_code == 200, pacientes.text
+    assert especialistas.status_code == 200, especialistas.text
+    return {
+        "pacientes": [paciente["id_paciente"] for paciente in pacientes.json()],
+        "especialistas": [especialista["id_especialista"] for especialista in especialistas.json()]
+    }
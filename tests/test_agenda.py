@@ -0,0 +1,41 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_reservas_concurrentes_del_mismo_horario_aceptan_solo_una(client, datos):
+    ana, jose = datos["pacientes"]
+    id_especialista = datos["especialistas"][0]
+    for dia in range(1, 6):
+        # Dos pacientes piden a la vez horarios que se cruzan (10:00 y 10:15)
+        pedidos = [
+            (ana, [{"fecha_hora": f"2030-01-0{dia}T10:00:00Z", "estado": "programada"}]),
+            (jose, [{"fecha_hora": f"2030-01-0{dia}T10:15:00Z", "estado": "programada"}])
+        ]
+        barrera = threading.Barrier(len(pedidos))
+
+        def reservar(pedido):
+            id_paciente, citas = pedido
+            barrera.wait()
+            return client.post(f"/citas/{id_paciente}/{id_especialista}/", json=citas)
+
+        with ThreadPoolExecutor(max_workers=len(pedidos)) as pool:
+            codigos = sorted(response.status_code for response in pool.map(reservar, pedidos))
+        assert codigos == [200, 409]
+
+    citas = client.get("/citas/", params={"limit": 100}).json()
+    assert len(citas) == 5
+
+
+def test_cita_cancelada_no_ocupa_horario(client, datos):
+    ana, jose = datos["pacientes"]
+    id_especialista = datos["especialistas"][0]
+    cancelada = client.post(
+        f"/citas/{ana}/{id_especialista}/",
+        json=[{"fecha_hora": "2030-02-04T09:00:00Z", "estado": "cancelada"}]
+    )
+    nueva = client.post(
+        f"/citas/{jose}/{id_especialista}/",
+        json=[{"fecha_hora": "2030-02-04T09:00:00Z", "estado": "programada"}]
+    )
+    assert cancelada.status_code == 200
+    assert nueva.status_code == 200
@@ -0,0 +1,70 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.bulk import ids_by_key
+from app.embedded import SQLiteConnection
+
+
+def _pacientes(lote, n):
+    return [
+        {
+            "documento": f"{lote:03d}{i:05d}",
+            "nombre": f"Paciente {lote}-{i}",
+            "fecha_nacimiento": "1990-05-17",
+            "telefono": "3000000000"
+        }
+        for i in range(n)
+    ]
+
+
+def test_ids_de_pacientes_correctos_con_inserciones_concurrentes(client, db_path):
+    lotes = [_pacientes(lote, 50) for lote in range(8)]
+    with ThreadPoolExecutor(max_workers=len(lotes)) as pool:
+        responses = list(pool.map(lambda lote: client.post("/pacientes/bulk", json=lote), lotes))
+
+    creados = []
+    for lote, response in zip(lotes, responses):
+        assert response.status_code == 200, response.text
+        pacientes = response.json()
+        assert [p["documento"] for p in pacientes] == [p["documento"] for p in lote]
+        creados.extend(pacientes)
+
+    with sqlite3.connect(db_path) as conn:
+        en_base = dict(conn.execute("SELECT id_paciente, documento FROM pacientes"))
+    assert len({p["id_paciente"] for p in creados}) == len(creados)
+    assert all(en_base[p["id_paciente"]] == p["documento"] for p in creados)
+
+
+def test_ids_by_key_rechaza_llaves_repetidas(tmp_path):
+    conn = SQLiteConnection(str(tmp_path / "llaves.db"))
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE personas (id INTEGER PRIMARY KEY, documento TEXT)")
+    cursor.execute("INSERT INTO personas (documento) VALUES ('A'), ('B'), ('A')")
+
+    assert ids_by_key(cursor, "personas", "documento", "id", ["B"]) == [2]
+    with pytest.raises(RuntimeError, match="más de una fila"):
+        ids_by_key(cursor, "personas", "documento", "id", ["A", "B"])
+    conn.close()
+
+
+def test_documento_existente_es_409_con_la_lista(client, datos):
+    response = client.post("/pacientes/bulk", json=_pacientes(0, 1) + [
+        {"documento": "1002", "nombre": "Otro", "fecha_nacimiento": "1990-01-01", "telefono": "1"}
+    ])
+    assert response.status_code == 409
+    assert response.json()["detail"]["existentes"] == ["1002"]
+    response = client.post("/especialistas/bulk", json=[
+        {"documento": "2001", "nombre": "Otro", "especialidad": "Cardiología"}
+    ])
+    assert response.status_code == 409
+    assert response.json()["detail"]["existentes"] == ["2001"]
+    assert len(client.get("/pacientes/").json()) == 2
+
+
+def test_mismo_documento_en_peticiones_concurrentes(client):
+    lote = _pacientes(9, 20)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        codigos = sorted(pool.map(lambda _: client.post("/pacientes/bulk", json=lote).status_code, range(4)))
+    assert codigos == [200, 409, 409, 409]
@@ -0,0 +1,15 @@
+def test_filtro_de_fechas_con_zona_horaria(client, datos):
+    ana = datos["pacientes"][0]
+    id_especialista = datos["especialistas"][0]
+    creada = client.post(
+        f"/citas/{ana}/{id_especialista}/",
+        json=[{"fecha_hora": "2030-01-01T10:00:00Z", "estado": "programada"}]
+    )
+    assert creada.status_code == 200, creada.text
+
+    # 12:00+05:00 son las 07:00 UTC, antes de la cita; 14:00+05:00 son las 09:00 UTC
+    desde = client.get("/citas/", params={"desde": "2030-01-01T12:00:00+05:00"}).json()
+    hasta = client.get("/citas/", params={"hasta": "2030-01-01T14:00:00+05:00"}).json()
+    assert [cita["id_cita"] for cita in desde] == [creada.json()[0]["id_cita"]]
+    assert desde[0]["fecha_hora"] == "2030-01-01T10:00:00"
+    assert hasta == []
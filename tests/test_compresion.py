@@ -0,0 +1,36 @@
+from app.compression import negotiate
+
+
+def test_negotiate():
+    encodings = {"gzip": None, "br": None}
+    assert negotiate("gzip, deflate, br", encodings) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", encodings) == "gzip"
+    assert negotiate("br;q=0, *", encodings) == "gzip"
+    assert negotiate("identity", encodings) is None
+    assert negotiate("gzip", {"gzip": None}) == "gzip"
+
+
+def test_listado_grande_se_comprime_y_el_streaming_no(client, datos):
+    ana = datos["pacientes"][0]
+    id_especialista = datos["especialistas"][0]
+    citas = [{"fecha_hora": f"2030-03-{dia:02d}T{hora:02d}:00:00Z", "estado": "programada"}
+             for dia in range(1, 29) for hora in range(8, 18)]
+    assert client.post(f"/citas/{ana}/{id_especialista}/", json=citas).status_code == 200
+
+    sin_comprimir = client.get("/citas/", params={"limit": 1000}, headers={"Accept-Encoding": "identity"})
+    comprimido = client.get("/citas/", params={"limit": 1000}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in sin_comprimir.headers
+    assert comprimido.headers["content-encoding"] == "gzip"
+    assert comprimido.headers["vary"] == "Accept-Encoding"
+    assert comprimido.num_bytes_downloaded < len(sin_comprimir.content) / 4
+    assert comprimido.json() == sin_comprimir.json()
+
+    exportacion = client.get("/export/citas.ndjson", headers={"Accept-Encoding": "gzip"})
+    assert exportacion.status_code == 200
+    assert "content-encoding" not in exportacion.headers
+
+
+def test_respuesta_pequena_no_se_comprime(client):
+    response = client.get("/pacientes/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
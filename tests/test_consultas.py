@@ -0,0 +1,10 @@
+def test_formulas_de_diagnostico_inexistente_es_404(client):
+    response = client.get("/formulas/diagnostico/999")
+    assert response.status_code == 404
+    assert "999" in response.json()["detail"]
+
+
+def test_diagnosticos_de_paciente_inexistente_es_404(client):
+    response = client.get("/diagnosticos/paciente/999")
+    assert response.status_code == 404
+    assert "999" in response.json()["detail"]
@@ -0,0 +1,35 @@
+import pytest
+
+RUTAS = [
+    "/estadisticas/citas/especialistas",
+    "/estadisticas/citas/especialidades",
+    "/estadisticas/citas/estados",
+    "/estadisticas/diagnosticos/mensual"
+]
+
+
+@pytest.mark.parametrize("ruta", RUTAS)
+def test_rango_invertido_o_demasiado_largo_es_400(client, ruta):
+    assert client.get(ruta, params={"desde": "2030-03-01", "hasta": "2030-02-01"}).status_code == 400
+    assert client.get(ruta, params={"desde": "2000-01-01", "hasta": "2030-01-01"}).status_code == 400
+
+
+def test_diagnosticos_mensual_agrupa_por_mes(client, datos):
+    ana = datos["pacientes"][0]
+    id_especialista = datos["especialistas"][0]
+    citas = client.post(f"/citas/{ana}/{id_especialista}/", json=[
+        {"fecha_hora": "2030-01-07T10:00:00Z", "estado": "completada"},
+        {"fecha_hora": "2030-02-04T10:00:00Z", "estado": "completada"}
+    ]).json()
+    for cita, fecha in zip(citas, ("2030-01-07", "2030-02-04")):
+        response = client.post(
+            f"/diagnosticos/{cita['id_cita']}/{ana}/",
+            json={"descripcion": "Control", "fecha_diagnostico": fecha}
+        )
+        assert response.status_code == 200, response.text
+
+    response = client.get(
+        "/estadisticas/diagnosticos/mensual", params={"desde": "2030-01-15", "hasta": "2030-02-15"}
+    )
+    assert response.status_code == 200
+    assert response.json() == [{"mes": "2030-01-01", "total": 1}, {"mes": "2030-02-01", "total": 1}]
@@ -0,0 +1,25 @@
+from app.database import get_pool
+from app.export import ndjson_batch, stream_query
+from app.repositories import CitaRepository
+from app.routes import CITA_COLUMNS
+
+
+def test_exportacion_interrumpida_devuelve_la_conexion(client, datos):
+    ana = datos["pacientes"][0]
+    id_especialista = datos["especialistas"][0]
+    citas = [{"fecha_hora": f"2030-01-{dia:02d}T{hora:02d}:00:00Z", "estado": "programada"}
+             for dia in range(1, 4) for hora in range(8, 18)]
+    assert client.post(f"/citas/{ana}/{id_especialista}/", json=citas).status_code == 200
+
+    async def cortar_tras_el_primer_lote():
+        stream = stream_query(CitaRepository.export_query, CITA_COLUMNS, ndjson_batch, batch_size=5)
+        lote = await anext(stream)
+        # Lo mismo que hace Starlette cuando el cliente se desconecta
+        await stream.aclose()
+        return lote
+
+    lote = client.portal.call(cortar_tras_el_primer_lote)
+    assert len(lote.splitlines()) == 5
+    assert get_pool().stats()["in_use"] == 0
+    exportacion = client.get("/export/citas.ndjson")
+    assert len(exportacion.text.splitlines()) == len(citas)
@@ -0,0 +1,16 @@
+def test_historial_filtra_fechas_con_zona_horaria(client, datos):
+    ana = datos["pacientes"][0]
+    id_especialista = datos["especialistas"][0]
+    creadas = client.post(f"/citas/{ana}/{id_especialista}/", json=[
+        {"fecha_hora": "2030-01-01T10:00:00Z", "estado": "completada"},
+        {"fecha_hora": "2030-01-02T10:00:00Z", "estado": "programada"}
+    ])
+    assert creadas.status_code == 200, creadas.text
+    primera, segunda = [cita["id_cita"] for cita in creadas.json()]
+
+    # -05:00: 2030-01-01T06:00 son las 11:00 UTC, después de la primera cita
+    response = client.get(f"/pacientes/{ana}/historial", params={"desde": "2030-01-01T06:00:00-05:00"})
+    assert response.status_code == 200
+    assert [cita["id_cita"] for cita in response.json()["citas"]] == [segunda]
+    response = client.get(f"/pacientes/{ana}/historial", params={"hasta": "2030-01-01T15:00:00+05:00"})
+    assert [cita["id_cita"] for cita in response.json()["citas"]] == [primera]
@@ -0,0 +1,57 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import database
+from app.cache import LRUCache
+from app.database import ConnectionPool, ReplicaSet
+from app.embedded import SQLiteConnection
+from app.main import app
+
+NUEVO = {"documento": "3001", "nombre": "Paciente Nuevo", "fecha_nacimiento": "2000-01-01", "telefono": "1"}
+
+
+@pytest.fixture
+def replica_atrasada(client, datos, db_path, tmp_path, monkeypatch):
+    """
+    Réplica con una copia de la base tomada ahora: no recibe las escrituras siguientes
+    """
+    # Sin los clientes fijados por escrituras anteriores
+    monkeypatch.setattr(database, "_pinned_clients", LRUCache(ttl=database.DB_READ_YOUR_WRITES_WINDOW))
+    path = str(tmp_path / "replica.db")
+    with sqlite3.connect(db_path) as source, sqlite3.connect(path) as target:
+        source.backup(target)
+    database._replicas = ReplicaSet(
+        [ConnectionPool(connect=lambda: SQLiteConnection(path))], check=lambda conn: conn.ping()
+    )
+    return path
+
+
+def _documentos(client, client_id):
+    response = client.get("/pacientes/", headers={"X-Client-Id": client_id})
+    assert response.status_code == 200
+    return {paciente["documento"] for paciente in response.json()}
+
+
+def test_lectura_inmediata_tras_escritura_va_al_primario(client, replica_atrasada):
+    response = client.post("/pacientes/bulk", json=[NUEVO], headers={"X-Client-Id": "escritor"})
+    assert response.status_code == 200
+    assert NUEVO["documento"] in _documentos(client, "escritor")
+    # Otro cliente lee de la réplica, que no tiene la escritura
+    assert NUEVO["documento"] not in _documentos(client, "otro")
+
+
+def test_cliente_queda_fijado_antes_de_recibir_la_respuesta(client, replica_atrasada):
+    eventos = []
+
+    async def registrar(scope, receive, send):
+        async def send_registrando(message):
+            if message["type"] == "http.response.start":
+                eventos.append(("start", database._pinned_clients.get("id:escritor")))
+            await send(message)
+        await app(scope, receive, send_registrando)
+
+    response = TestClient(registrar).post("/pacientes/bulk", json=[NUEVO], headers={"X-Client-Id": "escritor"})
+    assert response.status_code == 200
+    assert eventos == [("start", True)]
@@ -0,0 +1,63 @@
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import database, routes
+from app.cache import LRUCache
+from app.singleflight import read_flight
+
+CONCURRENTES = 4
+
+
+@pytest.fixture
+def lectores(datos, monkeypatch):
+    # Sin los clientes fijados por las escrituras de `datos`
+    monkeypatch.setattr(database, "_pinned_clients", LRUCache(ttl=database.DB_READ_YOUR_WRITES_WINDOW))
+    return datos
+
+
+def _esperar_agrupadas(monkeypatch, nombre):
+    """
+    Retiene la consulta `nombre` hasta que las demás peticiones se agrupan
+    con ella, para que la prueba no dependa de la velocidad de los hilos
+    """
+    original = getattr(routes, nombre)
+    inicial = read_flight.stats()["coalesced"]
+    llamadas = []
+
+    @functools.wraps(original)
+    def retenida(*args):
+        llamadas.append(args)
+        limite = time.monotonic() + 5
+        while read_flight.stats()["coalesced"] - inicial < CONCURRENTES - 1 and time.monotonic() < limite:
+            time.sleep(0.01)
+        return original(*args)
+
+    monkeypatch.setattr(routes, nombre, retenida)
+    return llamadas
+
+
+@pytest.mark.parametrize("nombre, ruta", [
+    ("_listar_pacientes", "/pacientes/"),
+    ("_buscar_pacientes", "/pacientes/buscar?q=gomez"),
+    ("_listar_diagnosticos", "/diagnosticos/?fields=id_diagnostico,descripcion"),
+    ("_listar_formulas", "/formulas/")
+])
+def test_lecturas_identicas_simultaneas_se_agrupan(client, lectores, monkeypatch, nombre, ruta):
+    llamadas = _esperar_agrupadas(monkeypatch, nombre)
+    barrera = threading.Barrier(CONCURRENTES)
+
+    def leer(_):
+        barrera.wait()
+        return client.get(ruta)
+
+    with ThreadPoolExecutor(max_workers=CONCURRENTES) as pool:
+        responses = list(pool.map(leer, range(CONCURRENTES)))
+
+    assert [response.status_code for response in responses] == [200] * CONCURRENTES
+    assert all(response.content == responses[0].content for response in responses)
+    assert len(llamadas) == 1
+
@@ -0,0 +1,119 @@
+"""
+Humo del motor SQLite embebido: las rutas existentes, escritas para MySQL,
+corren completas sobre app/embedded.py
+"""
+import pytest
+
+from app.embedded import match_against, translate
+from app.repositories import (
+    REPOSITORIES, SQLiteDiagnosticoRepository, SQLitePacienteRepository, repository_class
+)
+
+
+@pytest.fixture
+def hospital(client, datos):
+    ana, jose = datos["pacientes"]
+    cardiologo = datos["especialistas"][0]
+    citas = client.post(f"/citas/{ana}/{cardiologo}/", json=[
+        {"fecha_hora": "2030-01-07T10:00:00Z", "estado": "completada"},
+        {"fecha_hora": "2030-01-08T11:00:00Z", "estado": "programada"}
+    ])
+    assert citas.status_code == 200, citas.text
+    medicamentos = client.post("/medicamentos/bulk", json=[
+        {"nombre": "Losartán", "descripcion": "50 mg", "stock": 20},
+        {"nombre": "Ibuprofeno", "descripcion": "400 mg", "stock": 3}
+    ])
+    assert medicamentos.status_code == 200, medicamentos.text
+    id_cita = citas.json()[0]["id_cita"]
+    diagnostico = client.post(
+        f"/diagnosticos/{id_cita}/{ana}/",
+        json={"descripcion": "Hipertensión arterial", "fecha_diagnostico": "2030-01-07"}
+    )
+    assert diagnostico.status_code == 200, diagnostico.text
+    id_diagnostico = diagnostico.json()["id_diagnostico"]
+    id_losartan = medicamentos.json()[0]["id_medicamento"]
+    formulas = client.post("/formulas/bulk", json=[{
+        "id_diagnostico": id_diagnostico,
+        "id_medicamento": id_losartan,
+        "dosis": "1 diaria",
+        "duracion": 30,
+        "cantidad": 2
+    }])
+    assert formulas.status_code == 200, formulas.text
+    return {
+        "ana": ana,
+        "cardiologo": cardiologo,
+        "id_diagnostico": id_diagnostico,
+        "id_losartan": id_losartan
+    }
+
+
+def test_rutas_de_lectura_sobre_sqlite(client, hospital):
+    ana, id_diagnostico = hospital["ana"], hospital["id_diagnostico"]
+    rutas = [
+        ("/pacientes/", {}),
+        ("/especialistas/", {"especialidad": "Cardiología"}),
+        ("/citas/", {"estado": "programada"}),
+        ("/citas/", {"fields": "id_cita,nombre_especialista"}),
+        ("/medicamentos/", {}),
+        ("/medicamentos/stock-bajo", {}),
+        (f"/medicamentos/{hospital['id_losartan']}/movimientos", {}),
+        ("/formulas/", {}),
+        (f"/formulas/diagnostico/{id_diagnostico}", {}),
+        ("/diagnosticos/", {"especialidad": "Cardiología"}),
+        (f"/diagnosticos/paciente/{ana}", {}),
+        (f"/pacientes/{ana}/historial", {}),
+        (f"/especialistas/{hospital['cardiologo']}/disponibilidad", {"desde": "2030-01-07", "hasta": "2030-01-08"}),
+        ("/estadisticas/citas/estados", {"desde": "2030-01-01", "hasta": "2030-01-31"}),
+        ("/estadisticas/medicamentos/top", {}),
+        ("/cambios", {}),
+        ("/export/citas.ndjson", {}),
+        ("/export/diagnosticos.csv", {})
+    ]
+    for ruta, params in rutas:
+        response = client.get(ruta, params=params)
+        assert response.status_code == 200, (ruta, response.text)
+        assert response.content, ruta
+
+
+def test_escrituras_se_reflejan_en_stock_y_estadisticas(client, hospital):
+    losartan = next(
+        m for m in client.get("/medicamentos/").json() if m["id_medicamento"] == hospital["id_losartan"]
+    )
+    assert losartan["stock"] == 18
+    top = client.get("/estadisticas/medicamentos/top").json()
+    assert top[0]["id_medicamento"] == hospital["id_losartan"] and top[0]["unidades"] == 2
+    estados = client.get("/estadisticas/citas/estados", params={"desde": "2030-01-01", "hasta": "2030-01-31"})
+    assert {row["estado"]: row["total"] for row in estados.json()} == {"completada": 1, "programada": 1}
+
+
+def test_busqueda_sin_tildes_y_por_prefijo(client, hospital):
+    pacientes = client.get("/pacientes/buscar", params={"q": "jose"}).json()
+    assert [p["nombre"] for p in pacientes] == ["José Díaz"]
+    por_documento = client.get("/pacientes/buscar", params={"q": "100"}).json()
+    assert sorted(p["documento"] for p in por_documento) == ["1001", "1002"]
+    diagnosticos = client.get("/diagnosticos/buscar", params={"q": "hipertension"}).json()
+    assert [d["id_diagnostico"] for d in diagnosticos] == [hospital["id_diagnostico"]]
+
+
+def test_translate():
+    assert translate("SELECT * FROM t WHERE a = %s AND b LIKE %s ESCAPE '\\'") == (
+        "SELECT * FROM t WHERE a = ? AND b LIKE ? ESCAPE '\\'"
+    )
+    assert translate(
+        "INSERT INTO s (k, n) VALUES (%s, %s) AS nuevo ON DUPLICATE KEY UPDATE n = n + nuevo.n"
+    ) == "INSERT INTO s (k, n) VALUES (?, ?) ON CONFLICT DO UPDATE SET n = n + excluded.n"
+
+
+def test_repositorios_del_motor(client):
+    assert repository_class("pacientes") is SQLitePacienteRepository
+    assert repository_class("diagnosticos") is SQLiteDiagnosticoRepository
+    assert repository_class("citas") is REPOSITORIES["mysql"]["citas"]
+    assert "match_against(nombre, %s)" in SQLitePacienteRepository.match("nombre")
+    assert "MATCH(nombre)" in REPOSITORIES["mysql"]["pacientes"].match("nombre")
+
+
+def test_match_against():
+    assert match_against("Hipertensión arterial", "+hipertension* +art*") == 1.0
+    assert match_against("Hipertensión arterial", "+hipertension* +renal") == 0.0
+    assert match_against("Hipertensión arterial", "arterial renal") == 0.5